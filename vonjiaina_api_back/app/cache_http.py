@@ -0,0 +1,73 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+# Durées de mise en cache (secondes) pour les CDN / proxys inverses
+MAX_AGE_CATALOGUE = 300
+MAX_AGE_PHARMACIE = 60
+MAX_AGE_CARTE = 60
+
+
+def etag(*parties) -> str:
+    """ETag faible dérivé d'une version (dates de mise à jour, compteurs...)"""
+    empreinte = hashlib.sha1("|".join(str(p) for p in parties).encode()).hexdigest()[:20]
+    return f'W/"{empreinte}"'
+
+
+def en_tetes(
+    valeur_etag: str,
+    derniere_modification: Optional[datetime],
+    max_age: int
+) -> Dict[str, str]:
+    """ETag, Last-Modified et Cache-Control d'une ressource"""
+    en_tetes = {
+        "ETag": valeur_etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={max_age}",
+    }
+    if derniere_modification is not None:
+        en_tetes["Last-Modified"] = format_datetime(
+            derniere_modification.astimezone(timezone.utc), usegmt=True
+        )
+    return en_tetes
+
+
+def non_modifie(
+    request: Request,
+    valeur_etag: str,
+    derniere_modification: Optional[datetime]
+) -> bool:
+    """
+    La copie du client est-elle à jour ? If-None-Match prime sur
+    If-Modified-Since (RFC 9110), comparaison faible des ETags
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        attendu = valeur_etag.removeprefix("W/")
+        return any(
+            candidat.strip().removeprefix("W/") == attendu
+            for candidat in if_none_match.split(",")
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and derniere_modification is not None:
+        try:
+            date_client = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if date_client.tzinfo is None:
+            date_client = date_client.replace(tzinfo=timezone.utc)
+        # Last-Modified est à la seconde près
+        return derniere_modification.replace(microsecond=0) <= date_client
+    return False
+
+
+def reponse_304(valeur_etag: str, derniere_modification: Optional[datetime], max_age: int) -> Response:
+    return Response(
+        status_code=304,
+        headers=en_tetes(valeur_etag, derniere_modification, max_age)
+    )
@@ -0,0 +1,152 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli facultatif : gzip seulement
+    brotli = None
+
+# Types déjà compressés ou à ne pas mettre en tampon
+TYPES_EXCLUS = ("image/", "video/", "audio/", "application/zip", "application/gzip", "text/event-stream")
+
+
+def choisir_encodage(accept_encoding: str) -> Optional[str]:
+    """
+    Encodage à utiliser d'après Accept-Encoding : brotli si accepté
+    (et disponible), sinon gzip, sinon aucun
+    """
+    acceptes = {}
+    for element in accept_encoding.lower().split(","):
+        nom, _, parametres = element.strip().partition(";")
+        q = 1.0
+        parametres = parametres.strip()
+        if parametres.startswith("q="):
+            try:
+                q = float(parametres[2:])
+            except ValueError:
+                q = 0.0
+        acceptes[nom.strip()] = q
+
+    joker = acceptes.get("*", 0.0)
+    if brotli is not None and acceptes.get("br", joker) > 0:
+        return "br"
+    if acceptes.get("gzip", joker) > 0:
+        return "gzip"
+    return None
+
+
+class _Compresseur:
+    """Compression incrémentale (flux) gzip ou brotli"""
+
+    def __init__(self, encodage: str, niveau_gzip: int, qualite_brotli: int):
+        if encodage == "br":
+            self._brotli = brotli.Compressor(quality=qualite_brotli)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(niveau_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def morceau(self, donnees: bytes) -> bytes:
+        """Compresser et vider le tampon (le client reçoit le morceau tout de suite)"""
+        if self._brotli is not None:
+            return self._brotli.process(donnees) + self._brotli.flush()
+        return self._zlib.compress(donnees) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def fin(self, donnees: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(donnees) + self._brotli.finish()
+        return self._zlib.compress(donnees) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compression gzip / brotli négociée avec Accept-Encoding
+
+    Les réponses sous `taille_minimale` octets partent telles quelles :
+    sur un petit corps, les en-têtes et le coût CPU l'emportent sur le gain.
+    Les réponses en flux (NDJSON) sont compressées morceau par morceau.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        taille_minimale: int = 500,
+        niveau_gzip: int = 6,
+        qualite_brotli: int = 4
+    ):
+        self.app = app
+        self.taille_minimale = taille_minimale
+        self.niveau_gzip = niveau_gzip
+        self.qualite_brotli = qualite_brotli
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodage = choisir_encodage(Headers(scope=scope).get("accept-encoding", ""))
+        if encodage is None:
+            await self.app(scope, receive, send)
+            return
+
+        demarrage: Optional[Message] = None
+        compresseur: Optional[_Compresseur] = None
+        transparent = False
+
+        async def envoyer(message: Message) -> None:
+            nonlocal demarrage, compresseur, transparent
+
+            if message["type"] == "http.response.start":
+                demarrage = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if transparent:
+                await send(message)
+                return
+
+            corps = message.get("body", b"")
+            suite = message.get("more_body", False)
+
+            if compresseur is None:
+                en_tetes = MutableHeaders(raw=demarrage["headers"])
+                type_contenu = en_tetes.get("content-type", "")
+                if (
+                    "content-encoding" in en_tetes
+                    or type_contenu.startswith(TYPES_EXCLUS)
+                    or (not suite and len(corps) < self.taille_minimale)
+                ):
+                    transparent = True
+                    if not type_contenu.startswith(TYPES_EXCLUS):
+                        en_tetes.add_vary_header("Accept-Encoding")
+                    await send(demarrage)
+                    await send(message)
+                    return
+
+                compresseur = _Compresseur(encodage, self.niveau_gzip, self.qualite_brotli)
+                en_tetes["Content-Encoding"] = encodage
+                en_tetes.add_vary_header("Accept-Encoding")
+                if suite:
+                    del en_tetes["Content-Length"]
+                    await send(demarrage)
+                    await send({"type": "http.response.body", "body": compresseur.morceau(corps), "more_body": True})
+                else:
+                    compresse = compresseur.fin(corps)
+                    en_tetes["Content-Length"] = str(len(compresse))
+                    await send(demarrage)
+                    await send({"type": "http.response.body", "body": compresse})
+                return
+
+            donnees = compresseur.morceau(corps) if suite else compresseur.fin(corps)
+            await send({"type": "http.response.body", "body": donnees, "more_body": suite})
+
+        await self.app(scope, receive, envoyer)
+
+        # Réponse sans corps (ex: 304) : envoyer au moins le démarrage
+        if demarrage is not None and compresseur is None and not transparent:
+            await send(demarrage)
@@ -1,19 +1,74 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    # Par défaut dérivée de DATABASE_URL avec le driver asyncpg
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Pool de connexions des routes (moteur asynchrone)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0  # secondes d'attente d'une connexion libre
+    DB_POOL_RECYCLE: int = 1800  # secondes avant de renouveler une connexion
+    # Pool du moteur synchrone (démarrage, scripts)
+    DB_SYNC_POOL_SIZE: int = 2
+    DB_SYNC_MAX_OVERFLOW: int = 3
+    # Durée maximale d'une requête SQL en millisecondes (0 = illimitée)
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+    # Requêtes lentes des routes de recherche : seuil, part avec EXPLAIN
+    # (ANALYZE, BUFFERS), délai entre deux EXPLAIN d'une même requête,
+    # journal tournant (vide = pas de fichier, mémoire seulement)
+    SLOW_QUERY_MS: float = 200.0
+    SLOW_QUERY_EXPLAIN_TAUX: float = 0.2
+    SLOW_QUERY_EXPLAIN_INTERVALLE: float = 60.0
+    SLOW_QUERY_LOG: str = "logs/requetes_lentes.log"
+    # Réseau routier local (.npz, .geojson ou .osm) pour les temps de trajet
+    # de /pharmacies/search?trajet= ; vide = pas de classement par trajet
+    ROAD_GRAPH_PATH: Optional[str] = None
+    ROUTAGE_BUDGET_MS: float = 50.0  # calcul des trajets par requête
+    ROUTAGE_TRAJET_MAX_MIN: float = 60.0  # au-delà, durée estimée
+    # Cache des candidates de recherche par zone (par worker) : entrées,
+    # lignes candidates au total (une zone dense en garde beaucoup), TTL
+    SEARCH_CACHE_TAILLE: int = 5000
+    SEARCH_CACHE_LIGNES_MAX: int = 50000
+    SEARCH_CACHE_SECONDES: float = 60.0
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Claims vérifiés et utilisateurs gardés en mémoire (get_current_user)
+    AUTH_CACHE_TAILLE: int = 10000
+    USER_CACHE_SECONDES: float = 30.0
+
+    # Mots de passe : coût bcrypt et pool de hachage hors boucle d'événements
+    BCRYPT_ROUNDS: int = 12
+    HASH_WORKERS: int = 2
+    HASH_FILE_MAX: int = 64  # demandes en attente avant de répondre 503
+    HASH_PROCESSUS: bool = False  # processus au lieu de threads
     
+    # "production" : pas de create_all au démarrage ; le schéma vient de
+    # scripts/init_db.sql et l'instance ne devient pas prête s'il manque
+    ENVIRONMENT: str = "development"
+
     # API
     API_V1_PREFIX: str = "/api/v1"
     PROJECT_NAME: str = "VonjiAIna API"
     
+    @property
+    def est_production(self) -> bool:
+        return self.ENVIRONMENT.lower() == "production"
+
+    @property
+    def async_database_url(self) -> str:
+        if self.ASYNC_DATABASE_URL:
+            return self.ASYNC_DATABASE_URL
+        _, _, reste = self.DATABASE_URL.partition("://")
+        return f"postgresql+asyncpg://{reste}"
+
     class Config:
         env_file = ".env"
 
@@ -1,27 +1,84 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
+from app.pool_metrics import AsyncPoolInstrumente, PoolInstrumente, instrumenter
+from app.observabilite import instrumenter_sql
+from app.requetes_lentes import requetes_lentes
 
 settings = get_settings()
 
-# Créer le moteur de base de données
-engine = create_engine(
-    settings.DATABASE_URL,
+# Options communes aux deux pools
+options_pool = dict(
     pool_pre_ping=True,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     echo=False  # Changé en False pour réduire les logs
 )
 
+# Créer le moteur de base de données (démarrage, scripts)
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=PoolInstrumente,
+    pool_logging_name="sync",
+    pool_size=settings.DB_SYNC_POOL_SIZE,
+    max_overflow=settings.DB_SYNC_MAX_OVERFLOW,
+    connect_args=(
+        {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+        if settings.DB_STATEMENT_TIMEOUT_MS else {}
+    ),
+    **options_pool
+)
+
+# Moteur asynchrone (asyncpg) pour les routes : ne bloque pas la boucle d'événements
+async_engine = create_async_engine(
+    settings.async_database_url,
+    poolclass=AsyncPoolInstrumente,
+    pool_logging_name="api",
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    connect_args=(
+        {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        if settings.DB_STATEMENT_TIMEOUT_MS else {}
+    ),
+    **options_pool
+)
+
+# Télémétrie des pools (voir /health/pool)
+instrumenter(engine, "sync")
+instrumenter(async_engine, "api")
+
+# Temps SQL par requête HTTP (voir /metrics et l'en-tête Server-Timing)
+instrumenter_sql(engine)
+instrumenter_sql(async_engine)
+
+# Requêtes lentes des recherches, avec plan EXPLAIN échantillonné
+requetes_lentes.surveiller(engine)
+requetes_lentes.surveiller(async_engine)
+
 # Session locale
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Session asynchrone
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base pour les modèles
 Base = declarative_base()
 
-# Dépendance pour obtenir la session DB
+# Dépendance pour obtenir la session DB (scripts, code synchrone)
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dépendance pour obtenir une session DB asynchrone (routes async)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
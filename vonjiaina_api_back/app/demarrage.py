@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import inspect, text
+from app.config import get_settings
+from app.database import AsyncSessionLocal, Base, SessionLocal, engine
+from repositories.pharmacie_repository import PharmacieRepository
+from services.carte_service import CarteService
+from services.search_service import SearchService
+from utils.routage import graphe_routier
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Attente entre deux tentatives si la base n'est pas joignable (secondes)
+ATTENTE_INITIALE = 1.0
+ATTENTE_MAX = 30.0
+
+
+class EtatDemarrage:
+    """Avancement du préchauffage, exposé par /ready"""
+
+    def __init__(self):
+        self.pret = False
+        self.tentatives = 0
+        self.erreur: Optional[str] = None
+        self.etapes: Dict[str, dict] = {}
+        self.duree_ms: Optional[float] = None
+
+    def resume(self) -> dict:
+        return {
+            "pret": self.pret,
+            "tentatives": self.tentatives,
+            "erreur": self.erreur,
+            "etapes": self.etapes,
+            "duree_ms": self.duree_ms,
+        }
+
+
+etat_demarrage = EtatDemarrage()
+
+
+def _etape(nom: str, fonction) -> None:
+    debut = time.perf_counter()
+    resultat = fonction()
+    etat_demarrage.etapes[nom] = {
+        "duree_ms": round((time.perf_counter() - debut) * 1000, 1),
+        "nombre": resultat,
+    }
+    logger.info("Préchauffage %s : %s en %.0f ms", nom, resultat,
+                etat_demarrage.etapes[nom]["duree_ms"])
+
+
+def _verifier_schema() -> int:
+    """
+    Production : le schéma vient de scripts/init_db.sql, qui doit avoir été
+    exécuté avant le démarrage. Sans lui, l'instance ne devient pas prête.
+    """
+    existantes = set(inspect(engine).get_table_names())
+    manquantes = sorted(set(Base.metadata.tables) - existantes)
+    if manquantes:
+        raise RuntimeError(
+            f"tables absentes ({', '.join(manquantes)}) : exécuter scripts/init_db.sql"
+        )
+    return len(Base.metadata.tables)
+
+
+def _prechauffer_sync() -> None:
+    """Étapes bloquantes (moteur synchrone), exécutées hors de la boucle"""
+    if settings.est_production:
+        _etape("schema", _verifier_schema)
+    else:
+        _etape("tables", lambda: Base.metadata.create_all(bind=engine))
+
+    db = SessionLocal()
+    try:
+        _etape("pharmacies", lambda: SearchService.charger_index(db))
+        _etape("horaires", lambda: PharmacieRepository.compiler_horaires(db))
+        _etape("carte", lambda: CarteService.charger_index(db))
+        _etape("medicaments", lambda: SearchService.charger_index_medicaments(db))
+    finally:
+        db.close()
+
+    if settings.ROAD_GRAPH_PATH and not graphe_routier.est_charge:
+        _etape("graphe", lambda: graphe_routier.charger_fichier(settings.ROAD_GRAPH_PATH))
+
+
+async def _ouvrir_pool() -> int:
+    """Ouvrir les connexions du pool des routes avant la première requête"""
+    async def ping():
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(settings.DB_POOL_SIZE)))
+    return settings.DB_POOL_SIZE
+
+
+async def prechauffer() -> None:
+    """
+    Charger les structures en mémoire puis marquer l'instance prête
+
+    Lancé en tâche de fond par le lifespan : le serveur répond déjà à
+    /health pendant ce temps, /ready reste en 503 jusqu'à la fin. Si la
+    base n'est pas joignable, on réessaie avec une attente croissante.
+    """
+    debut = time.perf_counter()
+    attente = ATTENTE_INITIALE
+    while True:
+        etat_demarrage.tentatives += 1
+        try:
+            await asyncio.to_thread(_prechauffer_sync)
+            debut_pool = time.perf_counter()
+            nb = await _ouvrir_pool()
+            etat_demarrage.etapes["pool"] = {
+                "duree_ms": round((time.perf_counter() - debut_pool) * 1000, 1),
+                "nombre": nb,
+            }
+            break
+        except Exception as e:
+            etat_demarrage.erreur = f"{e.__class__.__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+            logger.warning("Préchauffage échoué (tentative %d), nouvel essai dans %.0f s : %s",
+                           etat_demarrage.tentatives, attente, etat_demarrage.erreur)
+            await asyncio.sleep(attente)
+            attente = min(attente * 2, ATTENTE_MAX)
+
+    etat_demarrage.erreur = None
+    etat_demarrage.duree_ms = round((time.perf_counter() - debut) * 1000, 1)
+    etat_demarrage.pret = True
+    logger.info("Instance prête en %.0f ms", etat_demarrage.duree_ms)
@@ -0,0 +1,58 @@
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.database import get_async_db
+from models.user import User
+from repositories.async_user_repository import AsyncUserRepository
+from utils.auth_cache import claims_cache, user_cache
+
+bearer = HTTPBearer(auto_error=False)
+
+def _non_authentifie(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Utilisateur du token `Authorization: Bearer ...`
+
+    Claims et utilisateur viennent des caches mémoire : un appel répété
+    avec le même token ne vérifie pas la signature et ne lit pas la base.
+    L'utilisateur renvoyé est partagé entre requêtes, ne pas le modifier.
+    """
+    if credentials is None:
+        raise _non_authentifie("Authentification requise")
+
+    claims = claims_cache.verifier(credentials.credentials)
+    if claims is None or not claims.get("sub"):
+        raise _non_authentifie("Token invalide ou expiré")
+
+    email = claims["sub"]
+    user = user_cache.get(email)
+    if user is None:
+        user = await AsyncUserRepository.find_by_email(db, email)
+        if user is None:
+            raise _non_authentifie("Utilisateur inconnu")
+        user_cache.put(user)
+
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Compte désactivé")
+    return user
+
+def exiger_role(*roles: str):
+    """Dépendance : utilisateur authentifié ayant l'un des rôles donnés"""
+    async def verifier_role(user: User = Depends(get_current_user)) -> User:
+        if user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Accès réservé aux rôles : " + ", ".join(roles)
+            )
+        return user
+    return verifier_role
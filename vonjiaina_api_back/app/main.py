@@ -1,13 +1,40 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.database import engine, Base
-from routers import pharmacies
+from app.database import async_engine
+from app.demarrage import etat_demarrage, prechauffer
+from routers import pharmacies, medicaments, auth, stocks, admin
+from app.requetes_lentes import requetes_lentes
+from app.compression import CompressionMiddleware
+from app.serialisation import ORJSONResponse
+from app.pool_metrics import resume_pools, route_courante, route_de
+from app.observabilite import MesuresRequete, exposition_prometheus, mesures_courantes, metriques_http
+from utils.search_cache import search_cache
+from utils.password_pool import password_pool
+from utils.auth_cache import claims_cache, user_cache
+from utils.carte_index import carte_index, tuiles_cache
 
 settings = get_settings()
 
-# Créer les tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage : création des tables (vérification du schéma en production)
+    et chargement des index en tâche de fond, suivis par /ready. Arrêt :
+    pools libérés.
+    """
+    prechauffage = asyncio.create_task(prechauffer())
+    try:
+        yield
+    finally:
+        prechauffage.cancel()
+        password_pool.fermer()
+        requetes_lentes.fermer()
+        await async_engine.dispose()
 
 # Application FastAPI
 app = FastAPI(
@@ -15,7 +42,9 @@ app = FastAPI(
     description="API pour trouver des médicaments dans les pharmacies proches",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS
@@ -33,8 +62,35 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Compression gzip / brotli des réponses (réseaux mobiles lents et facturés au volume)
+app.add_middleware(CompressionMiddleware, taille_minimale=500)
+
+# Route courante (usage des connexions du pool) et mesures de la requête :
+# latence par route, temps SQL / classement / sérialisation (Server-Timing)
+@app.middleware("http")
+async def suivre_route(request: Request, call_next):
+    route = route_de(request.scope, request.app.router.routes)
+    mesures = MesuresRequete()
+    jeton_route = route_courante.set(route)
+    jeton_mesures = mesures_courantes.set(mesures)
+    debut = time.perf_counter()
+    statut = 500
+    try:
+        response = await call_next(request)
+        statut = response.status_code
+        response.headers["Server-Timing"] = mesures.server_timing(time.perf_counter() - debut)
+        return response
+    finally:
+        metriques_http.enregistrer(route, request.method, statut, time.perf_counter() - debut, mesures)
+        mesures_courantes.reset(jeton_mesures)
+        route_courante.reset(jeton_route)
+
 # Route principale
 app.include_router(pharmacies.router, prefix=settings.API_V1_PREFIX)
+app.include_router(medicaments.router, prefix=settings.API_V1_PREFIX)
+app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
+app.include_router(stocks.router, prefix=settings.API_V1_PREFIX)
+app.include_router(admin.router, prefix=settings.API_V1_PREFIX)
 
 @app.get("/")
 async def root():
@@ -47,4 +103,61 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": " API opérationnelle"}
\ No newline at end of file
+    return {"status": " API opérationnelle"}
+
+@app.get("/ready")
+async def ready_check():
+    """
+    Prête à recevoir du trafic : index chargés et pool ouvert
+    (503 tant que le préchauffage n'est pas terminé)
+    """
+    return ORJSONResponse(
+        etat_demarrage.resume(),
+        status_code=200 if etat_demarrage.pret else 503
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métriques au format Prometheus : latences, SQL, pools, caches"""
+    return PlainTextResponse(
+        exposition_prometheus(resume_pools(), {
+            "recherche": search_cache.statistiques(),
+            "claims": claims_cache.statistiques(),
+            "utilisateurs": user_cache.statistiques(),
+            "hachage": password_pool.statistiques(),
+            "carte": carte_index.statistiques(),
+            "tuiles": tuiles_cache.statistiques(),
+        }),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/health/pool")
+async def pool_health():
+    """Télémétrie des pools de connexions (attente, usage par route)"""
+    return resume_pools()
+
+@app.get("/health/cache")
+async def cache_health():
+    """Statistiques du cache des recherches (hits, misses, invalidations)"""
+    return search_cache.statistiques()
+
+@app.get("/health/hachage")
+async def hachage_health():
+    """Pool bcrypt : demandes en cours, en attente, refusées, durées"""
+    return password_pool.statistiques()
+
+@app.get("/health/carte")
+async def carte_health():
+    """Index de la carte et cache des tuiles vectorielles"""
+    return {
+        "index": carte_index.statistiques(),
+        "tuiles": tuiles_cache.statistiques(),
+    }
+
+@app.get("/health/auth")
+async def auth_health():
+    """Caches d'authentification : claims vérifiés, utilisateurs"""
+    return {
+        "claims": claims_cache.statistiques(),
+        "utilisateurs": user_cache.statistiques(),
+    }
@@ -0,0 +1,240 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Bornes des histogrammes de latence (secondes), style Prometheus
+BORNES_SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Étapes annoncées dans l'en-tête Server-Timing, dans cet ordre
+PHASES = ("db", "classement", "serialisation")
+
+
+class MesuresRequete:
+    """Temps passé par étape et requêtes SQL d'une requête HTTP"""
+
+    __slots__ = ("phases", "nb_sql")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.nb_sql = 0
+
+    def ajouter(self, phase: str, duree_s: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + duree_s
+
+    def server_timing(self, total_s: float) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en ms)"""
+        parties = []
+        for phase in PHASES:
+            if phase in self.phases:
+                partie = f"{phase};dur={self.phases[phase] * 1000:.1f}"
+                if phase == "db":
+                    partie += f';desc="{self.nb_sql} SQL"'
+                parties.append(partie)
+        parties.append(f"total;dur={total_s * 1000:.1f}")
+        return ", ".join(parties)
+
+
+# Mesures de la requête en cours (renseignée par le middleware de app.main)
+mesures_courantes: ContextVar[Optional[MesuresRequete]] = ContextVar("mesures_courantes", default=None)
+
+
+@contextmanager
+def chronometre(phase: str):
+    """Ajouter la durée du bloc à l'étape `phase` de la requête en cours"""
+    mesures = mesures_courantes.get()
+    if mesures is None:
+        yield
+        return
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        mesures.ajouter(phase, time.perf_counter() - debut)
+
+
+class Histogramme:
+    """Histogramme cumulatif (compteurs par borne, somme, nombre)"""
+
+    __slots__ = ("compteurs", "somme", "nombre")
+
+    def __init__(self):
+        self.compteurs = [0] * (len(BORNES_SECONDES) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur: float) -> None:
+        self.compteurs[bisect.bisect_left(BORNES_SECONDES, valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def lignes(self, nom: str, etiquettes: str) -> List[str]:
+        lignes = []
+        cumul = 0
+        for borne, compteur in zip(BORNES_SECONDES + (float("inf"),), self.compteurs):
+            cumul += compteur
+            le = "+Inf" if borne == float("inf") else repr(borne)
+            lignes.append(f'{nom}_bucket{{{etiquettes},le="{le}"}} {cumul}')
+        lignes.append(f"{nom}_sum{{{etiquettes}}} {self.somme:.6f}")
+        lignes.append(f"{nom}_count{{{etiquettes}}} {self.nombre}")
+        return lignes
+
+
+class MetriquesHTTP:
+    """Latences par route, temps par étape et requêtes SQL par route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latences: Dict[Tuple[str, str, str], Histogramme] = {}
+        self.sql: Dict[str, Histogramme] = {}
+        self.nb_sql: Dict[str, int] = {}
+        self.phases: Dict[Tuple[str, str], float] = {}
+
+    def enregistrer(
+        self,
+        route: str,
+        methode: str,
+        statut: int,
+        duree_s: float,
+        mesures: MesuresRequete
+    ) -> None:
+        with self._lock:
+            cle = (route, methode, str(statut))
+            histogramme = self.latences.get(cle)
+            if histogramme is None:
+                histogramme = self.latences[cle] = Histogramme()
+            histogramme.observer(duree_s)
+
+            if mesures.nb_sql:
+                histogramme = self.sql.get(route)
+                if histogramme is None:
+                    histogramme = self.sql[route] = Histogramme()
+                histogramme.observer(mesures.phases.get("db", 0.0))
+                self.nb_sql[route] = self.nb_sql.get(route, 0) + mesures.nb_sql
+
+            for phase, duree in mesures.phases.items():
+                self.phases[(route, phase)] = self.phases.get((route, phase), 0.0) + duree
+
+    def lignes(self) -> List[str]:
+        with self._lock:
+            lignes = [
+                "# HELP vonjiaina_http_request_duration_seconds Durée des requêtes HTTP",
+                "# TYPE vonjiaina_http_request_duration_seconds histogram",
+            ]
+            for (route, methode, statut), histogramme in sorted(self.latences.items()):
+                lignes += histogramme.lignes(
+                    "vonjiaina_http_request_duration_seconds",
+                    f'route="{_echapper(route)}",method="{methode}",status="{statut}"'
+                )
+
+            lignes += [
+                "# HELP vonjiaina_sql_duration_seconds Temps SQL cumulé par requête HTTP",
+                "# TYPE vonjiaina_sql_duration_seconds histogram",
+            ]
+            for route, histogramme in sorted(self.sql.items()):
+                lignes += histogramme.lignes("vonjiaina_sql_duration_seconds", f'route="{_echapper(route)}"')
+
+            lignes += [
+                "# HELP vonjiaina_sql_queries_total Requêtes SQL exécutées",
+                "# TYPE vonjiaina_sql_queries_total counter",
+            ]
+            lignes += [
+                f'vonjiaina_sql_queries_total{{route="{_echapper(route)}"}} {nombre}'
+                for route, nombre in sorted(self.nb_sql.items())
+            ]
+
+            lignes += [
+                "# HELP vonjiaina_phase_seconds_total Temps passé par étape (db, classement, serialisation)",
+                "# TYPE vonjiaina_phase_seconds_total counter",
+            ]
+            lignes += [
+                f'vonjiaina_phase_seconds_total{{route="{_echapper(route)}",phase="{phase}"}} {duree:.6f}'
+                for (route, phase), duree in sorted(self.phases.items())
+            ]
+            return lignes
+
+
+metriques_http = MetriquesHTTP()
+
+
+def instrumenter_sql(engine) -> None:
+    """Chronométrer chaque requête SQL du moteur et l'imputer à la requête HTTP en cours"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _avant(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("debuts_sql", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _apres(conn, cursor, statement, parameters, context, executemany):
+        debut = conn.info["debuts_sql"].pop()
+        mesures = mesures_courantes.get()
+        if mesures is not None:
+            mesures.ajouter("db", time.perf_counter() - debut)
+            mesures.nb_sql += 1
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _erreur(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("debuts_sql"):
+            connection.info["debuts_sql"].pop()
+
+
+def _echapper(valeur: str) -> str:
+    return valeur.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _ligne(nom: str, valeur, etiquettes: str = "") -> str:
+    if isinstance(valeur, bool):
+        valeur = int(valeur)
+    return f"{nom}{{{etiquettes}}} {valeur}" if etiquettes else f"{nom} {valeur}"
+
+
+def exposition_prometheus(pools: dict, caches: Dict[str, dict]) -> str:
+    """
+    Métriques au format texte Prometheus : histogrammes HTTP et SQL,
+    pools de connexions (voir resume_pools) et statistiques des caches
+    (valeurs numériques de chaque dictionnaire `statistiques()`)
+    """
+    lignes = metriques_http.lignes()
+
+    lignes += [
+        "# HELP vonjiaina_pool_connexions Connexions des pools SQLAlchemy par état",
+        "# TYPE vonjiaina_pool_connexions gauge",
+    ]
+    for nom, pool in sorted(pools.items()):
+        for etat, cle in (("utilisees", "connexions_utilisees"), ("libres", "connexions_libres"),
+                          ("debordement", "debordement"), ("taille", "taille")):
+            if pool.get(cle) is not None:
+                lignes.append(_ligne("vonjiaina_pool_connexions", pool[cle], f'pool="{nom}",etat="{etat}"'))
+    lignes += [
+        "# HELP vonjiaina_pool_attente_p95_ms Attente d'une connexion libre (p95, ms)",
+        "# TYPE vonjiaina_pool_attente_p95_ms gauge",
+    ]
+    lignes += [_ligne("vonjiaina_pool_attente_p95_ms", pool["attente"]["p95_ms"], f'pool="{nom}"')
+               for nom, pool in sorted(pools.items())]
+    lignes += [
+        "# HELP vonjiaina_pool_expirations_total Attentes de connexion expirées",
+        "# TYPE vonjiaina_pool_expirations_total counter",
+    ]
+    lignes += [_ligne("vonjiaina_pool_expirations_total", pool["expirations"], f'pool="{nom}"')
+               for nom, pool in sorted(pools.items())]
+
+    lignes += [
+        "# HELP vonjiaina_cache Statistiques des caches en mémoire",
+        "# TYPE vonjiaina_cache gauge",
+    ]
+    for cache, statistiques in sorted(caches.items()):
+        for cle, valeur in statistiques.items():
+            # Un niveau d'imbrication : {"attente": {"p95_ms": ...}} -> attente_p95_ms
+            sous_valeurs = valeur.items() if isinstance(valeur, dict) else [(None, valeur)]
+            for sous_cle, sous_valeur in sous_valeurs:
+                if isinstance(sous_valeur, (int, float)):
+                    mesure = f"{cle}_{sous_cle}" if sous_cle else cle
+                    lignes.append(_ligne("vonjiaina_cache", sous_valeur, f'cache="{cache}",mesure="{mesure}"'))
+
+    return "\n".join(lignes) + "\n"
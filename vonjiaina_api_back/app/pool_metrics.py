@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+
+from sqlalchemy import event, exc
+from starlette.routing import Match
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Route en cours de traitement (renseignée par le middleware de app.main)
+route_courante: ContextVar[Optional[str]] = ContextVar("route_courante", default=None)
+
+# Nombre de mesures gardées pour les percentiles
+TAILLE_ECHANTILLON = 1000
+
+
+def _percentile(valeurs, p: float) -> float:
+    if not valeurs:
+        return 0.0
+    triees = sorted(valeurs)
+    return triees[min(int(len(triees) * p), len(triees) - 1)]
+
+
+class _Mesures:
+    """Nombre, total, maximum et dernières valeurs (ms) d'une durée"""
+
+    __slots__ = ("nombre", "total", "maximum", "echantillon")
+
+    def __init__(self):
+        self.nombre = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.echantillon: Deque[float] = deque(maxlen=TAILLE_ECHANTILLON)
+
+    def ajouter(self, duree_ms: float) -> None:
+        self.nombre += 1
+        self.total += duree_ms
+        self.maximum = max(self.maximum, duree_ms)
+        self.echantillon.append(duree_ms)
+
+    def resume(self) -> dict:
+        return {
+            "nombre": self.nombre,
+            "moyenne_ms": round(self.total / self.nombre, 3) if self.nombre else 0.0,
+            "p95_ms": round(_percentile(self.echantillon, 0.95), 3),
+            "max_ms": round(self.maximum, 3),
+        }
+
+
+class MetriquesPool:
+    """
+    Télémétrie d'un pool de connexions : attente pour obtenir une
+    connexion, durée pendant laquelle chaque route la garde, expirations
+    """
+
+    def __init__(self, nom: str):
+        self.nom = nom
+        self._lock = threading.Lock()
+        self._engine = None
+        self.attente = _Mesures()
+        self.expirations = 0
+        self.par_route: Dict[str, _Mesures] = {}
+
+    def enregistrer_attente(self, duree_ms: float, expiree: bool = False) -> None:
+        with self._lock:
+            self.attente.ajouter(duree_ms)
+            if expiree:
+                self.expirations += 1
+
+    def enregistrer_utilisation(self, route: Optional[str], duree_ms: float) -> None:
+        route = route or "hors requête"
+        with self._lock:
+            mesures = self.par_route.get(route)
+            if mesures is None:
+                mesures = self.par_route[route] = _Mesures()
+            mesures.ajouter(duree_ms)
+
+    def resume(self) -> dict:
+        pool = self._engine.pool if self._engine is not None else None
+        with self._lock:
+            return {
+                "taille": pool.size() if pool else None,
+                "connexions_utilisees": pool.checkedout() if pool else None,
+                "connexions_libres": pool.checkedin() if pool else None,
+                "debordement": pool.overflow() if pool else None,
+                "attente": self.attente.resume(),
+                "expirations": self.expirations,
+                "utilisation_par_route": {
+                    route: mesures.resume()
+                    for route, mesures in sorted(self.par_route.items())
+                },
+            }
+
+
+# Métriques par pool, indexées par pool_logging_name
+metriques_pools: Dict[str, MetriquesPool] = {}
+
+
+class _AttenteChronometree:
+    """
+    Mesure le temps passé à attendre une connexion libre : aucun
+    événement de pool ne couvre cette attente, on chronomètre _do_get
+    """
+
+    def _do_get(self):
+        metriques = metriques_pools.get(self._orig_logging_name)
+        debut = time.perf_counter()
+        try:
+            connexion = super()._do_get()
+        except exc.TimeoutError:
+            if metriques is not None:
+                metriques.enregistrer_attente((time.perf_counter() - debut) * 1000, expiree=True)
+            raise
+        if metriques is not None:
+            metriques.enregistrer_attente((time.perf_counter() - debut) * 1000)
+        return connexion
+
+
+class PoolInstrumente(_AttenteChronometree, QueuePool):
+    pass
+
+
+class AsyncPoolInstrumente(_AttenteChronometree, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrumenter(engine, nom: str) -> MetriquesPool:
+    """
+    Brancher la télémétrie sur le pool d'un moteur créé avec
+    poolclass=PoolInstrumente (ou AsyncPoolInstrumente) et
+    pool_logging_name=nom
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metriques = metriques_pools[nom] = MetriquesPool(nom)
+    metriques._engine = sync_engine
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["debut_checkout"] = time.perf_counter()
+        connection_record.info["route"] = route_courante.get()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        debut = connection_record.info.pop("debut_checkout", None)
+        if debut is not None:
+            metriques.enregistrer_utilisation(
+                connection_record.info.pop("route", None),
+                (time.perf_counter() - debut) * 1000
+            )
+
+    return metriques
+
+
+def route_de(scope: dict, routes) -> str:
+    """Gabarit de la route visée (ex: /api/v1/medicaments/{medicament_id})"""
+    for route in routes:
+        correspondance, _ = route.matches(scope)
+        if correspondance == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "inconnue"
+
+
+def resume_pools() -> dict:
+    """Télémétrie de tous les pools instrumentés"""
+    return {nom: metriques.resume() for nom, metriques in metriques_pools.items()}
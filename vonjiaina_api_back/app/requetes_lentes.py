@@ -0,0 +1,313 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from app.config import get_settings
+from app.pool_metrics import route_courante
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Routes dont les requêtes SQL sont surveillées
+ROUTES_SURVEILLEES = {
+    f"{settings.API_V1_PREFIX}/pharmacies/search",
+    f"{settings.API_V1_PREFIX}/medicaments/search",
+}
+
+# Taille maximale du SQL gardé par entrée
+TAILLE_MAX_TEXTE = 4000
+
+
+def _tronquer(texte: str) -> str:
+    return texte if len(texte) <= TAILLE_MAX_TEXTE else texte[:TAILLE_MAX_TEXTE] + "…"
+
+
+def _decrire(valeur):
+    """Type (et longueur) d'un paramètre, sans sa valeur"""
+    if valeur is None:
+        return "null"
+    if isinstance(valeur, dict):
+        return {str(cle): _decrire(v) for cle, v in valeur.items()}
+    if isinstance(valeur, (str, bytes, list, tuple, set, frozenset)):
+        return f"{type(valeur).__name__}({len(valeur)})"
+    return type(valeur).__name__
+
+
+def decrire_parametres(parameters):
+    """
+    Description des paramètres liés d'une requête : types et longueurs
+    seulement. Positions et termes recherchés ne sont ni journalisés ni
+    exposés ; les valeurs ne servent qu'à l'EXPLAIN.
+    """
+    if isinstance(parameters, (list, tuple)):
+        return [_decrire(valeur) for valeur in parameters]
+    return _decrire(parameters)
+
+
+def masquer_plan(plan, parameters):
+    """
+    Plan EXPLAIN sans les valeurs des paramètres : PostgreSQL recopie les
+    constantes texte et flottantes entre apostrophes ('47.52'::double
+    precision), remplacées par '?'
+    """
+    valeurs = parameters.values() if isinstance(parameters, dict) else (parameters or ())
+    litteraux = sorted(
+        {"'" + str(v).replace("'", "''") + "'" for v in valeurs if isinstance(v, (str, float))},
+        key=len,
+        reverse=True
+    )
+    if not litteraux:
+        return plan
+
+    def masquer(noeud):
+        if isinstance(noeud, str):
+            for litteral in litteraux:
+                noeud = noeud.replace(litteral, "'?'")
+            return noeud
+        if isinstance(noeud, list):
+            return [masquer(element) for element in noeud]
+        if isinstance(noeud, dict):
+            return {cle: masquer(valeur) for cle, valeur in noeud.items()}
+        return noeud
+
+    return masquer(plan)
+
+
+def _empreinte(statement: str) -> str:
+    # Même requête, paramètres différents : même empreinte
+    return hashlib.sha1(" ".join(statement.split()).encode()).hexdigest()[:12]
+
+
+class JournalRequetesLentes:
+    """
+    Requêtes SQL lentes des routes de recherche, avec plan EXPLAIN
+
+    Au-delà de `seuil_ms`, la requête (SQL, types des paramètres, durée,
+    route) est écrite dans un journal JSON tournant et gardée en mémoire
+    pour l'endpoint d'administration. Les valeurs des paramètres
+    (position de l'utilisateur, termes recherchés) ne sont gardées que le
+    temps de l'EXPLAIN, et masquées dans le plan. Un EXPLAIN (ANALYZE, BUFFERS) est
+    capturé pour une fraction `taux_explain` des requêtes lentes, au plus
+    une fois par `intervalle_explain` secondes pour une même requête et
+    un seul à la fois : ANALYZE réexécute la requête. Il tourne hors du
+    chemin de la requête HTTP, sur une autre connexion, dans une
+    transaction annulée.
+    """
+
+    def __init__(
+        self,
+        seuil_ms: float = 200.0,
+        taux_explain: float = 0.2,
+        intervalle_explain: float = 60.0,
+        fichier: Optional[str] = None,
+        taille_memoire: int = 200
+    ):
+        self.seuil_ms = seuil_ms
+        self.taux_explain = taux_explain
+        self.intervalle_explain = intervalle_explain
+        self._lock = threading.Lock()
+        self._entrees: Deque[dict] = deque(maxlen=taille_memoire)
+        self._derniers_explains: Dict[str, float] = {}
+        self._explain_en_cours = False
+        self._taches: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sync_engine = None
+        self._async_engine = None
+        self.nombre = 0
+        self.explains = 0
+        self._journal = self._creer_journal(fichier) if fichier else None
+
+    @staticmethod
+    def _creer_journal(fichier: str) -> logging.Logger:
+        dossier = os.path.dirname(fichier)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        # Un logger par fichier : deux journaux n'écrivent pas au même endroit
+        journal = logging.getLogger(f"vonjiaina.requetes_lentes.{os.path.abspath(fichier)}")
+        journal.setLevel(logging.INFO)
+        journal.propagate = False
+        if not journal.handlers:
+            gestionnaire = RotatingFileHandler(
+                fichier, maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8", delay=True
+            )
+            gestionnaire.setFormatter(logging.Formatter("%(message)s"))
+            journal.addHandler(gestionnaire)
+        return journal
+
+    def surveiller(self, engine) -> None:
+        """Brancher la détection sur un moteur (synchrone ou asynchrone)"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        if sync_engine is not engine:
+            self._async_engine = engine
+        else:
+            self._sync_engine = engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _avant(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("debuts_lents", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _apres(conn, cursor, statement, parameters, context, executemany):
+            duree_ms = (time.perf_counter() - conn.info["debuts_lents"].pop()) * 1000
+            if duree_ms >= self.seuil_ms and not executemany:
+                route = route_courante.get()
+                if route in ROUTES_SURVEILLEES:
+                    self.enregistrer(route, statement, parameters, duree_ms, asynchrone=engine is not sync_engine)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _erreur(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("debuts_lents"):
+                connection.info["debuts_lents"].pop()
+
+    def enregistrer(
+        self,
+        route: str,
+        statement: str,
+        parameters,
+        duree_ms: float,
+        asynchrone: bool = False
+    ) -> dict:
+        entree = {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "route": route,
+            "duree_ms": round(duree_ms, 1),
+            "empreinte": _empreinte(statement),
+            "sql": _tronquer(statement),
+            "parametres": decrire_parametres(parameters),
+            "plan": None,
+        }
+        with self._lock:
+            self.nombre += 1
+            self._entrees.append(entree)
+            expliquer = self._reserver_explain(entree["empreinte"], statement)
+
+        if expliquer:
+            if asynchrone:
+                tache = asyncio.get_running_loop().create_task(
+                    self._expliquer_async(entree, statement, parameters)
+                )
+                self._taches.add(tache)
+                tache.add_done_callback(self._taches.discard)
+            else:
+                self._get_executor().submit(self._expliquer_sync, entree, statement, parameters)
+        else:
+            self._ecrire(entree)
+        return entree
+
+    def _reserver_explain(self, empreinte: str, statement: str) -> bool:
+        """Échantillonnage et limitation (appelé sous le verrou)"""
+        if self._explain_en_cours or random.random() >= self.taux_explain:
+            return False
+        # ANALYZE réexécute la requête : jamais pour une écriture
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return False
+        maintenant = time.monotonic()
+        if maintenant - self._derniers_explains.get(empreinte, float("-inf")) < self.intervalle_explain:
+            return False
+        self._derniers_explains[empreinte] = maintenant
+        self._explain_en_cours = True
+        return True
+
+    async def _expliquer_async(self, entree: dict, statement: str, parameters) -> None:
+        try:
+            async with self._async_engine.connect() as connection:
+                brute = await connection.get_raw_connection()
+                # Paramètres positionnels tels que passés à asyncpg ($1, $2...)
+                async with brute.driver_connection.transaction():
+                    plan = await brute.driver_connection.fetchval(
+                        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, *(parameters or ())
+                    )
+                    entree["plan"] = masquer_plan(
+                        json.loads(plan) if isinstance(plan, str) else plan, parameters
+                    )
+                    raise _Annulation()
+        except _Annulation:
+            pass
+        except Exception as e:
+            entree["plan"] = {"erreur": masquer_plan(f"{e.__class__.__name__}: {e}", parameters)}
+        finally:
+            self._terminer_explain(entree)
+
+    def _expliquer_sync(self, entree: dict, statement: str, parameters) -> None:
+        try:
+            connection = self._sync_engine.raw_connection()
+            try:
+                curseur = connection.cursor()
+                curseur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+                plan = curseur.fetchone()[0]
+                entree["plan"] = masquer_plan(
+                    json.loads(plan) if isinstance(plan, str) else plan, parameters
+                )
+            finally:
+                connection.rollback()
+                connection.close()
+        except Exception as e:
+            entree["plan"] = {"erreur": masquer_plan(f"{e.__class__.__name__}: {e}", parameters)}
+        finally:
+            self._terminer_explain(entree)
+
+    def _terminer_explain(self, entree: dict) -> None:
+        with self._lock:
+            self._explain_en_cours = False
+            self.explains += 1
+        self._ecrire(entree)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        return self._executor
+
+    def _ecrire(self, entree: dict) -> None:
+        logger.warning("Requête lente (%s ms) sur %s [%s]", entree["duree_ms"], entree["route"], entree["empreinte"])
+        if self._journal is not None:
+            self._journal.info(json.dumps(entree, default=str, ensure_ascii=False))
+
+    def dernieres(self, limite: int = 50, avec_plan: bool = False) -> List[dict]:
+        """Requêtes lentes récentes, les plus récentes d'abord"""
+        with self._lock:
+            entrees = list(self._entrees)
+        if avec_plan:
+            entrees = [e for e in entrees if e["plan"] is not None]
+        return entrees[::-1][:limite]
+
+    def statistiques(self) -> dict:
+        with self._lock:
+            return {
+                "seuil_ms": self.seuil_ms,
+                "taux_explain": self.taux_explain,
+                "nombre": self.nombre,
+                "explains": self.explains,
+                "en_memoire": len(self._entrees),
+            }
+
+    def fermer(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class _Annulation(Exception):
+    """Sortir de la transaction de l'EXPLAIN en l'annulant"""
+
+
+# Journal partagé par l'application
+requetes_lentes = JournalRequetesLentes(
+    seuil_ms=settings.SLOW_QUERY_MS,
+    taux_explain=settings.SLOW_QUERY_EXPLAIN_TAUX,
+    intervalle_explain=settings.SLOW_QUERY_EXPLAIN_INTERVALLE,
+    fichier=settings.SLOW_QUERY_LOG or None
+)
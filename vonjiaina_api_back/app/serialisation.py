@@ -0,0 +1,40 @@
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+from app.observabilite import chronometre
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Réponse JSON sérialisée par orjson (classe de réponse par défaut de l'API)
+    Gère nativement datetime, UUID et les scalaires NumPy.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with chronometre("serialisation"):
+            return orjson.dumps(
+                content,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+
+
+@lru_cache(maxsize=None)
+def adapter(modele) -> TypeAdapter:
+    """TypeAdapter construit une seule fois par modèle de réponse"""
+    return TypeAdapter(modele)
+
+
+def reponse_typee(modele, contenu: Any, status_code: int = 200) -> Response:
+    """
+    Réponse JSON passant par le modèle (champs déclarés uniquement, valeurs
+    nulles omises), sérialisée en Rust par pydantic-core sans passer par
+    jsonable_encoder
+    """
+    type_adapter = adapter(modele)
+    with chronometre("serialisation"):
+        corps = type_adapter.dump_json(type_adapter.validate_python(contenu), exclude_none=True)
+    return Response(corps, status_code=status_code, media_type="application/json")
@@ -5,11 +5,13 @@ Modèles SQLAlchemy pour la base de données
 from .pharmacie import Pharmacie
 from .medicament import Medicament
 from .stock import Stock
+from .stock_supprime import StockSupprime
 from .user import User
 
 __all__ = [
     "Pharmacie",
     "Medicament",
     "Stock",
+    "StockSupprime",
     "User",
 ]
\ No newline at end of file
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, JSON, DateTime, Index
 from geoalchemy2 import Geography
 from datetime import datetime, timezone
 from app.database import Base
 
 class Pharmacie(Base):
     __tablename__ = "pharmacies"
+    __table_args__ = (
+        # Index GiST pour ST_DWithin / ST_Distance sur location
+        Index("idx_pharmacies_location", "location", postgresql_using="gist"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String(255), nullable=False)
@@ -13,7 +17,7 @@ class Pharmacie(Base):
     email = Column(String(255))
     
     location = Column(
-        Geography(geometry_type='POINT', srid=4326),
+        Geography(geometry_type='POINT', srid=4326, spatial_index=False),
         nullable=False
     )
     
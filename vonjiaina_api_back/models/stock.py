@@ -1,9 +1,26 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import BigInteger, Column, Integer, Float, ForeignKey, DateTime, Index, text
 from datetime import datetime, timezone
 from app.database import Base
 
+# Transaction (xid 64 bits) qui écrit la ligne : clé du flux /stocks/changes,
+# ordonnée par validation une fois filtrée par pg_snapshot_xmin
+XID_TRANSACTION = text("pg_current_xact_id()::text::bigint")
+
 class Stock(Base):
     __tablename__ = "stocks"
+    __table_args__ = (
+        # Une seule ligne par (médicament, pharmacie) ; quantite et prix
+        # inclus pour que la recherche se fasse en index-only scan
+        Index(
+            "ux_stocks_medicament_pharmacie",
+            "medicament_id",
+            "pharmacie_id",
+            unique=True,
+            postgresql_include=["quantite", "prix"]
+        ),
+        # Flux /stocks/changes : parcours par curseur (xid_ecriture, id)
+        Index("idx_stocks_xid_ecriture_id", "xid_ecriture", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     pharmacie_id = Column(Integer, ForeignKey("pharmacies.id"), nullable=False)
@@ -15,4 +32,11 @@ class Stock(Base):
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc)
-    )
\ No newline at end of file
+    )
+
+    xid_ecriture = Column(
+        BigInteger,
+        nullable=False,
+        server_default=XID_TRANSACTION,
+        onupdate=XID_TRANSACTION
+    )
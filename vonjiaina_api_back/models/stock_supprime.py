@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, Column, Integer, DateTime, Index
+from datetime import datetime, timezone
+from app.database import Base
+from models.stock import XID_TRANSACTION
+
+class StockSupprime(Base):
+    """
+    Trace d'un stock supprimé, pour que le flux /stocks/changes
+    signale aussi les suppressions
+    """
+    __tablename__ = "stocks_supprimes"
+    __table_args__ = (
+        # Parcours du flux de changements par curseur (xid_ecriture, id)
+        Index("idx_stocks_supprimes_xid_ecriture_id", "xid_ecriture", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    stock_id = Column(Integer, nullable=False)
+    pharmacie_id = Column(Integer, nullable=False)
+    medicament_id = Column(Integer, nullable=False)
+
+    date_suppression = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    xid_ecriture = Column(BigInteger, nullable=False, server_default=XID_TRANSACTION)
@@ -6,10 +6,18 @@ from .pharmacie_repository import PharmacieRepository
 from .medicament_repository import MedicamentRepository
 from .stock_repository import StockRepository
 from .user_repository import UserRepository
+from .async_pharmacie_repository import AsyncPharmacieRepository
+from .async_medicament_repository import AsyncMedicamentRepository
+from .async_user_repository import AsyncUserRepository
+from .async_stock_repository import AsyncStockRepository
 
 __all__ = [
     "PharmacieRepository",
     "MedicamentRepository",
     "StockRepository",
     "UserRepository",
+    "AsyncPharmacieRepository",
+    "AsyncMedicamentRepository",
+    "AsyncUserRepository",
+    "AsyncStockRepository",
 ]
\ No newline at end of file
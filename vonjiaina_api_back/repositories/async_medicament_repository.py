@@ -0,0 +1,124 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from models.medicament import Medicament
+from repositories.medicament_repository import MedicamentRepository
+from utils.medicament_index import medicament_index
+
+class AsyncMedicamentRepository:
+    """
+    Version asynchrone (AsyncSession) de MedicamentRepository pour les routes
+
+    Requêtes et maintenance des index partagées avec MedicamentRepository :
+    seule l'exécution diffère
+    """
+
+    @staticmethod
+    async def create(db: AsyncSession, **kwargs) -> Medicament:
+        """Créer un nouveau médicament"""
+        medicament = Medicament(**kwargs)
+        db.add(medicament)
+        await db.commit()
+        await db.refresh(medicament)
+
+        MedicamentRepository.indexer(medicament, creation=True)
+        return medicament
+
+    @staticmethod
+    async def find_by_id(db: AsyncSession, medicament_id: int) -> Optional[Medicament]:
+        """Trouver un médicament par ID"""
+        result = await db.execute(MedicamentRepository.requete_find_by_id(medicament_id))
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_version(db: AsyncSession, medicament_id: int) -> Optional[Tuple[Optional[datetime]]]:
+        """
+        (dernière modification,) d'un médicament sans charger l'objet,
+        None s'il n'existe pas
+        """
+        result = await db.execute(
+            select(func.coalesce(Medicament.updated_at, Medicament.created_at))
+            .where(Medicament.id == medicament_id)
+        )
+        row = result.first()
+        return tuple(row) if row is not None else None
+
+    @staticmethod
+    async def get_version_catalogue(db: AsyncSession) -> Tuple[Optional[datetime], int]:
+        """
+        Version du catalogue : dernière modification et nombre de
+        médicaments (une suppression change le nombre)
+        """
+        result = await db.execute(
+            select(
+                func.max(func.coalesce(Medicament.updated_at, Medicament.created_at)),
+                func.count(Medicament.id)
+            )
+        )
+        return tuple(result.one())
+
+    @staticmethod
+    async def find_by_name(db: AsyncSession, nom: str, limit: int = 20) -> List[Medicament]:
+        """
+        Rechercher par nom commercial ou DCI, par pertinence
+        (même comportement que MedicamentRepository.find_by_name)
+        """
+        if not medicament_index.est_charge:
+            result = await db.execute(MedicamentRepository.requete_recherche_ilike(nom, limit))
+            return list(result.scalars().all())
+
+        scores = dict(medicament_index.rechercher(nom, limite=limit))
+        if not scores:
+            return []
+
+        result = await db.execute(MedicamentRepository.requete_par_ids(list(scores)))
+        return MedicamentRepository.trier_par_score(list(result.scalars().all()), scores)
+
+    @staticmethod
+    async def get_all(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[Medicament]:
+        """Obtenir les médicaments par ID croissant (voir MedicamentRepository.get_all)"""
+        result = await db.execute(MedicamentRepository.requete_get_all(skip, limit, after_id))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def iter_export(db: AsyncSession) -> AsyncIterator[dict]:
+        """
+        Tout le catalogue, ligne par ligne depuis un curseur côté serveur
+        (stream + yield_per) : mémoire constante quelle que soit sa taille
+        """
+        result = await db.stream(MedicamentRepository.requete_export())
+        async for row in result:
+            yield dict(row._mapping)
+
+    @staticmethod
+    async def update(db: AsyncSession, medicament_id: int, **kwargs) -> Optional[Medicament]:
+        """Mettre à jour un médicament"""
+        medicament = await AsyncMedicamentRepository.find_by_id(db, medicament_id)
+        if not medicament:
+            return None
+
+        MedicamentRepository.modifier(medicament, kwargs)
+        await db.commit()
+        await db.refresh(medicament)
+
+        MedicamentRepository.indexer(medicament)
+        return medicament
+
+    @staticmethod
+    async def delete(db: AsyncSession, medicament_id: int) -> bool:
+        """Supprimer un médicament"""
+        medicament = await AsyncMedicamentRepository.find_by_id(db, medicament_id)
+        if not medicament:
+            return False
+
+        await db.delete(medicament)
+        await db.commit()
+
+        MedicamentRepository.desindexer(medicament_id)
+        return True
@@ -0,0 +1,170 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from datetime import datetime
+from typing import List, Optional, Tuple
+from models.pharmacie import Pharmacie
+from repositories.pharmacie_repository import PharmacieRepository
+
+class AsyncPharmacieRepository:
+    """
+    Version asynchrone (AsyncSession) de PharmacieRepository pour les routes,
+    avec les mêmes requêtes
+    """
+
+    @staticmethod
+    async def find_by_id(db: AsyncSession, pharmacie_id: int) -> Optional[Pharmacie]:
+        """Trouver une pharmacie par ID"""
+        result = await db.execute(
+            select(Pharmacie).where(Pharmacie.id == pharmacie_id)
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_version(db: AsyncSession, pharmacie_id: int) -> Optional[Tuple[Optional[datetime]]]:
+        """
+        (dernière modification,) d'une pharmacie sans charger l'objet,
+        None si elle n'existe pas
+        """
+        result = await db.execute(
+            select(Pharmacie.updated_at).where(Pharmacie.id == pharmacie_id)
+        )
+        row = result.first()
+        return tuple(row) if row is not None else None
+
+    @staticmethod
+    async def get_detail(db: AsyncSession, pharmacie_id: int) -> Optional[dict]:
+        """Fiche d'une pharmacie, coordonnées extraites du point"""
+        result = await db.execute(
+            text(f"""
+                SELECT {PharmacieRepository.COLONNES_DETAIL}
+                FROM pharmacies p
+                WHERE p.id = :id
+            """),
+            {"id": pharmacie_id}
+        )
+        row = result.first()
+        return dict(row._mapping) if row is not None else None
+
+    @staticmethod
+    async def get_marqueurs(db: AsyncSession) -> List[Tuple[int, float, float, Optional[str]]]:
+        """Marqueurs de toutes les pharmacies actives (index de la carte)"""
+        result = await db.execute(text(PharmacieRepository.REQUETE_MARQUEURS))
+        return [tuple(row) for row in result]
+
+    @staticmethod
+    async def get_tuile(db: AsyncSession, z: int, x: int, y: int) -> bytes:
+        """Contenu MVT de la tuile (vide si aucune pharmacie)"""
+        result = await db.execute(
+            PharmacieRepository.requete_tuile(),
+            PharmacieRepository.parametres_tuile(z, x, y)
+        )
+        contenu = result.scalar()
+        return bytes(contenu) if contenu else b""
+
+    @staticmethod
+    async def search_by_ids(
+        db: AsyncSession,
+        pharmacie_ids: List[int],
+        medicament_nom: str,
+        medicament_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Parmi les pharmacies candidates fournies par l'index spatial,
+        celles qui ont le médicament en stock
+        """
+        if not pharmacie_ids or medicament_ids == []:
+            return []
+
+        filtre, parametres = PharmacieRepository.filtre_medicament(
+            medicament_nom, medicament_ids
+        )
+        result = await db.execute(
+            PharmacieRepository.requete_par_ids(filtre),
+            {"ids": list(pharmacie_ids), **parametres}
+        )
+
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    async def search_with_medicament(
+        db: AsyncSession,
+        medicament_nom: str,
+        latitude: float,
+        longitude: float,
+        rayon_metres: int = 5000,
+        medicament_ids: Optional[List[int]] = None,
+        limite: int = 20
+    ) -> List[dict]:
+        """
+        Rechercher les pharmacies ayant le médicament dans le rayon (PostGIS)
+        """
+        if medicament_ids == []:
+            return []
+
+        filtre, parametres = PharmacieRepository.filtre_medicament(
+            medicament_nom, medicament_ids
+        )
+        result = await db.execute(PharmacieRepository.requete_recherche(filtre), {
+            "latitude": latitude,
+            "longitude": longitude,
+            "rayon_metres": float(rayon_metres),
+            "limite": limite,
+            **parametres
+        })
+
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    async def search_plus_proches(
+        db: AsyncSession,
+        medicament_nom: str,
+        latitude: float,
+        longitude: float,
+        limite: int,
+        rayon_max_metres: float,
+        garde_uniquement: bool = False,
+        medicament_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Les `limite` pharmacies les plus proches ayant le médicament (KNN PostGIS)
+        """
+        if medicament_ids == []:
+            return []
+
+        filtre, parametres = PharmacieRepository.parametres_plus_proches(
+            medicament_nom, latitude, longitude, limite, rayon_max_metres, medicament_ids
+        )
+        result = await db.execute(
+            PharmacieRepository.requete_plus_proches(filtre, garde_uniquement),
+            parametres
+        )
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    async def search_ordonnance(
+        db: AsyncSession,
+        medicaments: List[str],
+        latitude: float,
+        longitude: float,
+        rayon_metres: int = 5000,
+        medicament_ids: Optional[List[List[int]]] = None,
+        pharmacie_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Offres des pharmacies de la zone pour chaque item d'une ordonnance
+        (voir PharmacieRepository.search_ordonnance)
+        """
+        if pharmacie_ids == []:
+            return []
+
+        items, parametres = PharmacieRepository.parametres_ordonnance(
+            medicaments, medicament_ids, latitude, longitude, rayon_metres, pharmacie_ids
+        )
+        if not parametres["items"]:
+            return []
+
+        result = await db.execute(
+            PharmacieRepository.requete_ordonnance(items, pharmacie_ids is not None),
+            parametres
+        )
+        return [dict(row._mapping) for row in result]
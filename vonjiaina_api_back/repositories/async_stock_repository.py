@@ -0,0 +1,55 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, List, Optional, Set, Tuple
+from repositories.stock_repository import StockRepository
+
+class AsyncStockRepository:
+    """
+    Version asynchrone (AsyncSession) des écritures en masse de
+    StockRepository, avec les mêmes requêtes
+    """
+
+    @staticmethod
+    async def upsert_many(db: AsyncSession, lignes: List[dict]) -> List[Tuple[int, int, bool]]:
+        """Créer ou mettre à jour un lot de stocks en une requête et une transaction"""
+        if not lignes:
+            return []
+        result = await db.execute(StockRepository.requete_upsert_many(lignes))
+        resultats = [tuple(row) for row in result]
+        await db.commit()
+        StockRepository.invalider_cache_pharmacies({r[0] for r in resultats})
+        return resultats
+
+    @staticmethod
+    async def ids_existants(
+        db: AsyncSession,
+        pharmacie_ids: Iterable[int],
+        medicament_ids: Iterable[int]
+    ) -> Tuple[Set[int], Set[int]]:
+        """Parmi les IDs donnés, ceux des pharmacies et médicaments qui existent"""
+        pharmacies, medicaments = StockRepository.requetes_ids_existants(
+            pharmacie_ids, medicament_ids
+        )
+        return (
+            set((await db.execute(pharmacies)).scalars()),
+            set((await db.execute(medicaments)).scalars())
+        )
+
+    @staticmethod
+    async def changements(
+        db: AsyncSession,
+        apres: Optional[Tuple[int, int]],
+        limite: int
+    ) -> List[dict]:
+        """Stocks modifiés après le curseur (xid_ecriture, id)"""
+        result = await db.execute(StockRepository.requete_changements(apres, limite))
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    async def suppressions(
+        db: AsyncSession,
+        apres: Optional[Tuple[int, int]],
+        limite: int
+    ) -> List[dict]:
+        """Stocks supprimés après le curseur (xid_ecriture, id)"""
+        result = await db.execute(StockRepository.requete_suppressions(apres, limite))
+        return [dict(row._mapping) for row in result]
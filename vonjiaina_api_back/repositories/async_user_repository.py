@@ -0,0 +1,56 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+from models.user import User
+from utils.auth_cache import user_cache
+
+class AsyncUserRepository:
+    """
+    Version asynchrone (AsyncSession) de UserRepository pour les routes
+    """
+
+    @staticmethod
+    async def create(db: AsyncSession, **kwargs) -> User:
+        """Créer un utilisateur"""
+        user = User(**kwargs)
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalider(user.email)
+        return user
+
+    @staticmethod
+    async def find_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        """Trouver un utilisateur par email"""
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    @staticmethod
+    async def find_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        """Trouver un utilisateur par ID"""
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+
+    @staticmethod
+    async def update_password(db: AsyncSession, user: User, hashed_password: str) -> User:
+        """Remplacer le hash du mot de passe (ex: coût bcrypt relevé)"""
+        user.hashed_password = hashed_password
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalider(user.email)
+        return user
+
+    @staticmethod
+    async def update(db: AsyncSession, user_id: int, **kwargs) -> Optional[User]:
+        """Mettre à jour un utilisateur (rôle, pharmacie, activation...)"""
+        user = await AsyncUserRepository.find_by_id(db, user_id)
+        if user is None:
+            return None
+        ancien_email = user.email
+        for key, value in kwargs.items():
+            setattr(user, key, value)
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalider(ancien_email)
+        user_cache.invalider(user.email)
+        return user
@@ -1,6 +1,24 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import or_, func, select
+from typing import Dict, Iterator, List, Optional, Tuple
 from models.medicament import Medicament
+from models.stock import Stock
+from utils.medicament_index import medicament_index
+from utils.suggestion_index import suggestion_index
+from utils.search_cache import search_cache
+
+# Caractère d'échappement des motifs LIKE / ILIKE
+ECHAPPEMENT_LIKE = "\\"
+
+
+def motif_contient(texte: str) -> str:
+    """
+    Motif ILIKE "contient `texte`" : %, _ et \\ saisis par l'utilisateur
+    sont échappés (à utiliser avec ESCAPE '\\')
+    """
+    for caractere in (ECHAPPEMENT_LIKE, "%", "_"):
+        texte = texte.replace(caractere, ECHAPPEMENT_LIKE + caractere)
+    return f"%{texte}%"
 
 class MedicamentRepository:
     
@@ -11,24 +29,135 @@ class MedicamentRepository:
         db.add(medicament)
         db.commit()
         db.refresh(medicament)
+
+        MedicamentRepository.indexer(medicament, creation=True)
         return medicament
     
+    @staticmethod
+    def requete_find_by_id(medicament_id: int):
+        return select(Medicament).where(Medicament.id == medicament_id)
+
     @staticmethod
     def find_by_id(db: Session, medicament_id: int) -> Optional[Medicament]:
         """Trouver un médicament par ID"""
-        return db.query(Medicament).filter(Medicament.id == medicament_id).first()
+        return db.execute(
+            MedicamentRepository.requete_find_by_id(medicament_id)
+        ).scalars().first()
+
+    @staticmethod
+    def requete_recherche_ilike(nom: str, limit: int):
+        """Recherche ILIKE (servie par les index pg_trgm), avant le chargement de l'index"""
+        return select(Medicament).where(
+            or_(
+                Medicament.nom_commercial.ilike(motif_contient(nom), escape=ECHAPPEMENT_LIKE),
+                Medicament.dci.ilike(motif_contient(nom), escape=ECHAPPEMENT_LIKE)
+            )
+        ).limit(limit)
+
+    @staticmethod
+    def requete_par_ids(medicament_ids: List[int]):
+        return select(Medicament).where(Medicament.id.in_(medicament_ids))
+
+    @staticmethod
+    def trier_par_score(medicaments: List[Medicament], scores: Dict[int, float]) -> List[Medicament]:
+        medicaments.sort(key=lambda m: scores[m.id], reverse=True)
+        return medicaments
     
     @staticmethod
-    def find_by_name(db: Session, nom: str) -> List[Medicament]:
-        """Rechercher par nom commercial"""
-        return db.query(Medicament).filter(
-            Medicament.nom_commercial.ilike(f"%{nom}%")
+    def find_by_name(db: Session, nom: str, limit: int = 20) -> List[Medicament]:
+        """
+        Rechercher par nom commercial ou DCI, avec tolérance aux fautes
+        et aux accents (index trigrammes en mémoire), par pertinence
+        """
+        if not medicament_index.est_charge:
+            return list(db.execute(
+                MedicamentRepository.requete_recherche_ilike(nom, limit)
+            ).scalars().all())
+
+        scores = dict(medicament_index.rechercher(nom, limite=limit))
+        if not scores:
+            return []
+
+        medicaments = list(db.execute(
+            MedicamentRepository.requete_par_ids(list(scores))
+        ).scalars().all())
+        return MedicamentRepository.trier_par_score(medicaments, scores)
+
+    @staticmethod
+    def get_noms(db: Session) -> List[Tuple[int, str, Optional[str]]]:
+        """Noms (id, nom_commercial, dci) de tous les médicaments"""
+        return db.query(
+            Medicament.id,
+            Medicament.nom_commercial,
+            Medicament.dci
         ).all()
+
+    @staticmethod
+    def get_popularite(db: Session) -> Dict[int, float]:
+        """Nombre de pharmacies ayant chaque médicament en stock"""
+        rows = db.query(
+            Stock.medicament_id,
+            func.count(Stock.id)
+        ).filter(
+            Stock.quantite > 0
+        ).group_by(Stock.medicament_id).all()
+        return {medicament_id: float(nb) for medicament_id, nb in rows}
     
+    # Colonnes de l'export du catalogue (celles de MedicamentResponse)
+    COLONNES_EXPORT = (
+        Medicament.id,
+        Medicament.nom_commercial,
+        Medicament.dci,
+        Medicament.laboratoire,
+        Medicament.forme,
+        Medicament.dosage,
+        Medicament.description
+    )
+
+    # Lignes lues par aller-retour avec le curseur côté serveur
+    TAILLE_LOT_EXPORT = 1000
+
+    @staticmethod
+    def requete_get_all(skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+        query = select(Medicament).order_by(Medicament.id)
+        if after_id is not None:
+            query = query.where(Medicament.id > after_id)
+        else:
+            query = query.offset(skip)
+        return query.limit(limit)
+
+    @staticmethod
+    def get_all(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None
+    ) -> List[Medicament]:
+        """
+        Obtenir les médicaments par ID croissant
+
+        Avec `after_id` (pagination par clé), la page commence juste après
+        cet ID : coût constant quelle que soit la profondeur, contrairement
+        à `skip` (OFFSET)
+        """
+        return list(db.execute(
+            MedicamentRepository.requete_get_all(skip, limit, after_id)
+        ).scalars().all())
+
+    @staticmethod
+    def requete_export():
+        return select(*MedicamentRepository.COLONNES_EXPORT).order_by(
+            Medicament.id
+        ).execution_options(yield_per=MedicamentRepository.TAILLE_LOT_EXPORT)
+
     @staticmethod
-    def get_all(db: Session, skip: int = 0, limit: int = 100) -> List[Medicament]:
-        """Obtenir tous les médicaments"""
-        return db.query(Medicament).offset(skip).limit(limit).all()
+    def iter_export(db: Session) -> Iterator[dict]:
+        """
+        Tout le catalogue, ligne par ligne depuis un curseur côté serveur
+        (yield_per) : mémoire constante quelle que soit sa taille
+        """
+        for row in db.execute(MedicamentRepository.requete_export()):
+            yield dict(row._mapping)
     
     @staticmethod
     def update(db: Session, medicament_id: int, **kwargs) -> Optional[Medicament]:
@@ -37,12 +166,11 @@ class MedicamentRepository:
         if not medicament:
             return None
         
-        for key, value in kwargs.items():
-            if value is not None:
-                setattr(medicament, key, value)
-        
+        MedicamentRepository.modifier(medicament, kwargs)
         db.commit()
         db.refresh(medicament)
+
+        MedicamentRepository.indexer(medicament)
         return medicament
     
     @staticmethod
@@ -54,4 +182,37 @@ class MedicamentRepository:
         
         db.delete(medicament)
         db.commit()
-        return True
\ No newline at end of file
+
+        MedicamentRepository.desindexer(medicament_id)
+        return True
+
+    @staticmethod
+    def modifier(medicament: Medicament, valeurs: dict) -> None:
+        """Appliquer une mise à jour partielle (les valeurs None sont ignorées)"""
+        for key, value in valeurs.items():
+            if value is not None:
+                setattr(medicament, key, value)
+
+    # Index en mémoire et cache de recherche, à appeler après commit par
+    # ce repository et par AsyncMedicamentRepository
+
+    @staticmethod
+    def indexer(medicament: Medicament, creation: bool = False) -> None:
+        """
+        Ajouter ou mettre à jour un médicament dans les index en mémoire
+
+        Un médicament créé n'a pas encore de stock : les zones en cache
+        restent valables. Modifié, les entrées qui le contiennent sont
+        invalidées (nom, forme ou dosage affichés).
+        """
+        medicament_index.ajouter(medicament.id, medicament.nom_commercial, medicament.dci)
+        suggestion_index.ajouter(medicament.id, medicament.nom_commercial, medicament.dci)
+        if not creation:
+            search_cache.invalider_medicament(medicament.id)
+
+    @staticmethod
+    def desindexer(medicament_id: int) -> None:
+        """Retirer un médicament supprimé des index en mémoire"""
+        medicament_index.retirer(medicament_id)
+        suggestion_index.retirer(medicament_id)
+        search_cache.invalider_medicament(medicament_id)
@@ -1,64 +1,617 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List
+from geoalchemy2 import WKTElement
+from typing import List, Optional, Tuple
+from models.pharmacie import Pharmacie
+from utils.spatial_index import pharmacie_index
+from utils.horaires import horaires_cache
+from utils.search_cache import search_cache
+from repositories.medicament_repository import motif_contient
+from utils.carte_index import TAILLE_CELLULE_PX, carte_index, tuiles_cache
+
+# Demi-largeur du monde en Web Mercator (EPSG:3857), en mètres
+ORIGINE_MERCATOR = 20037508.342789244
+# Résolution des tuiles vectorielles (unités par côté) et marge autour
+ETENDUE_TUILE = 4096
+MARGE_TUILE = 64
 
 class PharmacieRepository:
-    
+
+    @staticmethod
+    def create(db: Session, latitude: float, longitude: float, **kwargs) -> Pharmacie:
+        """Créer une nouvelle pharmacie"""
+        pharmacie = Pharmacie(
+            location=PharmacieRepository._point(latitude, longitude),
+            **kwargs
+        )
+        db.add(pharmacie)
+        db.commit()
+        db.refresh(pharmacie)
+
+        if pharmacie.actif is not False:
+            pharmacie_index.ajouter(pharmacie.id, latitude, longitude)
+            carte_index.ajouter(pharmacie.id, latitude, longitude, pharmacie.type)
+            tuiles_cache.invalider(latitude, longitude)
+        horaires_cache.compiler(pharmacie.id, pharmacie.updated_at, pharmacie.horaires)
+        return pharmacie
+
+    @staticmethod
+    def find_by_id(db: Session, pharmacie_id: int) -> Optional[Pharmacie]:
+        """Trouver une pharmacie par ID"""
+        return db.query(Pharmacie).filter(Pharmacie.id == pharmacie_id).first()
+
+    @staticmethod
+    def update(db: Session, pharmacie_id: int, **kwargs) -> Optional[Pharmacie]:
+        """Mettre à jour une pharmacie (latitude/longitude déplacent le point)"""
+        pharmacie = PharmacieRepository.find_by_id(db, pharmacie_id)
+        if not pharmacie:
+            return None
+
+        # Ancienne position : les recherches en cache autour sont périmées
+        PharmacieRepository._invalider_cache(pharmacie_id)
+
+        latitude = kwargs.pop("latitude", None)
+        longitude = kwargs.pop("longitude", None)
+        if latitude is not None and longitude is not None:
+            pharmacie.location = PharmacieRepository._point(latitude, longitude)
+
+        for key, value in kwargs.items():
+            if value is not None:
+                setattr(pharmacie, key, value)
+
+        db.commit()
+        db.refresh(pharmacie)
+
+        PharmacieRepository._synchroniser_index(db, pharmacie)
+        PharmacieRepository._invalider_cache(pharmacie.id)
+        horaires_cache.compiler(pharmacie.id, pharmacie.updated_at, pharmacie.horaires)
+        return pharmacie
+
+    @staticmethod
+    def delete(db: Session, pharmacie_id: int) -> bool:
+        """Supprimer une pharmacie"""
+        pharmacie = PharmacieRepository.find_by_id(db, pharmacie_id)
+        if not pharmacie:
+            return False
+
+        db.delete(pharmacie)
+        db.commit()
+
+        PharmacieRepository._invalider_cache(pharmacie_id)
+        pharmacie_index.retirer(pharmacie_id)
+        carte_index.retirer(pharmacie_id)
+        horaires_cache.retirer(pharmacie_id)
+        return True
+
+    @staticmethod
+    def get_coordonnees(db: Session) -> List[Tuple[int, float, float]]:
+        """Coordonnées (id, latitude, longitude) des pharmacies actives"""
+        result = db.execute(text("""
+            SELECT
+                p.id,
+                ST_Y(p.location::geometry) AS latitude,
+                ST_X(p.location::geometry) AS longitude
+            FROM pharmacies p
+            WHERE p.actif IS NOT FALSE
+        """))
+        return [tuple(row) for row in result]
+
+    # Marqueurs de la carte : (id, latitude, longitude, type) des pharmacies actives
+    REQUETE_MARQUEURS = """
+            SELECT
+                p.id,
+                ST_Y(p.location::geometry) AS latitude,
+                ST_X(p.location::geometry) AS longitude,
+                p.type
+            FROM pharmacies p
+            WHERE p.actif IS NOT FALSE
+    """
+
+    @staticmethod
+    def get_marqueurs(db: Session) -> List[Tuple[int, float, float, Optional[str]]]:
+        """Marqueurs de toutes les pharmacies actives (index de la carte)"""
+        result = db.execute(text(PharmacieRepository.REQUETE_MARQUEURS))
+        return [tuple(row) for row in result]
+
+    @staticmethod
+    def requete_tuile():
+        """
+        Tuile vectorielle z/x/y (ST_AsMVT, couche "pharmacies")
+
+        Les pharmacies de la tuile sont regroupées par cellules de
+        :cellule mètres (TAILLE_CELLULE_PX pixels, comme l'index de la
+        carte) : centroïde, nombre, nombre de garde, id si seule.
+        """
+        return text("""
+            WITH bornes AS (
+                SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+            ),
+            points AS (
+                SELECT p.id, p.type, ST_Transform(p.location::geometry, 3857) AS geom
+                FROM pharmacies p, bornes b
+                WHERE
+                    p.actif IS NOT FALSE
+                    AND p.location && ST_Transform(b.geom, 4326)::geography
+            ),
+            groupes AS (
+                SELECT
+                    COUNT(*) AS nombre,
+                    COUNT(*) FILTER (WHERE pt.type = 'garde') AS nombre_garde,
+                    CASE WHEN COUNT(*) = 1 THEN MIN(pt.id) END AS id,
+                    ST_AsMVTGeom(
+                        ST_Centroid(ST_Collect(pt.geom)), b.geom, :etendue, :marge, true
+                    ) AS geom
+                FROM points pt, bornes b
+                WHERE ST_Intersects(pt.geom, b.geom)
+                GROUP BY
+                    floor((ST_X(pt.geom) + :origine) / :cellule),
+                    floor((ST_Y(pt.geom) + :origine) / :cellule),
+                    b.geom
+            )
+            SELECT ST_AsMVT(groupes, 'pharmacies', :etendue, 'geom')
+            FROM groupes
+        """)
+
+    @staticmethod
+    def parametres_tuile(z: int, x: int, y: int) -> dict:
+        return {
+            "z": z,
+            "x": x,
+            "y": y,
+            "cellule": 2 * ORIGINE_MERCATOR / 2 ** z * TAILLE_CELLULE_PX / 256,
+            "origine": ORIGINE_MERCATOR,
+            "etendue": ETENDUE_TUILE,
+            "marge": MARGE_TUILE,
+        }
+
+    @staticmethod
+    def get_tuile(db: Session, z: int, x: int, y: int) -> bytes:
+        """Contenu MVT de la tuile (vide si aucune pharmacie)"""
+        contenu = db.execute(
+            PharmacieRepository.requete_tuile(),
+            PharmacieRepository.parametres_tuile(z, x, y)
+        ).scalar()
+        return bytes(contenu) if contenu else b""
+
+    @staticmethod
+    def compiler_horaires(db: Session) -> int:
+        """Compiler les horaires de toutes les pharmacies actives (au démarrage)"""
+        result = db.execute(text("""
+            SELECT p.id, p.updated_at, p.horaires
+            FROM pharmacies p
+            WHERE p.actif IS NOT FALSE
+        """))
+        nb = 0
+        for pharmacie_id, updated_at, horaires in result:
+            horaires_cache.compiler(pharmacie_id, updated_at, horaires)
+            nb += 1
+        return nb
+
+    @staticmethod
+    def _point(latitude: float, longitude: float) -> WKTElement:
+        # WKT : longitude d'abord
+        return WKTElement(f"POINT({longitude} {latitude})", srid=4326)
+
+    @staticmethod
+    def _invalider_cache(pharmacie_id: int) -> None:
+        """Invalider les recherches et les tuiles en cache couvrant la position indexée"""
+        position = pharmacie_index.position(pharmacie_id)
+        if position is not None:
+            search_cache.invalider(*position)
+            tuiles_cache.invalider(*position)
+
+    @staticmethod
+    def _synchroniser_index(db: Session, pharmacie: Pharmacie) -> None:
+        """Répercuter la position / l'activité d'une pharmacie dans l'index"""
+        if pharmacie.actif is False:
+            pharmacie_index.retirer(pharmacie.id)
+            carte_index.retirer(pharmacie.id)
+            return
+
+        row = db.execute(
+            text("""
+                SELECT ST_Y(location::geometry), ST_X(location::geometry)
+                FROM pharmacies WHERE id = :id
+            """),
+            {"id": pharmacie.id}
+        ).first()
+        if row:
+            pharmacie_index.ajouter(pharmacie.id, row[0], row[1])
+            carte_index.ajouter(pharmacie.id, row[0], row[1], pharmacie.type)
+
+    # Colonnes de la fiche d'une pharmacie (PharmacieDetailResponse)
+    COLONNES_DETAIL = """
+                p.id,
+                p.nom,
+                p.adresse,
+                p.telephone,
+                p.email,
+                p.type,
+                ST_Y(p.location::geometry) AS latitude,
+                ST_X(p.location::geometry) AS longitude,
+                p.horaires,
+                COALESCE(p.actif, TRUE) AS actif,
+                p.created_at,
+                p.updated_at
+    """
+
+    # Colonnes renvoyées par les deux chemins de recherche.
+    # Une ligne par pharmacie : le médicament disponible le moins cher
+    # parmi ceux dont le nom ou la DCI correspond.
+    COLONNES_RECHERCHE = """
+                p.id,
+                p.nom,
+                p.adresse,
+                p.telephone,
+                p.type,
+                p.horaires,
+                p.updated_at,
+                ST_Y(p.location::geometry) AS latitude,
+                ST_X(p.location::geometry) AS longitude,
+                s.prix,
+                s.quantite,
+                s.date_maj,
+                m.id AS medicament_id,
+                m.nom_commercial,
+                m.forme,
+                m.dosage
+    """
+
+    # medicaments -> stocks (ux_stocks_medicament_pharmacie) -> pharmacies
+    JOINTURE_STOCK = """
+            FROM medicaments m
+            JOIN stocks s
+                ON s.medicament_id = m.id
+                AND s.quantite > 0
+            JOIN pharmacies p
+                ON p.id = s.pharmacie_id
+    """
+
+    # Médicament désigné par son nom (ILIKE) ou par des IDs déjà résolus
+    FILTRE_MEDICAMENT = """
+                (m.nom_commercial ILIKE :motif ESCAPE '\\' OR m.dci ILIKE :motif ESCAPE '\\')
+                AND p.actif IS NOT FALSE
+    """
+    FILTRE_MEDICAMENT_IDS = """
+                m.id = ANY(:medicament_ids)
+                AND p.actif IS NOT FALSE
+    """
+
+    @staticmethod
+    def filtre_medicament(
+        medicament_nom: str,
+        medicament_ids: Optional[List[int]]
+    ) -> Tuple[str, dict]:
+        """Clause WHERE et paramètres désignant le médicament recherché"""
+        if medicament_ids is not None:
+            return PharmacieRepository.FILTRE_MEDICAMENT_IDS, {
+                "medicament_ids": list(medicament_ids)
+            }
+        return PharmacieRepository.FILTRE_MEDICAMENT, {
+            "motif": motif_contient(medicament_nom)
+        }
+
+    @staticmethod
+    def search_by_ids(
+        db: Session,
+        pharmacie_ids: List[int],
+        medicament_nom: str,
+        medicament_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Parmi les pharmacies candidates fournies par l'index spatial,
+        celles qui ont le médicament en stock (la distance est calculée
+        par l'index, pas en SQL)
+        """
+        if not pharmacie_ids or medicament_ids == []:
+            return []
+
+        filtre, parametres = PharmacieRepository.filtre_medicament(
+            medicament_nom, medicament_ids
+        )
+        result = db.execute(
+            PharmacieRepository.requete_par_ids(filtre),
+            {"ids": list(pharmacie_ids), **parametres}
+        )
+
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def requete_par_ids(filtre: str = FILTRE_MEDICAMENT):
+        """
+        Requête de disponibilité sur une liste de pharmacies candidates
+        """
+        return text(f"""
+            SELECT DISTINCT ON (p.id)
+                {PharmacieRepository.COLONNES_RECHERCHE}
+            {PharmacieRepository.JOINTURE_STOCK}
+            WHERE
+                {filtre}
+                AND p.id = ANY(:ids)
+            ORDER BY p.id, s.prix ASC NULLS LAST
+        """)
+
+    @staticmethod
+    def requete_recherche(filtre: str = FILTRE_MEDICAMENT):
+        """
+        Requête de recherche par rayon (ST_DWithin sur la colonne location,
+        servie par l'index GiST idx_pharmacies_location), limitée aux
+        pharmacies ayant le médicament en stock
+        """
+        return text(f"""
+            SELECT * FROM (
+                SELECT DISTINCT ON (p.id)
+                    {PharmacieRepository.COLONNES_RECHERCHE},
+                    ST_Distance(
+                        p.location,
+                        ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography
+                    ) AS distance
+                {PharmacieRepository.JOINTURE_STOCK}
+                WHERE
+                    {filtre}
+                    AND ST_DWithin(
+                        p.location,
+                        ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography,
+                        :rayon_metres
+                    )
+                ORDER BY p.id, s.prix ASC NULLS LAST
+            ) resultats
+            ORDER BY distance ASC
+            LIMIT :limite
+        """)
+
     @staticmethod
     def search_with_medicament(
-        db: Session, 
-        medicament_nom: str, 
-        latitude: float, 
-        longitude: float, 
+        db: Session,
+        medicament_nom: str,
+        latitude: float,
+        longitude: float,
         rayon_metres: int = 5000,
-        filtre_statut: str = None  # "garde", "ouverte", ou None
+        filtre_statut: str = None,  # "garde", "ouverte", ou None
+        medicament_ids: Optional[List[int]] = None,
+        limite: int = 20
     ) -> List[dict]:
         """
-        Rechercher les pharmacies avec calcul du statut en temps réel
+        Rechercher les pharmacies ayant le médicament dans le rayon
+        (chemin PostGIS, utilisé tant que l'index spatial n'est pas chargé)
+        """
+        if medicament_ids == []:
+            return []
+
+        filtre, parametres = PharmacieRepository.filtre_medicament(
+            medicament_nom, medicament_ids
+        )
+        result = db.execute(PharmacieRepository.requete_recherche(filtre), {
+            "latitude": latitude,
+            "longitude": longitude,
+            "rayon_metres": rayon_metres,
+            "limite": limite,
+            **parametres
+        })
+
+        return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def requete_plus_proches(filtre: str = FILTRE_MEDICAMENT, garde_uniquement: bool = False):
+        """
+        Les pharmacies les plus proches ayant le médicament (KNN)
+
+        ORDER BY location <-> point parcourt l'index GiST du plus proche au
+        plus lointain ; pour chacune, le LATERAL cherche le stock le moins
+        cher par ux_stocks_medicament_pharmacie. Le parcours s'arrête à
+        :limite pharmacies trouvées, ou à :rayon_max_metres.
         """
-        rayon_km = rayon_metres / 1000
-        
-        query = text(f"""
-            SELECT 
+        return text(f"""
+            SELECT
                 p.id,
                 p.nom,
                 p.adresse,
                 p.telephone,
-                p.statut as type,
+                p.type,
                 p.horaires,
-                p.latitude,
-                p.longitude,
-                (6371 * acos(cos(radians({latitude})) * cos(radians(p.latitude)) * 
-                 cos(radians(p.longitude) - radians({longitude})) + 
-                 sin(radians({latitude})) * sin(radians(p.latitude)))) as distance,
-                1000 as prix,
-                10 as quantite,
-                '{medicament_nom}' as nom_commercial,
-                'comprimé' as forme,
-                '500mg' as dosage
+                p.updated_at,
+                ST_Y(p.location::geometry) AS latitude,
+                ST_X(p.location::geometry) AS longitude,
+                o.prix,
+                o.quantite,
+                o.date_maj,
+                o.medicament_id,
+                o.nom_commercial,
+                o.forme,
+                o.dosage,
+                ST_Distance(
+                    p.location,
+                    ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography
+                ) AS distance
             FROM pharmacies p
-            WHERE 
-                (6371 * acos(cos(radians({latitude})) * cos(radians(p.latitude)) * 
-                 cos(radians(p.longitude) - radians({longitude})) + 
-                 sin(radians({latitude})) * sin(radians(p.latitude)))) <= {rayon_km}
-            ORDER BY distance ASC
-            LIMIT 20
+            CROSS JOIN LATERAL (
+                SELECT
+                    s.prix,
+                    s.quantite,
+                    s.date_maj,
+                    m.id AS medicament_id,
+                    m.nom_commercial,
+                    m.forme,
+                    m.dosage
+                FROM stocks s
+                JOIN medicaments m ON m.id = s.medicament_id
+                WHERE
+                    s.pharmacie_id = p.id
+                    AND s.quantite > 0
+                    AND {filtre}
+                ORDER BY s.prix ASC NULLS LAST
+                LIMIT 1
+            ) o
+            WHERE
+                p.actif IS NOT FALSE
+                {"AND p.type = 'garde'" if garde_uniquement else ""}
+                AND ST_DWithin(
+                    p.location,
+                    ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography,
+                    :rayon_max_metres
+                )
+            ORDER BY p.location <-> ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography
+            LIMIT :limite
         """)
-        
-        result = db.execute(query)
-        
-        pharmacies = []
-        
-        for row in result:
-            pharmacie = dict(row._mapping)
-            
-            # Statut simple basé sur le champ statut
-            statut_actuel = pharmacie.get('type', 'normal')
-            if statut_actuel == 'garde':
-                pharmacie['statut'] = 'garde'
-            else:
-                pharmacie['statut'] = 'ouverte'  # Simplifié
-            
-            pharmacies.append(pharmacie)
-        
-        return pharmacies
+
+    @staticmethod
+    def parametres_plus_proches(
+        medicament_nom: str,
+        latitude: float,
+        longitude: float,
+        limite: int,
+        rayon_max_metres: float,
+        medicament_ids: Optional[List[int]]
+    ) -> Tuple[str, dict]:
+        filtre, parametres = PharmacieRepository.filtre_medicament(
+            medicament_nom, medicament_ids
+        )
+        return filtre, {
+            "latitude": latitude,
+            "longitude": longitude,
+            "rayon_max_metres": float(rayon_max_metres),
+            "limite": limite,
+            **parametres
+        }
+
+    @staticmethod
+    def search_plus_proches(
+        db: Session,
+        medicament_nom: str,
+        latitude: float,
+        longitude: float,
+        limite: int,
+        rayon_max_metres: float,
+        garde_uniquement: bool = False,
+        medicament_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Les `limite` pharmacies les plus proches ayant le médicament, à
+        moins de `rayon_max_metres` (chemin PostGIS, sans index en mémoire)
+        """
+        if medicament_ids == []:
+            return []
+
+        filtre, parametres = PharmacieRepository.parametres_plus_proches(
+            medicament_nom, latitude, longitude, limite, rayon_max_metres, medicament_ids
+        )
+        result = db.execute(
+            PharmacieRepository.requete_plus_proches(filtre, garde_uniquement),
+            parametres
+        )
+        return [dict(row._mapping) for row in result]
+
+    # Ordonnance : une ligne (numéro d'item, médicament) par ID résolu,
+    # ou (numéro d'item, motif ILIKE) tant que l'index n'est pas chargé
+    ITEMS_ORDONNANCE_IDS = """
+            FROM unnest(CAST(:items AS integer[]), CAST(:medicament_ids AS integer[]))
+                AS o(item, medicament_id)
+            JOIN medicaments m
+                ON m.id = o.medicament_id
+    """
+    ITEMS_ORDONNANCE_MOTIFS = """
+            FROM unnest(CAST(:items AS integer[]), CAST(:motifs AS text[]))
+                AS o(item, motif)
+            JOIN medicaments m
+                ON m.nom_commercial ILIKE o.motif ESCAPE '\\' OR m.dci ILIKE o.motif ESCAPE '\\'
+    """
+
+    @staticmethod
+    def requete_ordonnance(items: str, par_ids: bool):
+        """
+        Pour chaque pharmacie de la zone et chaque médicament de
+        l'ordonnance qu'elle a en stock, l'offre la moins chère
+
+        Zone : les candidates de l'index spatial (par_ids) ou le rayon
+        ST_DWithin (index GiST)
+        """
+        zone = "p.id = ANY(:ids)" if par_ids else """ST_DWithin(
+                    p.location,
+                    ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography,
+                    :rayon_metres
+                )"""
+        return text(f"""
+            SELECT DISTINCT ON (p.id, o.item)
+                o.item,
+                {PharmacieRepository.COLONNES_RECHERCHE},
+                ST_Distance(
+                    p.location,
+                    ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography
+                ) AS distance
+            {items}
+            JOIN stocks s
+                ON s.medicament_id = m.id
+                AND s.quantite > 0
+            JOIN pharmacies p
+                ON p.id = s.pharmacie_id
+            WHERE
+                p.actif IS NOT FALSE
+                AND {zone}
+            ORDER BY p.id, o.item, s.prix ASC NULLS LAST
+        """)
+
+    @staticmethod
+    def parametres_ordonnance(
+        medicaments: List[str],
+        medicament_ids: Optional[List[List[int]]],
+        latitude: float,
+        longitude: float,
+        rayon_metres: int,
+        pharmacie_ids: Optional[List[int]]
+    ) -> Tuple[str, dict]:
+        """Source des items et paramètres de requete_ordonnance"""
+        parametres = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "rayon_metres": float(rayon_metres),
+        }
+        if pharmacie_ids is not None:
+            parametres["ids"] = list(pharmacie_ids)
+
+        if medicament_ids is not None:
+            paires = [
+                (item, medicament_id)
+                for item, ids in enumerate(medicament_ids)
+                for medicament_id in ids
+            ]
+            parametres["items"] = [item for item, _ in paires]
+            parametres["medicament_ids"] = [medicament_id for _, medicament_id in paires]
+            return PharmacieRepository.ITEMS_ORDONNANCE_IDS, parametres
+
+        parametres["items"] = list(range(len(medicaments)))
+        parametres["motifs"] = [motif_contient(nom) for nom in medicaments]
+        return PharmacieRepository.ITEMS_ORDONNANCE_MOTIFS, parametres
+
+    @staticmethod
+    def search_ordonnance(
+        db: Session,
+        medicaments: List[str],
+        latitude: float,
+        longitude: float,
+        rayon_metres: int = 5000,
+        medicament_ids: Optional[List[List[int]]] = None,
+        pharmacie_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        """
+        Offres (une ligne par pharmacie et par item de l'ordonnance) des
+        pharmacies de la zone, en une seule requête
+
+        Args:
+            medicaments: noms saisis, un par item
+            medicament_ids: IDs résolus par item (None : ILIKE sur les noms)
+            pharmacie_ids: candidates de l'index spatial (None : ST_DWithin)
+        """
+        if pharmacie_ids == []:
+            return []
+
+        items, parametres = PharmacieRepository.parametres_ordonnance(
+            medicaments, medicament_ids, latitude, longitude, rayon_metres, pharmacie_ids
+        )
+        if not parametres["items"]:
+            return []
+
+        result = db.execute(
+            PharmacieRepository.requete_ordonnance(items, pharmacie_ids is not None),
+            parametres
+        )
+        return [dict(row._mapping) for row in result]
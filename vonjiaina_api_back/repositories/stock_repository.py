@@ -1,7 +1,17 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from models.stock import Stock
+from sqlalchemy import func, literal_column, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from typing import Iterable, List, Optional, Set, Tuple
+from models.stock import XID_TRANSACTION, Stock
+from models.stock_supprime import StockSupprime
+from models.pharmacie import Pharmacie
+from models.medicament import Medicament
 from datetime import datetime, timezone
+from utils.spatial_index import pharmacie_index
+from utils.search_cache import search_cache
+
+# Plus ancienne transaction encore en cours pour l'instantané de la requête
+HORIZON_TRANSACTIONS = text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
 
 class StockRepository:
     
@@ -12,6 +22,7 @@ class StockRepository:
         db.add(stock)
         db.commit()
         db.refresh(stock)
+        StockRepository._invalider_cache(stock)
         return stock
     
     @staticmethod
@@ -25,10 +36,10 @@ class StockRepository:
         pharmacie_id: int, 
         medicament_id: int
     ) -> Optional[Stock]:
-        """Trouver un stock par pharmacie et médicament"""
+        """Trouver un stock par pharmacie et médicament (ux_stocks_medicament_pharmacie)"""
         return db.query(Stock).filter(
-            Stock.pharmacie_id == pharmacie_id,
-            Stock.medicament_id == medicament_id
+            Stock.medicament_id == medicament_id,
+            Stock.pharmacie_id == pharmacie_id
         ).first()
     
     @staticmethod
@@ -53,8 +64,27 @@ class StockRepository:
         stock.date_maj = datetime.now(timezone.utc)
         db.commit()
         db.refresh(stock)
+        StockRepository._invalider_cache(stock)
         return stock
     
+    @staticmethod
+    def delete(db: Session, stock_id: int) -> bool:
+        """Supprimer un stock en laissant une trace pour le flux de changements"""
+        stock = StockRepository.find_by_id(db, stock_id)
+        if not stock:
+            return False
+
+        db.add(StockSupprime(
+            stock_id=stock.id,
+            pharmacie_id=stock.pharmacie_id,
+            medicament_id=stock.medicament_id
+        ))
+        db.delete(stock)
+        db.commit()
+
+        StockRepository._invalider_cache(stock)
+        return True
+
     @staticmethod
     def upsert(
         db: Session,
@@ -84,4 +114,119 @@ class StockRepository:
         
         db.commit()
         db.refresh(stock)
-        return stock
\ No newline at end of file
+        StockRepository._invalider_cache(stock)
+        return stock
+
+    @staticmethod
+    def _invalider_cache(stock: Stock) -> None:
+        """Invalider les recherches en cache couvrant la pharmacie du stock"""
+        position = pharmacie_index.position(stock.pharmacie_id)
+        if position is not None:
+            search_cache.invalider(*position, medicament_id=stock.medicament_id)
+
+    @staticmethod
+    def requete_upsert_many(lignes: List[dict]):
+        """
+        Un seul INSERT ... ON CONFLICT DO UPDATE pour tout un lot de lignes
+        {pharmacie_id, medicament_id, quantite, prix} ; un prix absent
+        garde le prix connu. Chaque couple (pharmacie, médicament) ne doit
+        apparaître qu'une fois dans le lot.
+
+        RETURNING : (pharmacie_id, medicament_id, insérée ou mise à jour)
+        """
+        maintenant = datetime.now(timezone.utc)
+        requete = insert(Stock).values([
+            {**ligne, "date_maj": maintenant} for ligne in lignes
+        ])
+        return requete.on_conflict_do_update(
+            index_elements=[Stock.medicament_id, Stock.pharmacie_id],
+            set_={
+                "quantite": requete.excluded.quantite,
+                "prix": func.coalesce(requete.excluded.prix, Stock.prix),
+                "date_maj": requete.excluded.date_maj,
+                # ON CONFLICT DO UPDATE n'applique pas les onupdate du modèle
+                "xid_ecriture": XID_TRANSACTION,
+            }
+        ).returning(
+            Stock.pharmacie_id,
+            Stock.medicament_id,
+            literal_column("xmax = 0").label("inseree")
+        )
+
+    @staticmethod
+    def upsert_many(db: Session, lignes: List[dict]) -> List[Tuple[int, int, bool]]:
+        """Créer ou mettre à jour un lot de stocks en une requête et une transaction"""
+        if not lignes:
+            return []
+        resultats = [tuple(row) for row in db.execute(StockRepository.requete_upsert_many(lignes))]
+        db.commit()
+        StockRepository.invalider_cache_pharmacies({r[0] for r in resultats})
+        return resultats
+
+    @staticmethod
+    def requetes_ids_existants(pharmacie_ids: Iterable[int], medicament_ids: Iterable[int]):
+        return (
+            select(Pharmacie.id).where(Pharmacie.id.in_(list(pharmacie_ids))),
+            select(Medicament.id).where(Medicament.id.in_(list(medicament_ids)))
+        )
+
+    @staticmethod
+    def ids_existants(
+        db: Session,
+        pharmacie_ids: Iterable[int],
+        medicament_ids: Iterable[int]
+    ) -> Tuple[Set[int], Set[int]]:
+        """Parmi les IDs donnés, ceux des pharmacies et médicaments qui existent"""
+        pharmacies, medicaments = StockRepository.requetes_ids_existants(
+            pharmacie_ids, medicament_ids
+        )
+        return set(db.execute(pharmacies).scalars()), set(db.execute(medicaments).scalars())
+
+    @staticmethod
+    def invalider_cache_pharmacies(pharmacie_ids: Iterable[int]) -> None:
+        """Invalider les recherches en cache autour de pharmacies (import en masse)"""
+        for pharmacie_id in pharmacie_ids:
+            position = pharmacie_index.position(pharmacie_id)
+            if position is not None:
+                search_cache.invalider(*position)
+
+    @staticmethod
+    def requete_changements(apres: Optional[Tuple[int, int]], limite: int):
+        """
+        Stocks modifiés après le curseur (xid_ecriture, id), dans l'ordre
+        du curseur (idx_stocks_xid_ecriture_id)
+
+        Seules les transactions antérieures au xmin de l'instantané sont
+        lues : elles sont toutes terminées, et aucune ligne ne pourra plus
+        apparaître avant le curseur rendu. Une transaction longue retarde
+        le flux sans lui faire perdre de changement.
+        """
+        requete = select(
+            Stock.id,
+            Stock.pharmacie_id,
+            Stock.medicament_id,
+            Stock.quantite,
+            Stock.prix,
+            Stock.date_maj,
+            Stock.xid_ecriture
+        ).where(Stock.xid_ecriture < HORIZON_TRANSACTIONS)
+        if apres is not None:
+            requete = requete.where(tuple_(Stock.xid_ecriture, Stock.id) > tuple_(*apres))
+        return requete.order_by(Stock.xid_ecriture, Stock.id).limit(limite)
+
+    @staticmethod
+    def requete_suppressions(apres: Optional[Tuple[int, int]], limite: int):
+        """Traces de suppression après le curseur (xid_ecriture, id)"""
+        requete = select(
+            StockSupprime.id,
+            StockSupprime.stock_id,
+            StockSupprime.pharmacie_id,
+            StockSupprime.medicament_id,
+            StockSupprime.date_suppression,
+            StockSupprime.xid_ecriture
+        ).where(StockSupprime.xid_ecriture < HORIZON_TRANSACTIONS)
+        if apres is not None:
+            requete = requete.where(
+                tuple_(StockSupprime.xid_ecriture, StockSupprime.id) > tuple_(*apres)
+            )
+        return requete.order_by(StockSupprime.xid_ecriture, StockSupprime.id).limit(limite)
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from typing import Optional
 from models.user import User
+from utils.auth_cache import user_cache
 
 class UserRepository:
     
@@ -11,6 +12,7 @@ class UserRepository:
         db.add(user)
         db.commit()
         db.refresh(user)
+        user_cache.invalider(user.email)
         return user
     
     @staticmethod
@@ -21,4 +23,19 @@ class UserRepository:
     @staticmethod
     def find_by_id(db: Session, user_id: int) -> Optional[User]:
         """Trouver un utilisateur par ID"""
-        return db.query(User).filter(User.id == user_id).first()
\ No newline at end of file
+        return db.query(User).filter(User.id == user_id).first()
+
+    @staticmethod
+    def update(db: Session, user_id: int, **kwargs) -> Optional[User]:
+        """Mettre à jour un utilisateur (rôle, pharmacie, activation...)"""
+        user = UserRepository.find_by_id(db, user_id)
+        if user is None:
+            return None
+        ancien_email = user.email
+        for key, value in kwargs.items():
+            setattr(user, key, value)
+        db.commit()
+        db.refresh(user)
+        user_cache.invalider(ancien_email)
+        user_cache.invalider(user.email)
+        return user
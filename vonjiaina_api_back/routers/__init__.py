@@ -5,9 +5,13 @@ Routes API
 from .pharmacies import router as pharmacies_router
 from .medicaments import router as medicaments_router
 from .auth import router as auth_router
+from .stocks import router as stocks_router
+from .admin import router as admin_router
 
 __all__ = [
     "pharmacies_router",
     "medicaments_router",
     "auth_router",
+    "stocks_router",
+    "admin_router",
 ]
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+from app.dependencies import exiger_role
+from app.requetes_lentes import requetes_lentes
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Administration"],
+    dependencies=[Depends(exiger_role("admin"))]
+)
+
+@router.get("/requetes-lentes")
+async def get_requetes_lentes(
+    limit: int = Query(50, ge=1, le=200),
+    avec_plan: bool = Query(False, description="Uniquement celles avec un plan EXPLAIN")
+):
+    """
+    Requêtes SQL lentes des recherches (SQL, paramètres, durée, plan
+    EXPLAIN ANALYZE quand il a été capturé), les plus récentes d'abord
+    """
+    return {
+        "statistiques": requetes_lentes.statistiques(),
+        "requetes": requetes_lentes.dernieres(limit, avec_plan=avec_plan),
+    }
@@ -1,34 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.dependencies import get_current_user
+from models.user import User
 from services.auth import AuthService
+from utils.password_pool import PoolSatureError
 from schemas.user import UserCreate, UserLogin, Token, UserResponse
 
 router = APIRouter(prefix="/auth", tags=["Authentification"])
 
+def _pool_sature(e: PoolSatureError) -> HTTPException:
+    """File de hachage pleine : le client réessaie plus tard"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=UserResponse, status_code=201)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Enregistrer un nouvel utilisateur"""
     try:
-        user = AuthService.register_user(db, user_data)
+        user = await AuthService.register_user_async(db, user_data)
         return user
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PoolSatureError as e:
+        raise _pool_sature(e)
 
 @router.post("/login", response_model=Token)
 async def login(
     credentials: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Se connecter"""
-    user = AuthService.authenticate_user(
-        db, 
-        credentials.email, 
-        credentials.password
-    )
+    try:
+        user = await AuthService.authenticate_user_async(
+            db, 
+            credentials.email, 
+            credentials.password
+        )
+    except PoolSatureError as e:
+        raise _pool_sature(e)
     
     if not user:
         raise HTTPException(
@@ -43,4 +59,9 @@ async def login(
         "access_token": token,
         "token_type": "bearer",
         "user": user
-    }
\ No newline at end of file
+    }
+
+@router.get("/me", response_model=UserResponse)
+async def me(user: User = Depends(get_current_user)):
+    """Utilisateur connecté (token Bearer)"""
+    return user
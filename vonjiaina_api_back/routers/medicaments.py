@@ -1,46 +1,130 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from repositories.medicament_repository import MedicamentRepository
-from schemas.medicament import MedicamentCreate, MedicamentResponse
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.cache_http import MAX_AGE_CATALOGUE, en_tetes, etag, non_modifie, reponse_304
+from app.database import AsyncSessionLocal, get_async_db
+from app.dependencies import exiger_role
+from repositories.async_medicament_repository import AsyncMedicamentRepository
+from schemas.medicament import MedicamentCreate, MedicamentResponse, MedicamentSuggestion
+from utils.suggestion_index import suggestion_index
 
 router = APIRouter(prefix="/medicaments", tags=["Médicaments"])
 
+# Lignes NDJSON regroupées par envoi lors de l'export
+LIGNES_PAR_ENVOI = 500
+
 @router.get("/", response_model=List[MedicamentResponse])
 async def get_medicaments(
-    skip: int = Query(0, ge=0),
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Déconseillé pour les pages profondes : préférer after_id"),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Query(None, ge=0, description="Page suivant cet ID (pagination par clé)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obtenir la liste des médicaments"""
-    medicaments = MedicamentRepository.get_all(db, skip=skip, limit=limit)
+    """
+    Obtenir la liste des médicaments, par ID croissant
+
+    Pagination : passer l'en-tête `X-Next-After-Id` de la réponse dans
+    `after_id` pour obtenir la page suivante (absent sur la dernière page)
+
+    Requêtes conditionnelles : 304 si le catalogue n'a pas changé depuis
+    l'ETag / la date envoyés (If-None-Match / If-Modified-Since) ; l'ETag
+    dépend aussi de la page demandée
+    """
+    modification, nombre = await AsyncMedicamentRepository.get_version_catalogue(db)
+    # Une page par ETag : le validateur d'une page ne vaut pas pour une autre
+    version = etag("catalogue", modification, nombre, skip, limit, after_id)
+    if non_modifie(request, version, modification):
+        return reponse_304(version, modification, MAX_AGE_CATALOGUE)
+
+    medicaments = await AsyncMedicamentRepository.get_all(
+        db, skip=skip, limit=limit, after_id=after_id
+    )
+    response.headers.update(en_tetes(version, modification, MAX_AGE_CATALOGUE))
+    if len(medicaments) == limit:
+        response.headers["X-Next-After-Id"] = str(medicaments[-1].id)
     return medicaments
 
-@router.get("/search")
+async def _export_ndjson():
+    # Session propre au flux : elle vit aussi longtemps que l'envoi
+    async with AsyncSessionLocal() as db:
+        lignes = []
+        async for medicament in AsyncMedicamentRepository.iter_export(db):
+            lignes.append(json.dumps(medicament, ensure_ascii=False))
+            if len(lignes) >= LIGNES_PAR_ENVOI:
+                yield "\n".join(lignes) + "\n"
+                lignes = []
+        if lignes:
+            yield "\n".join(lignes) + "\n"
+
+@router.get("/export")
+async def export_medicaments():
+    """
+    Exporter tout le catalogue en NDJSON (un médicament par ligne),
+    envoyé au fil de la lecture en base
+    """
+    return StreamingResponse(
+        _export_ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="medicaments.ndjson"'}
+    )
+
+@router.get("/search", response_model=List[MedicamentResponse])
 async def search_medicaments(
     nom: str = Query(..., min_length=2),
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Rechercher des médicaments par nom"""
-    medicaments = MedicamentRepository.find_by_name(db, nom)
+    """Rechercher des médicaments par nom commercial ou DCI (fautes tolérées)"""
+    medicaments = await AsyncMedicamentRepository.find_by_name(db, nom, limit=limit)
     return medicaments
 
+@router.get("/suggest", response_model=List[MedicamentSuggestion])
+async def suggest_medicaments(
+    q: str = Query(..., min_length=1),
+    k: int = Query(10, ge=1, le=50)
+):
+    """
+    Autocomplétion par préfixe, par popularité (mémoire uniquement,
+    aucune requête en base)
+    """
+    return suggestion_index.suggerer(q, k)
+
 @router.get("/{medicament_id}", response_model=MedicamentResponse)
 async def get_medicament(
     medicament_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obtenir un médicament par ID"""
-    medicament = MedicamentRepository.find_by_id(db, medicament_id)
+    """Obtenir un médicament par ID (304 si la copie du client est à jour)"""
+    version = await AsyncMedicamentRepository.get_version(db, medicament_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Médicament non trouvé")
+
+    modification, = version
+    valeur_etag = etag("medicament", medicament_id, modification)
+    if non_modifie(request, valeur_etag, modification):
+        return reponse_304(valeur_etag, modification, MAX_AGE_CATALOGUE)
+
+    medicament = await AsyncMedicamentRepository.find_by_id(db, medicament_id)
     if not medicament:
         raise HTTPException(status_code=404, detail="Médicament non trouvé")
+    response.headers.update(en_tetes(valeur_etag, modification, MAX_AGE_CATALOGUE))
     return medicament
 
-@router.post("/", response_model=MedicamentResponse, status_code=201)
+@router.post(
+    "/",
+    response_model=MedicamentResponse,
+    status_code=201,
+    dependencies=[Depends(exiger_role("admin"))]
+)
 async def create_medicament(
     medicament: MedicamentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Créer un nouveau médicament"""
-    return MedicamentRepository.create(db, **medicament.model_dump())
\ No newline at end of file
+    """Créer un nouveau médicament (administrateurs)"""
+    return await AsyncMedicamentRepository.create(db, **medicament.model_dump())
\ No newline at end of file
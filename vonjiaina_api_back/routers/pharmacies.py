@@ -1,22 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from app.database import get_db
-from services.search_service import SearchService
+from app.config import get_settings
+from app.database import get_async_db
+from app.cache_http import MAX_AGE_CARTE, MAX_AGE_PHARMACIE, en_tetes, etag, non_modifie, reponse_304
+from app.serialisation import reponse_typee
+from repositories.async_pharmacie_repository import AsyncPharmacieRepository
+from schemas.pharmacie import CarteResponse, OrdonnanceRequest, PharmacieDetailResponse, RechercheResponse
+from services.carte_service import CarteService
+from services.search_service import RAYON_MAX_KM, SearchService
+from services.ranking_service import PROFILS, TRI_PAR_DEFAUT
+from utils.carte_index import carte_index
+from utils.routage import MODES
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/pharmacies", tags=["Pharmacies"])
 
-@router.get("/search")
+@router.get("/search", response_model=RechercheResponse, response_model_exclude_none=True)
 async def rechercher_pharmacies(
     medicament: str = Query(..., min_length=2, description="Nom du médicament"),
     latitude: float = Query(..., ge=-90, le=90, description="Latitude"),
     longitude: float = Query(..., ge=-180, le=180, description="Longitude"),
-    rayon_km: float = Query(5.0, ge=0.1, le=50, description="Rayon en km"),
+    rayon_km: float = Query(5.0, ge=0.1, le=50, description="Rayon en km (premier anneau en mode k)"),
+    k: Optional[int] = Query(
+        None, ge=1, le=50,
+        description="Les k pharmacies les plus proches, en élargissant la zone si besoin"
+    ),
+    rayon_max_km: float = Query(RAYON_MAX_KM, ge=0.1, le=200, description="Distance maximale en mode k"),
     statut: Optional[str] = Query(
-        None, 
+        None,
+        pattern="^(garde|ouverte)$",
         description="Filtre: 'garde' (pharmacies de garde) ou 'ouverte' (actuellement ouvertes)"
     ),
-    db: Session = Depends(get_db)
+    tri: str = Query(
+        TRI_PAR_DEFAUT,
+        pattern=f"^({'|'.join(PROFILS)})$",
+        description="Tri: 'distance', 'ouverte' (proche et ouverte), 'prix' (moins cher à 3 km), 'garde', 'pertinence'"
+    ),
+    trajet: Optional[str] = Query(
+        None,
+        pattern=f"^({'|'.join(MODES)})$",
+        description="Temps de trajet 'pied' ou 'voiture' sur le réseau routier (si chargé)"
+    ),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Rechercher les pharmacies avec calcul automatique du statut
@@ -26,20 +55,55 @@ async def rechercher_pharmacies(
         * "garde" : uniquement les pharmacies de garde
         * "ouverte" : uniquement les pharmacies actuellement ouvertes
         * null : toutes les pharmacies (avec leur statut)
+    - tri:
+        * "distance" : les plus proches d'abord (par défaut)
+        * "ouverte" : les plus proches parmi les ouvertes, fermées en dernier
+        * "prix" : les moins chères dans un rayon de 3 km
+        * "garde" : uniquement les pharmacies de garde
+        * "pertinence" : compromis distance / ouverture / prix / fraîcheur du stock
+    - k: au lieu d'un rayon fixe, les k plus proches ayant le médicament ;
+      la zone part de `rayon_km` et s'élargit jusqu'à `rayon_max_km`
+      (rayon_recherche_km indique alors la distance couverte)
+    - trajet: "pied" ou "voiture" ; ajoute duree_trajet_min et
+      distance_trajet_km, et classe par durée de trajet avec les tris
+      "distance", "ouverte" et "garde" (trajet_estime si la pharmacie n'est
+      pas atteinte sur le réseau, ou si aucun réseau n'est chargé)
     
     Réponse inclut:
     - statut: "garde", "ouverte", ou "fermée"
     - prochaine_ouverture: si fermée, indique quand elle ouvre
     """
     try:
-        pharmacies = SearchService.rechercher_pharmacies(
-            db=db,
-            medicament=medicament,
-            latitude=latitude,
-            longitude=longitude,
-            rayon_km=rayon_km,
-            filtre_statut=statut
-        )
+        if k is not None:
+            pharmacies, couvert = await SearchService.rechercher_plus_proches_async(
+                db=db,
+                medicament=medicament,
+                latitude=latitude,
+                longitude=longitude,
+                k=k,
+                rayon_km=rayon_km,
+                rayon_max_km=rayon_max_km,
+                filtre_statut=statut,
+                tri=tri
+            )
+            rayon_km = round(couvert / 1000, 2)
+        else:
+            pharmacies = await SearchService.rechercher_pharmacies_async(
+                db=db,
+                medicament=medicament,
+                latitude=latitude,
+                longitude=longitude,
+                rayon_km=rayon_km,
+                filtre_statut=statut,
+                tri=tri
+            )
+
+        if trajet is not None:
+            pharmacies = SearchService.classer_par_trajet(
+                pharmacies, latitude, longitude, trajet, tri,
+                budget_ms=settings.ROUTAGE_BUDGET_MS,
+                trajet_max_min=settings.ROUTAGE_TRAJET_MAX_MIN
+            )
         
         if not pharmacies:
             message = "Aucune pharmacie trouvée"
@@ -48,25 +112,142 @@ async def rechercher_pharmacies(
             elif statut == "ouverte":
                 message = "Aucune pharmacie ouverte actuellement"
             
-            return {
+            return reponse_typee(RechercheResponse, {
                 "message": message,
                 "resultats": []
-            }
+            })
         
-        return {
+        return reponse_typee(RechercheResponse, {
             "message": f"{len(pharmacies)} pharmacie(s) trouvée(s)",
             "rayon_recherche_km": rayon_km,
-            "medicament_recherche": medicament,
             "filtre_statut": statut,
-            "position_utilisateur": {
-                "latitude": latitude,
-                "longitude": longitude
-            },
+            "tri": tri,
             "resultats": pharmacies
-        }
+        })
         
     except Exception as e:
-        print(f"Erreur: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.exception("Échec de la recherche de pharmacies (medicament=%r)", medicament)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ordonnance")
+async def rechercher_ordonnance(
+    ordonnance: OrdonnanceRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Rechercher les médicaments d'une ordonnance en une fois
+
+    Réponse:
+    - completes: pharmacies ayant tous les médicaments, les plus proches d'abord
+    - couverture: si aucune ne les a tous, pharmacies proches qui les ont
+      ensemble (avec les médicaments à acheter dans chacune)
+    - introuvables: médicaments qu'aucune pharmacie du rayon n'a en stock
+    """
+    resultat = await SearchService.rechercher_ordonnance_async(
+        db=db,
+        medicaments=ordonnance.medicaments,
+        latitude=ordonnance.latitude,
+        longitude=ordonnance.longitude,
+        rayon_km=ordonnance.rayon_km
+    )
+
+    if resultat["completes"]:
+        message = f"{len(resultat['completes'])} pharmacie(s) avec toute l'ordonnance"
+    elif resultat["couverture"]:
+        message = f"Ordonnance répartie sur {len(resultat['couverture'])} pharmacie(s)"
+    else:
+        message = "Aucune pharmacie trouvée"
+
+    return {
+        "message": message,
+        "rayon_recherche_km": ordonnance.rayon_km,
+        "medicaments_recherches": ordonnance.medicaments,
+        "position_utilisateur": {
+            "latitude": ordonnance.latitude,
+            "longitude": ordonnance.longitude
+        },
+        **resultat
+    }
+
+@router.get("/carte", response_model=CarteResponse, response_model_exclude_none=True)
+async def carte(
+    request: Request,
+    sud: float = Query(..., ge=-90, le=90, description="Latitude du bord sud de la vue"),
+    ouest: float = Query(..., ge=-180, le=180, description="Longitude du bord ouest"),
+    nord: float = Query(..., ge=-90, le=90, description="Latitude du bord nord"),
+    est: float = Query(..., ge=-180, le=180, description="Longitude du bord est"),
+    zoom: int = Query(..., ge=0, le=22, description="Niveau de zoom de la carte"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Pharmacies visibles sur la carte, regroupées selon le zoom
+
+    Chaque groupe donne son centroïde, le nombre de pharmacies et le
+    nombre de pharmacies de garde ; un groupe d'une seule pharmacie porte
+    son id. Les groupes sont précalculés par zoom : déplacer la carte ne
+    relance pas de requête SQL. 304 si la vue n'a pas changé.
+    """
+    if sud > nord or ouest > est:
+        raise HTTPException(status_code=400, detail="Vue invalide : sud <= nord et ouest <= est attendus")
+
+    groupes = await CarteService.groupes_async(db, sud, ouest, nord, est, zoom)
+    valeur_etag = etag("carte", carte_index.version, sud, ouest, nord, est, zoom)
+    if non_modifie(request, valeur_etag, None):
+        return reponse_304(valeur_etag, None, MAX_AGE_CARTE)
+
+    reponse = reponse_typee(CarteResponse, {
+        "zoom": zoom,
+        "nombre": sum(groupe["nombre"] for groupe in groupes),
+        "groupes": groupes
+    })
+    reponse.headers.update(en_tetes(valeur_etag, None, MAX_AGE_CARTE))
+    return reponse
+
+@router.get("/tuiles/{z}/{x}/{y}.mvt")
+async def tuile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Tuile vectorielle (Mapbox Vector Tile) z/x/y, couche "pharmacies" :
+    groupes avec nombre, nombre_garde et id. Mise en cache jusqu'à la
+    modification d'une pharmacie de la tuile.
+    """
+    if not 0 <= z <= 22 or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=404, detail="Tuile inexistante")
+
+    contenu, empreinte = await CarteService.tuile_async(db, z, x, y)
+    valeur_etag = etag("tuile", z, x, y, empreinte)
+    if non_modifie(request, valeur_etag, None):
+        return reponse_304(valeur_etag, None, MAX_AGE_CARTE)
+    return Response(
+        content=contenu,
+        media_type="application/vnd.mapbox-vector-tile",
+        headers=en_tetes(valeur_etag, None, MAX_AGE_CARTE)
+    )
+
+@router.get("/{pharmacie_id}", response_model=PharmacieDetailResponse)
+async def get_pharmacie(
+    pharmacie_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Fiche d'une pharmacie (304 si la copie du client est à jour)"""
+    version = await AsyncPharmacieRepository.get_version(db, pharmacie_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Pharmacie non trouvée")
+
+    modification, = version
+    valeur_etag = etag("pharmacie", pharmacie_id, modification)
+    if non_modifie(request, valeur_etag, modification):
+        return reponse_304(valeur_etag, modification, MAX_AGE_PHARMACIE)
+
+    pharmacie = await AsyncPharmacieRepository.get_detail(db, pharmacie_id)
+    if not pharmacie:
+        raise HTTPException(status_code=404, detail="Pharmacie non trouvée")
+    response.headers.update(en_tetes(valeur_etag, modification, MAX_AGE_PHARMACIE))
+    return pharmacie
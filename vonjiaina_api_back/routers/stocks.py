@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.database import get_async_db
+from app.dependencies import exiger_role
+from models.user import User
+from schemas.stock import StockChangesResponse, StockImportResponse
+from services.stock_changes_service import StockChangesService, LIMITE_PAR_DEFAUT
+from services.stock_import_service import StockImportService, TAILLE_LOT
+
+router = APIRouter(prefix="/stocks", tags=["Stocks"])
+
+@router.post("/import", response_model=StockImportResponse)
+async def importer_stocks(
+    request: Request,
+    format: Optional[str] = Query(
+        None,
+        pattern="^(csv|ndjson)$",
+        description="'csv' ou 'ndjson' (par défaut : d'après le Content-Type)"
+    ),
+    pharmacie_id: Optional[int] = Query(
+        None, description="Pharmacie des lignes qui n'en précisent pas (admin)"
+    ),
+    taille_lot: int = Query(TAILLE_LOT, ge=1, le=5000, description="Lignes par transaction"),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(exiger_role("admin", "pharmacie"))
+):
+    """
+    Importer un inventaire en masse (corps de la requête lu en flux)
+
+    - CSV : en-tête `pharmacie_id,medicament_id,quantite,prix` (séparateur `,` ou `;`)
+    - NDJSON : un objet `{"pharmacie_id", "medicament_id", "quantite", "prix"}` par ligne
+
+    Chaque lot est appliqué en une requête INSERT ... ON CONFLICT DO UPDATE ;
+    la réponse détaille les lignes rejetées et le débit obtenu.
+
+    Réservé aux comptes admin et pharmacie (token Bearer). Un compte
+    pharmacie n'importe que le stock de sa propre pharmacie.
+    """
+    pharmacie_imposee = None
+    if user.role != "admin":
+        if user.pharmacie_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Compte pharmacie sans pharmacie associée"
+            )
+        if pharmacie_id is not None and pharmacie_id != user.pharmacie_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Import réservé à la pharmacie {user.pharmacie_id}"
+            )
+        pharmacie_id = pharmacie_imposee = user.pharmacie_id
+
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "json" in content_type else "csv"
+
+    try:
+        return await StockImportService.importer(
+            db,
+            request.stream(),
+            format=format,
+            pharmacie_id=pharmacie_id,
+            taille_lot=taille_lot,
+            pharmacie_imposee=pharmacie_imposee
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/changes", response_model=StockChangesResponse)
+async def changements_stocks(
+    since: Optional[str] = Query(
+        None, description="Curseur rendu par l'appel précédent (absent : depuis le début)"
+    ),
+    limit: int = Query(LIMITE_PAR_DEFAUT, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Flux des changements de stock (créations, modifications, suppressions)
+
+    Rappeler avec `since=<curseur>` tant que `a_suivre` est vrai, puis
+    périodiquement : seuls les changements depuis le curseur sont renvoyés.
+    """
+    try:
+        return await StockChangesService.lister(db, since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -6,18 +6,29 @@ from .pharmacie import (
     PharmacieBase,
     PharmacieCreate,
     PharmacieUpdate,
-    PharmacieResponse
+    PharmacieResponse,
+    PharmacieDetailResponse,
+    OrdonnanceRequest,
+    PharmacieResultat,
+    RechercheResponse,
+    GroupeCarte,
+    CarteResponse
 )
 from .medicament import (
     MedicamentBase,
     MedicamentCreate,
-    MedicamentResponse
+    MedicamentResponse,
+    MedicamentSuggestion
 )
 from .stock import (
     StockBase,
     StockCreate,
     StockUpdate,
-    StockResponse
+    StockResponse,
+    StockImportErreur,
+    StockImportResponse,
+    StockChangement,
+    StockChangesResponse
 )
 from .user import (
     UserCreate,
@@ -31,13 +42,24 @@ __all__ = [
     "PharmacieCreate",
     "PharmacieUpdate",
     "PharmacieResponse",
+    "PharmacieDetailResponse",
+    "OrdonnanceRequest",
+    "PharmacieResultat",
+    "RechercheResponse",
+    "GroupeCarte",
+    "CarteResponse",
     "MedicamentBase",
     "MedicamentCreate",
     "MedicamentResponse",
+    "MedicamentSuggestion",
     "StockBase",
     "StockCreate",
     "StockUpdate",
     "StockResponse",
+    "StockImportErreur",
+    "StockImportResponse",
+    "StockChangement",
+    "StockChangesResponse",
     "UserCreate",
     "UserLogin",
     "UserResponse",
@@ -24,4 +24,8 @@ class MedicamentResponse(MedicamentBase):
     id: int
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class MedicamentSuggestion(BaseModel):
+    id: int
+    nom_commercial: str
\ No newline at end of file
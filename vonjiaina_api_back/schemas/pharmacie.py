@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, Dict
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Optional, Dict, List
 from datetime import datetime
 
 # Schéma de base
@@ -37,6 +37,53 @@ class PharmacieResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Un résultat de /pharmacies/search : champs lus par l'application mobile,
+# les valeurs nulles sont omises de la réponse
+class PharmacieResultat(BaseModel):
+    id: int
+    nom: str
+    adresse: Optional[str] = None
+    telephone: Optional[str] = None
+    type: Optional[str] = None
+    statut: str
+    prochaine_ouverture: Optional[str] = None
+    latitude: float
+    longitude: float
+    distance_km: float
+    medicament_id: Optional[int] = None
+    nom_commercial: Optional[str] = None
+    forme: Optional[str] = None
+    dosage: Optional[str] = None
+    prix: Optional[float] = None
+    quantite: Optional[int] = None
+    # Avec trajet= : durée et longueur du trajet, estimées à vol d'oiseau
+    # si la pharmacie n'est pas atteinte sur le réseau
+    duree_trajet_min: Optional[float] = None
+    distance_trajet_km: Optional[float] = None
+    trajet_estime: Optional[bool] = None
+
+# Réponse de /pharmacies/search
+class RechercheResponse(BaseModel):
+    message: str
+    rayon_recherche_km: Optional[float] = None
+    filtre_statut: Optional[str] = None
+    tri: Optional[str] = None
+    resultats: List[PharmacieResultat]
+
+# Un groupe de pharmacies sur la carte (id si le groupe n'en a qu'une)
+class GroupeCarte(BaseModel):
+    latitude: float
+    longitude: float
+    nombre: int
+    nombre_garde: int
+    id: Optional[int] = None
+
+# Réponse de /pharmacies/carte
+class CarteResponse(BaseModel):
+    zoom: int
+    nombre: int
+    groupes: List[GroupeCarte]
+
 # Pour la réponse détaillée (endpoint individuel)
 class PharmacieDetailResponse(BaseModel):
     id: int
@@ -44,12 +91,28 @@ class PharmacieDetailResponse(BaseModel):
     adresse: Optional[str]
     telephone: Optional[str]
     email: Optional[EmailStr]
+    type: Optional[str] = None
     latitude: float
     longitude: float
     horaires: Optional[Dict]
     actif: bool
-    created_at: datetime
-    updated_at: datetime
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Recherche d'ordonnance (plusieurs médicaments à la fois)
+class OrdonnanceRequest(BaseModel):
+    medicaments: List[str] = Field(..., min_length=1, max_length=10)
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    rayon_km: float = Field(5.0, ge=0.1, le=50)
+
+    @field_validator("medicaments")
+    @classmethod
+    def noms_valides(cls, medicaments: List[str]) -> List[str]:
+        medicaments = [nom.strip() for nom in medicaments]
+        if any(len(nom) < 2 for nom in medicaments):
+            raise ValueError("Chaque médicament doit faire au moins 2 caractères")
+        return medicaments
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class StockBase(BaseModel):
@@ -20,4 +20,32 @@ class StockResponse(StockBase):
     date_maj: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class StockImportErreur(BaseModel):
+    ligne: int = Field(description="Numéro de ligne dans le fichier (1 = première ligne)")
+    erreur: str
+
+class StockImportResponse(BaseModel):
+    lignes_lues: int
+    lignes_importees: int
+    inserees: int
+    mises_a_jour: int
+    erreurs: List[StockImportErreur]
+    erreurs_tronquees: bool = Field(description="Plus d'erreurs que celles listées")
+    duree_secondes: float
+    lignes_par_seconde: float
+
+class StockChangement(BaseModel):
+    type: str = Field(description="'maj' (création ou modification) ou 'suppression'")
+    stock_id: int
+    pharmacie_id: int
+    medicament_id: int
+    quantite: Optional[int] = None
+    prix: Optional[float] = None
+    date: datetime
+
+class StockChangesResponse(BaseModel):
+    changements: List[StockChangement]
+    curseur: str = Field(description="À repasser dans `since` pour la page suivante")
+    a_suivre: bool = Field(description="D'autres changements sont déjà disponibles")
@@ -6,9 +6,11 @@ class UserBase(BaseModel):
     nom: str
 
 class UserCreate(UserBase):
+    """
+    Inscription publique : toujours un compte "user". Les comptes admin
+    et pharmacie ne se créent pas par cette route.
+    """
     password: str
-    role: str = "user"
-    pharmacie_id: Optional[int] = None
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -0,0 +1,109 @@
+"""
+Benchmark : débit de l'API sous trafic concurrent (recherches + connexions)
+
+Usage (depuis vonjiaina_api_back/, avec l'API lancée sur --url) :
+    uvicorn app.main:app --workers 1
+    python -m scripts.bench_concurrence --url http://localhost:8000 \
+        --email test@example.com --mot-de-passe secret
+
+Pour comparer avant/après, lancer le même script contre une API démarrée
+sur la version précédente (sessions synchrones) puis sur celle-ci.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+# Quelques villes autour desquelles se concentrent les pharmacies
+VILLES = [
+    (-18.8792, 47.5079),  # Antananarivo
+    (-18.1443, 49.3958),  # Toamasina
+    (-21.4527, 47.0857),  # Fianarantsoa
+    (-15.7167, 46.3167),  # Mahajanga
+]
+
+MEDICAMENTS = ["paracetamol", "amoxicilline", "ibuprofene", "doliprane", "aspirine"]
+
+
+async def rechercher(client: httpx.AsyncClient, prefixe: str, rng: random.Random):
+    lat, lon = rng.choice(VILLES)
+    return await client.get(f"{prefixe}/pharmacies/search", params={
+        "medicament": rng.choice(MEDICAMENTS),
+        "latitude": lat + rng.gauss(0, 0.02),
+        "longitude": lon + rng.gauss(0, 0.02),
+        "rayon_km": 5,
+    })
+
+
+async def connecter(client: httpx.AsyncClient, prefixe: str, email: str, mot_de_passe: str):
+    return await client.post(f"{prefixe}/auth/login", json={
+        "email": email, "password": mot_de_passe
+    })
+
+
+async def client_virtuel(client, args, rng, fin, mesures):
+    """Enchaîne les requêtes jusqu'à l'échéance, mesure chaque latence"""
+    while time.perf_counter() < fin:
+        connexion = rng.random() < args.part_connexions
+        debut = time.perf_counter()
+        try:
+            if connexion:
+                reponse = await connecter(client, args.prefixe, args.email, args.mot_de_passe)
+            else:
+                reponse = await rechercher(client, args.prefixe, rng)
+            ok = reponse.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        duree = (time.perf_counter() - debut) * 1000
+        mesures["connexion" if connexion else "recherche"].append((duree, ok))
+
+
+def resume(nom: str, mesures, duree_s: float) -> str:
+    if not mesures:
+        return f"  {nom:<10} aucune requête"
+    durees = sorted(d for d, _ in mesures)
+    erreurs = sum(1 for _, ok in mesures if not ok)
+    p95 = durees[max(int(len(durees) * 0.95) - 1, 0)]
+    return (f"  {nom:<10} {len(durees) / duree_s:8.1f} req/s   médiane {statistics.median(durees):8.1f} ms"
+            f"   p95 {p95:8.1f} ms   erreurs {erreurs}")
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    mesures = {"recherche": [], "connexion": []}
+    limites = httpx.Limits(max_connections=args.concurrence)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=30) as client:
+        debut = time.perf_counter()
+        fin = debut + args.duree
+        await asyncio.gather(*(
+            client_virtuel(client, args, random.Random(rng.random()), fin, mesures)
+            for _ in range(args.concurrence)
+        ))
+        ecoule = time.perf_counter() - debut
+
+    total = len(mesures["recherche"]) + len(mesures["connexion"])
+    print(f"\n{args.concurrence} clients pendant {ecoule:.1f} s : {total / ecoule:.1f} req/s au total")
+    print(resume("recherche", mesures["recherche"], ecoule))
+    print(resume("connexion", mesures["connexion"], ecoule))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--prefixe", default="/api/v1")
+    parser.add_argument("--email", default="test@example.com")
+    parser.add_argument("--mot-de-passe", default="secret")
+    parser.add_argument("--concurrence", type=int, default=50)
+    parser.add_argument("--duree", type=float, default=30.0, help="Durée en secondes")
+    parser.add_argument("--part-connexions", type=float, default=0.2,
+                        help="Proportion de connexions dans le trafic")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark : latence des recherches pendant des connexions concurrentes
+
+Mesure la latence des recherches seules, puis avec des boucles de
+connexion en parallèle (chaque connexion coûte un bcrypt). Si bcrypt
+tourne dans la boucle d'événements, les percentiles des recherches
+explosent dès qu'il y a des connexions ; avec le pool de hachage, ils
+doivent rester proches de la première phase.
+
+Usage (depuis vonjiaina_api_back/, avec l'API lancée sur --url) :
+    uvicorn app.main:app --workers 1
+    python -m scripts.bench_login_recherche --email test@example.com --mot-de-passe secret
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from scripts.bench_concurrence import connecter, rechercher
+
+
+def percentiles(durees) -> str:
+    if not durees:
+        return "aucune requête"
+    triees = sorted(durees)
+
+    def p(q: float) -> float:
+        return triees[min(int(len(triees) * q), len(triees) - 1)]
+
+    return (f"{len(triees):6d} req   p50 {p(0.50):8.1f} ms   p95 {p(0.95):8.1f} ms"
+            f"   p99 {p(0.99):8.1f} ms")
+
+
+async def boucle_recherche(client, args, rng, fin, durees):
+    while time.perf_counter() < fin:
+        debut = time.perf_counter()
+        try:
+            await rechercher(client, args.prefixe, rng)
+        except httpx.HTTPError:
+            continue
+        durees.append((time.perf_counter() - debut) * 1000)
+
+
+async def boucle_connexion(client, args, fin, statuts):
+    while time.perf_counter() < fin:
+        try:
+            reponse = await connecter(client, args.prefixe, args.email, args.mot_de_passe)
+            statuts[reponse.status_code] = statuts.get(reponse.status_code, 0) + 1
+        except httpx.HTTPError:
+            statuts["erreur"] = statuts.get("erreur", 0) + 1
+
+
+async def phase(client, args, connexions: int, rng: random.Random):
+    durees, statuts = [], {}
+    fin = time.perf_counter() + args.duree
+    await asyncio.gather(
+        *(boucle_recherche(client, args, random.Random(rng.random()), fin, durees)
+          for _ in range(args.recherches)),
+        *(boucle_connexion(client, args, fin, statuts) for _ in range(connexions)),
+    )
+    return durees, statuts
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    limites = httpx.Limits(max_connections=args.recherches + max(args.connexions))
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=30) as client:
+        for connexions in [0] + args.connexions:
+            durees, statuts = await phase(client, args, connexions, rng)
+            print(f"\n{args.recherches} chercheurs + {connexions} connexions en boucle")
+            print(f"  recherche  {percentiles(durees)}")
+            if connexions:
+                print(f"  connexions par statut : {statuts}")
+
+        hachage = await client.get("/health/hachage")
+        if hachage.status_code == 200:
+            print(f"\nPool de hachage : {hachage.json()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--prefixe", default="/api/v1")
+    parser.add_argument("--email", default="test@example.com")
+    parser.add_argument("--mot-de-passe", default="secret")
+    parser.add_argument("--recherches", type=int, default=10,
+                        help="Clients qui enchaînent les recherches")
+    parser.add_argument("--connexions", type=int, nargs="+", default=[5, 20],
+                        help="Nombres de boucles de connexion à tester")
+    parser.add_argument("--duree", type=float, default=20.0, help="Durée de chaque phase (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
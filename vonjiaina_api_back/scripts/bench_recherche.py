@@ -0,0 +1,262 @@
+"""
+Benchmark de la recherche : latences p50/p95/p99 et débit
+
+Scénarios :
+- service : SearchService.rechercher_pharmacies (session synchrone, en processus)
+- noms    : MedicamentRepository.find_by_name
+- http    : /pharmacies/search, /medicaments/search et /medicaments/suggest
+            sur une API lancée (--url), avec --concurrence clients
+
+La charge est tirée d'un générateur seedé : médicaments pris dans la base
+(popularité en loi de Zipf, fautes de frappe et accents omis), positions
+autour des villes de scripts/generer_donnees.py, rayons et filtres variés.
+Même seed, même base : mêmes requêtes, dans le même ordre.
+
+Usage (depuis vonjiaina_api_back/, base remplie par scripts.generer_donnees) :
+    python -m scripts.bench_recherche --scenarios service noms --requetes 2000
+    python -m scripts.bench_recherche --scenarios http --url http://localhost:8000
+    python -m scripts.bench_recherche --json resultats.json   # pour comparer deux versions
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import unicodedata
+from typing import Callable, Dict, List
+
+import numpy as np
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from repositories.medicament_repository import MedicamentRepository
+from scripts.generer_donnees import VILLES
+from services.search_service import SearchService
+from utils.search_cache import search_cache
+
+RAYONS_KM = [1, 2, 3, 5, 10]
+STATUTS = [None, "ouverte", "garde"]
+TRIS = ["distance", "ouverte", "prix", "pertinence"]
+
+
+def _sans_accents(texte: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFD", texte)
+        if unicodedata.category(c) != "Mn"
+    )
+
+
+class Charge:
+    """Requêtes réalistes, reproductibles pour un seed et une base donnés"""
+
+    def __init__(self, noms: List[str], seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.noms = sorted(set(noms))
+        self.rng.shuffle(self.noms)
+        rangs = np.arange(1, len(self.noms) + 1)
+        self.popularite = 1.0 / rangs ** 1.1
+        self.popularite /= self.popularite.sum()
+        populations = np.array([v[3] for v in VILLES], dtype=float)
+        self.poids_villes = populations / populations.sum()
+
+    def saisie(self) -> str:
+        """Nom tapé par un utilisateur : accents omis, fautes de frappe"""
+        nom = self.noms[self.rng.choice(len(self.noms), p=self.popularite)]
+        if self.rng.random() < 0.4:
+            nom = _sans_accents(nom).lower()
+        if self.rng.random() < 0.15 and len(nom) > 4:
+            i = int(self.rng.integers(1, len(nom) - 1))
+            nom = nom[:i] + nom[i + 1] + nom[i] + nom[i + 2:]
+        return nom
+
+    def prefixe(self) -> str:
+        nom = self.saisie()
+        return nom[:int(self.rng.integers(2, min(len(nom), 6) + 1))]
+
+    def recherche(self) -> dict:
+        _, latitude, longitude, _ = VILLES[self.rng.choice(len(VILLES), p=self.poids_villes)]
+        return {
+            "medicament": self.saisie(),
+            "latitude": latitude + float(self.rng.normal(0, 0.02)),
+            "longitude": longitude + float(self.rng.normal(0, 0.02)),
+            "rayon_km": float(self.rng.choice(RAYONS_KM)),
+            "statut": STATUTS[self.rng.choice(3, p=[0.8, 0.15, 0.05])],
+            "tri": TRIS[self.rng.choice(4, p=[0.6, 0.2, 0.1, 0.1])],
+        }
+
+
+def resume(nom: str, durees_ms: List[float], erreurs: int, duree_s: float) -> dict:
+    valeurs = np.array(durees_ms) if durees_ms else np.zeros(1)
+    return {
+        "scenario": nom,
+        "requetes": len(durees_ms),
+        "erreurs": erreurs,
+        "debit_req_s": round(len(durees_ms) / duree_s, 1) if duree_s > 0 else 0.0,
+        "p50_ms": round(float(np.percentile(valeurs, 50)), 2),
+        "p95_ms": round(float(np.percentile(valeurs, 95)), 2),
+        "p99_ms": round(float(np.percentile(valeurs, 99)), 2),
+        "max_ms": round(float(valeurs.max()), 2),
+    }
+
+
+def afficher(resultat: dict) -> None:
+    print(f"  {resultat['scenario']:<22} {resultat['requetes']:6d} req  {resultat['debit_req_s']:8.1f} req/s"
+          f"   p50 {resultat['p50_ms']:7.2f}   p95 {resultat['p95_ms']:7.2f}"
+          f"   p99 {resultat['p99_ms']:7.2f}   max {resultat['max_ms']:7.2f} ms"
+          f"   erreurs {resultat['erreurs']}")
+
+
+def mesurer(nom: str, operation: Callable[[], None], requetes: int, echauffement: int) -> dict:
+    """Exécuter `operation` en séquence et mesurer chaque appel"""
+    for _ in range(echauffement):
+        operation()
+    durees, erreurs = [], 0
+    debut = time.perf_counter()
+    for _ in range(requetes):
+        t0 = time.perf_counter()
+        try:
+            operation()
+        except Exception:
+            erreurs += 1
+            continue
+        durees.append((time.perf_counter() - t0) * 1000)
+    return resume(nom, durees, erreurs, time.perf_counter() - debut)
+
+
+def scenario_service(db, charge: Charge, args) -> List[dict]:
+    def rechercher():
+        p = charge.recherche()
+        if args.sans_cache:
+            search_cache.vider()
+        SearchService.rechercher_pharmacies(
+            db, p["medicament"], p["latitude"], p["longitude"],
+            rayon_km=p["rayon_km"], filtre_statut=p["statut"], tri=p["tri"]
+        )
+
+    return [mesurer("service.recherche", rechercher, args.requetes, args.echauffement)]
+
+
+def scenario_noms(db, charge: Charge, args) -> List[dict]:
+    return [mesurer(
+        "repository.find_by_name",
+        lambda: MedicamentRepository.find_by_name(db, charge.saisie()),
+        args.requetes, args.echauffement
+    )]
+
+
+async def _http(charge: Charge, args) -> List[dict]:
+    import httpx
+
+    cibles = {
+        "http.pharmacies.search": lambda: (f"{args.prefixe}/pharmacies/search", {
+            cle: valeur for cle, valeur in charge.recherche().items() if valeur is not None
+        }),
+        "http.medicaments.search": lambda: (f"{args.prefixe}/medicaments/search", {
+            "nom": charge.saisie()
+        }),
+        "http.medicaments.suggest": lambda: (f"{args.prefixe}/medicaments/suggest", {
+            "q": charge.prefixe()
+        }),
+    }
+    resultats = []
+    limites = httpx.Limits(max_connections=args.concurrence)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=30) as client:
+        for nom, requete in cibles.items():
+            # Requêtes tirées d'avance : l'ordre ne dépend pas de l'ordonnancement
+            a_envoyer = [requete() for _ in range(args.requetes + args.echauffement)]
+            for chemin, params in a_envoyer[:args.echauffement]:
+                await client.get(chemin, params=params)
+            a_envoyer = a_envoyer[args.echauffement:]
+
+            durees, erreurs = [], 0
+            suivante = iter(a_envoyer)
+
+            async def client_virtuel():
+                nonlocal erreurs
+                for chemin, params in suivante:
+                    t0 = time.perf_counter()
+                    try:
+                        reponse = await client.get(chemin, params=params)
+                        if reponse.status_code >= 400:
+                            erreurs += 1
+                            continue
+                    except httpx.HTTPError:
+                        erreurs += 1
+                        continue
+                    durees.append((time.perf_counter() - t0) * 1000)
+
+            debut = time.perf_counter()
+            await asyncio.gather(*(client_virtuel() for _ in range(args.concurrence)))
+            resultats.append(resume(nom, durees, erreurs, time.perf_counter() - debut))
+    return resultats
+
+
+def taille_jeu(db) -> Dict[str, int]:
+    return {
+        table: db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        for table in ("pharmacies", "medicaments", "stocks")
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", default=["service", "noms"],
+                        choices=["service", "noms", "http"])
+    parser.add_argument("--requetes", type=int, default=1000, help="Requêtes mesurées par scénario")
+    parser.add_argument("--echauffement", type=int, default=100, help="Requêtes non mesurées")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sans-index", action="store_true",
+                        help="Ne pas charger les index en mémoire (chemin SQL seul)")
+    parser.add_argument("--sans-cache", action="store_true",
+                        help="Vider le cache des recherches avant chaque requête")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--prefixe", default="/api/v1")
+    parser.add_argument("--concurrence", type=int, default=10)
+    parser.add_argument("--json", help="Écrire les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        jeu = taille_jeu(db)
+        if not jeu["pharmacies"]:
+            print("Base vide : lancer d'abord python -m scripts.generer_donnees")
+            return 1
+        noms = [nom for _, nom_commercial, dci in MedicamentRepository.get_noms(db)
+                for nom in (nom_commercial, dci) if nom]
+        if not args.sans_index:
+            SearchService.charger_index(db)
+            SearchService.charger_index_medicaments(db)
+
+        print(f"Jeu : {jeu}  seed {args.seed}"
+              f"{'  sans index' if args.sans_index else ''}{'  sans cache' if args.sans_cache else ''}")
+        resultats = []
+        for scenario in args.scenarios:
+            # Une charge par scénario : ajouter un scénario ne change pas les autres
+            charge = Charge(noms, args.seed)
+            if scenario == "service":
+                resultats += scenario_service(db, charge, args)
+            elif scenario == "noms":
+                resultats += scenario_noms(db, charge, args)
+            else:
+                resultats += asyncio.run(_http(charge, args))
+            for resultat in resultats[-(3 if scenario == "http" else 1):]:
+                afficher(resultat)
+    finally:
+        db.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "jeu": jeu,
+                "parametres": {k: v for k, v in vars(args).items() if k != "json"},
+                "machine": platform.platform(),
+                "python": sys.version.split()[0],
+                "resultats": resultats,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Benchmark et vérification du routage sur une grille synthétique
+
+Grille de voies résidentielles traversée par une rivière que seuls
+quelques ponts franchissent, avec une route principale : des pharmacies
+proches à vol d'oiseau peuvent être loin par la route. Le script :
+- vérifie que le Dijkstra borné vers plusieurs cibles et le Dijkstra
+  bidirectionnel donnent les mêmes temps ;
+- compare le classement à vol d'oiseau et le classement par trajet ;
+- mesure les trajets d'un point vers 20 pharmacies (p50/p95/max),
+  avec le délai de calcul par requête de l'API.
+
+Hors ligne : ni base ni fichier de réseau.
+
+Usage (depuis vonjiaina_api_back/) :
+    python -m scripts.bench_routage --lignes 200 --colonnes 200 --requetes 500
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from scripts.bench_recherche import afficher, resume
+from utils.routage import grille_synthetique
+from utils.spatial_index import distance_metres
+
+
+def construire(lignes: int, colonnes: int, ponts: int):
+    riviere = lignes // 2
+    colonnes_ponts = {int(c) for c in np.linspace(0, colonnes - 1, ponts + 2)[1:-1]}
+    principale = colonnes // 3
+
+    def classe(i, j, i2, j2):
+        if i == riviere and i2 == riviere + 1 and j not in colonnes_ponts:
+            return None
+        return "primary" if j == j2 == principale else "residential"
+
+    return grille_synthetique(lignes, colonnes, classe=classe)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lignes", type=int, default=150)
+    parser.add_argument("--colonnes", type=int, default=150)
+    parser.add_argument("--ponts", type=int, default=3)
+    parser.add_argument("--requetes", type=int, default=300)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    debut = time.perf_counter()
+    graphe = construire(args.lignes, args.colonnes, args.ponts)
+    print(f"Grille {args.lignes}x{args.colonnes}, {args.ponts} ponts : {graphe.statistiques()}"
+          f" construite en {(time.perf_counter() - debut) * 1000:.0f} ms")
+
+    # Cohérence des deux parcours
+    ecarts = 0
+    for mode in ("pied", "voiture"):
+        for _ in range(100):
+            a, b = (int(x) for x in rng.integers(0, len(graphe), 2))
+            un_vers_plusieurs = graphe.temps_depuis(a, [b], mode).get(b, (None,))[0]
+            bidirectionnel = graphe.temps_entre(a, b, mode)
+            if (un_vers_plusieurs is None) != (bidirectionnel is None) or (
+                    bidirectionnel is not None and abs(un_vers_plusieurs - bidirectionnel) > 1e-6):
+                ecarts += 1
+    print(f"Dijkstra vers plusieurs / bidirectionnel : {ecarts} écart(s) sur 200 paires")
+
+    durees = {"pied": [], "voiture": []}
+    reclasses = estimes = 0
+    for _ in range(args.requetes):
+        depart = int(rng.integers(len(graphe)))
+        latitude, longitude = graphe.latitudes[depart], graphe.longitudes[depart]
+        # 20 pharmacies autour du point, à moins de ~1,5 km
+        cibles = [
+            (latitude + dlat, longitude + dlon)
+            for dlat, dlon in rng.normal(0, 0.006, size=(20, 2))
+        ]
+        for mode in durees:
+            t0 = time.perf_counter()
+            trajets = graphe.trajets(latitude, longitude, cibles, mode,
+                                     delai_secondes=args.budget_ms / 1000)
+            durees[mode].append((time.perf_counter() - t0) * 1000)
+            estimes += sum(estime for _, _, estime in trajets)
+            if mode == "pied":
+                vol_oiseau = np.argsort([distance_metres(latitude, longitude, *c) for c in cibles])
+                par_trajet = np.argsort([secondes for secondes, _, _ in trajets])
+                reclasses += int(vol_oiseau[0] != par_trajet[0])
+
+    for mode, valeurs in durees.items():
+        afficher(resume(f"trajets.{mode}", valeurs, 0, sum(valeurs) / 1000))
+    print(f"Plus proche différente à pied / à vol d'oiseau : {reclasses}/{args.requetes} requêtes")
+    print(f"Trajets estimés (hors réseau ou hors délai) : {estimes}/{args.requetes * 40}")
+    return 1 if ecarts else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
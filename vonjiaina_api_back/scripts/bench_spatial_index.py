@@ -0,0 +1,165 @@
+"""
+Benchmark : index spatial en mémoire vs chemin SQL (formule acos)
+
+Usage (depuis vonjiaina_api_back/) :
+    python -m scripts.bench_spatial_index
+    python -m scripts.bench_spatial_index --sql   # compare aussi avec PostgreSQL
+
+Le chemin SQL est mesuré sur une table temporaire reprenant la requête
+historique de PharmacieRepository.search_with_medicament.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from utils.spatial_index import SpatialIndex, distance_metres
+
+# Boîte englobante approximative de Madagascar
+LAT_MIN, LAT_MAX = -25.6, -11.9
+LON_MIN, LON_MAX = 43.2, 50.5
+
+# Quelques villes autour desquelles se concentrent les pharmacies
+VILLES = [
+    (-18.8792, 47.5079),  # Antananarivo
+    (-18.1443, 49.3958),  # Toamasina
+    (-21.4527, 47.0857),  # Fianarantsoa
+    (-15.7167, 46.3167),  # Mahajanga
+    (-23.3500, 43.6667),  # Toliara
+    (-12.2787, 49.2917),  # Antsiranana
+]
+
+SQL_ACOS = """
+    SELECT id,
+        (6371 * acos(cos(radians(:lat)) * cos(radians(latitude)) *
+         cos(radians(longitude) - radians(:lon)) +
+         sin(radians(:lat)) * sin(radians(latitude)))) AS distance
+    FROM bench_pharmacies
+    WHERE
+        (6371 * acos(cos(radians(:lat)) * cos(radians(latitude)) *
+         cos(radians(longitude) - radians(:lon)) +
+         sin(radians(:lat)) * sin(radians(latitude)))) <= :rayon_km
+    ORDER BY distance ASC
+    LIMIT 20
+"""
+
+
+def generer_pharmacies(n: int, rng: random.Random):
+    """70% des pharmacies autour des villes, le reste dispersé"""
+    points = []
+    for pharmacie_id in range(1, n + 1):
+        if rng.random() < 0.7:
+            lat, lon = rng.choice(VILLES)
+            lat += rng.gauss(0, 0.05)
+            lon += rng.gauss(0, 0.05)
+        else:
+            lat = rng.uniform(LAT_MIN, LAT_MAX)
+            lon = rng.uniform(LON_MIN, LON_MAX)
+        points.append((pharmacie_id, lat, lon))
+    return points
+
+
+def generer_requetes(nb: int, rng: random.Random):
+    requetes = []
+    for _ in range(nb):
+        lat, lon = rng.choice(VILLES)
+        requetes.append((lat + rng.gauss(0, 0.03), lon + rng.gauss(0, 0.03)))
+    return requetes
+
+
+def mesurer(fonction, requetes):
+    """Durées en millisecondes pour chaque requête"""
+    durees = []
+    for lat, lon in requetes:
+        debut = time.perf_counter()
+        fonction(lat, lon)
+        durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def resume(nom: str, durees) -> str:
+    durees = sorted(durees)
+    p95 = durees[int(len(durees) * 0.95) - 1]
+    return (f"  {nom:<24} moyenne {statistics.mean(durees):8.3f} ms"
+            f"   médiane {statistics.median(durees):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def bench_sql(points, requetes, rayon_metres):
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.connect() as connection:
+        connection.execute(text("""
+            CREATE TEMP TABLE bench_pharmacies (
+                id integer PRIMARY KEY,
+                latitude double precision,
+                longitude double precision
+            )
+        """))
+        connection.execute(
+            text("INSERT INTO bench_pharmacies VALUES (:id, :lat, :lon)"),
+            [{"id": i, "lat": lat, "lon": lon} for i, lat, lon in points]
+        )
+        connection.execute(text("ANALYZE bench_pharmacies"))
+
+        requete = text(SQL_ACOS)
+        durees = mesurer(
+            lambda lat, lon: connection.execute(requete, {
+                "lat": lat, "lon": lon, "rayon_km": rayon_metres / 1000
+            }).fetchall(),
+            requetes
+        )
+        connection.execute(text("DROP TABLE bench_pharmacies"))
+    return durees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--requetes", type=int, default=500)
+    parser.add_argument("--rayon-km", type=float, default=5.0)
+    parser.add_argument("--sql", action="store_true", help="Mesurer aussi le chemin SQL")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rayon_metres = args.rayon_km * 1000
+
+    for taille in args.tailles:
+        rng = random.Random(args.seed)
+        points = generer_pharmacies(taille, rng)
+        requetes = generer_requetes(args.requetes, rng)
+
+        index = SpatialIndex()
+        debut = time.perf_counter()
+        index.charger(points)
+        chargement = (time.perf_counter() - debut) * 1000
+
+        print(f"\n{taille} pharmacies (chargement de l'index : {chargement:.1f} ms)")
+        print(resume(
+            "index (candidats)",
+            mesurer(lambda lat, lon: index.candidats(lat, lon, rayon_metres), requetes)
+        ))
+        print(resume(
+            "index (distance exacte)",
+            mesurer(lambda lat, lon: index.rechercher(lat, lon, rayon_metres), requetes)
+        ))
+
+        # Référence : balayage complet avec la même formule, comme le SQL actuel
+        print(resume(
+            "balayage complet",
+            mesurer(
+                lambda lat, lon: sorted(
+                    d for d in (distance_metres(lat, lon, p_lat, p_lon)
+                                for _, p_lat, p_lon in points)
+                    if d <= rayon_metres
+                )[:20],
+                requetes[:50]
+            )
+        ))
+
+        if args.sql:
+            print(resume("SQL (acos)", bench_sql(points, requetes, rayon_metres)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Vérifier via EXPLAIN que la recherche par rayon utilise l'index GiST
+
+Usage (depuis vonjiaina_api_back/) :
+    python -m scripts.check_search_plan
+
+Le parcours séquentiel est désactivé le temps de la transaction : sur une
+petite table le planificateur le préférerait, on vérifie ici que la
+requête est *capable* d'utiliser l'index (prédicat indexable).
+"""
+import json
+import sys
+
+from sqlalchemy import text
+from app.database import engine
+from repositories.pharmacie_repository import PharmacieRepository
+
+INDEX_ATTENDU = "idx_pharmacies_location"
+
+
+def index_utilises(plan: dict) -> set:
+    """Noms des index présents dans un plan EXPLAIN (FORMAT JSON)"""
+    noms = set()
+    if "Index Name" in plan:
+        noms.add(plan["Index Name"])
+    for sous_plan in plan.get("Plans", []):
+        noms |= index_utilises(sous_plan)
+    return noms
+
+
+def main() -> int:
+    requete = PharmacieRepository.requete_recherche()
+    parametres = {
+        "motif": "%Paracétamol%",
+        "latitude": -18.8792,
+        "longitude": 47.5079,
+        "rayon_metres": 5000,
+        "limite": 20
+    }
+
+    with engine.connect() as connection:
+        with connection.begin():
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+            resultat = connection.execute(
+                text(f"EXPLAIN (FORMAT JSON) {requete.text}"),
+                parametres
+            ).scalar()
+
+    plan = resultat if isinstance(resultat, list) else json.loads(resultat)
+    noms = index_utilises(plan[0]["Plan"])
+
+    print(json.dumps(plan, indent=2))
+    if INDEX_ATTENDU not in noms:
+        print(f"\nÉCHEC : {INDEX_ATTENDU} n'est pas utilisé (index : {noms or 'aucun'})")
+        return 1
+
+    print(f"\nOK : la recherche utilise {INDEX_ATTENDU}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
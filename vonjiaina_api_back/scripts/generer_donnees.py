@@ -0,0 +1,276 @@
+"""
+Générer un jeu de données synthétique reproductible (pharmacies, médicaments, stocks)
+
+Les pharmacies sont regroupées autour de vraies villes de Madagascar, en
+proportion de leur population ; les horaires mélangent les formats
+acceptés par utils/horaires.py et une partie des pharmacies est de garde.
+La matrice des stocks est creuse : chaque pharmacie a une fraction du
+catalogue, les médicaments courants étant présents presque partout.
+
+Usage (depuis vonjiaina_api_back/, base vide ou --reinitialiser) :
+    python -m scripts.generer_donnees --pharmacies 2000 --medicaments 1500 --seed 42
+
+Même seed et mêmes paramètres : mêmes données, mêmes IDs (tables
+réinitialisées), donc des benchmarks comparables d'une machine à l'autre.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import insert, text
+
+from app.database import Base, engine
+from models.medicament import Medicament
+from models.stock import Stock
+from utils.horaires import JOURS
+
+# (ville, latitude, longitude, population approximative)
+VILLES = [
+    ("Antananarivo", -18.8792, 47.5079, 1_400_000),
+    ("Toamasina", -18.1443, 49.3958, 330_000),
+    ("Antsirabe", -19.8659, 47.0333, 250_000),
+    ("Fianarantsoa", -21.4527, 47.0857, 200_000),
+    ("Mahajanga", -15.7167, 46.3167, 250_000),
+    ("Toliara", -23.3500, 43.6667, 170_000),
+    ("Antsiranana", -12.2787, 49.2917, 130_000),
+    ("Ambovombe", -25.1750, 46.0833, 70_000),
+    ("Morondava", -20.2833, 44.2833, 60_000),
+    ("Sambava", -14.2667, 50.1667, 45_000),
+    ("Manakara", -22.1500, 48.0000, 40_000),
+    ("Taolagnaro", -25.0319, 46.9831, 50_000),
+    ("Nosy Be", -13.4000, 48.2667, 40_000),
+    ("Ambatondrazaka", -17.8333, 48.4167, 60_000),
+    ("Moramanga", -18.9333, 48.2000, 50_000),
+]
+
+QUARTIERS = [
+    "Analakely", "Isotry", "Andravoahangy", "Ankorondrano", "Ambohijatovo",
+    "Behoririka", "Tsaralalana", "Mahamasina", "Ampefiloha", "Anosy",
+    "Bazary Be", "Tanambao", "Ambalavola", "Andranomena", "Centre-ville",
+]
+
+# DCI : (nom, prix de référence en ariary)
+DCI = [
+    ("Paracétamol", 1500), ("Amoxicilline", 4500), ("Ibuprofène", 2500),
+    ("Métronidazole", 3000), ("Cotrimoxazole", 2500), ("Artéméther-luméfantrine", 6000),
+    ("Quinine", 5000), ("Oméprazole", 4000), ("Métformine", 3500),
+    ("Amlodipine", 4000), ("Salbutamol", 7000), ("Diclofénac", 2500),
+    ("Ciprofloxacine", 5000), ("Doxycycline", 3500), ("Fer-acide folique", 2000),
+    ("Albendazole", 1500), ("Loratadine", 3000), ("Prednisolone", 3500),
+    ("Captopril", 3000), ("Hydrochlorothiazide", 2500), ("Azithromycine", 8000),
+    ("Ceftriaxone", 9000), ("Acide acétylsalicylique", 1500), ("Vitamine C", 2000),
+    ("Zinc", 2500), ("Sels de réhydratation orale", 800), ("Miconazole", 4000),
+    ("Clotrimazole", 3500), ("Furosémide", 2500), ("Glibenclamide", 3000),
+]
+
+LABORATOIRES = ["Sanofi", "Pharmalagasy", "Cipla", "Sandoz", "Biogaran", "Mylan", "Teva", "Homapharma"]
+MARQUES = ["Doli", "Efferal", "Novo", "Pharma", "Medi", "Bio", "Vita", "Sano", "Mada", "Gasy"]
+FORMES = [
+    ("comprimé", ["100mg", "250mg", "500mg", "1g"]),
+    ("gélule", ["250mg", "500mg"]),
+    ("sirop", ["125mg/5ml", "250mg/5ml"]),
+    ("suspension buvable", ["100mg/5ml"]),
+    ("injectable", ["500mg", "1g"]),
+    ("pommade", ["1%", "2%"]),
+]
+
+# Part des pharmacies de garde
+PART_GARDE = 0.08
+# Part des lignes de stock en rupture (quantité 0)
+PART_RUPTURE = 0.1
+
+
+def _horaires(rng: np.random.Generator) -> Dict:
+    """Horaires d'une pharmacie, dans l'un des formats rencontrés en pratique"""
+    profil = rng.choice(["journee", "coupure", "dict", "liste", "soir", "24h"],
+                        p=[0.3, 0.25, 0.2, 0.1, 0.1, 0.05])
+    ouverture = int(rng.choice([7, 8, 8, 9]))
+    fermeture = int(rng.choice([17, 18, 18, 19, 20]))
+
+    if profil == "journee":
+        jour = f"{ouverture}h-{fermeture}h"
+    elif profil == "coupure":
+        jour = f"{ouverture}h30-12h, 14h-{fermeture}h"
+    elif profil == "dict":
+        jour = {"ouverture": f"{ouverture:02d}:00", "fermeture": f"{fermeture:02d}:00"}
+    elif profil == "liste":
+        jour = [{"ouverture": f"{ouverture:02d}:00", "fermeture": "12:00"},
+                {"ouverture": "14:00", "fermeture": f"{fermeture:02d}:00"}]
+    elif profil == "soir":
+        jour = f"{ouverture}h-12h, 16h-2h"
+    else:
+        jour = "0h-24h"
+
+    horaires = {nom_jour: jour for nom_jour in JOURS[:5]}
+    if profil == "24h" or rng.random() < 0.7:
+        horaires["samedi"] = jour if profil == "24h" else f"{ouverture}h-12h"
+    if profil == "24h" or rng.random() < 0.15:
+        horaires["dimanche"] = jour if profil == "24h" else "9h-12h"
+    return horaires
+
+
+def generer_pharmacies(n: int, rng: np.random.Generator) -> List[dict]:
+    populations = np.array([v[3] for v in VILLES], dtype=float)
+    villes = rng.choice(len(VILLES), size=n, p=populations / populations.sum())
+
+    pharmacies = []
+    for i, index_ville in enumerate(villes):
+        nom_ville, latitude, longitude, population = VILLES[index_ville]
+        # Étalement autour du centre : ~1 km pour une petite ville, ~6 km pour la capitale
+        ecart_km = 0.8 + 5 * math.sqrt(population / VILLES[0][3])
+        lat = latitude + rng.normal(0, ecart_km / 111)
+        lon = longitude + rng.normal(0, ecart_km / (111 * math.cos(math.radians(latitude))))
+        quartier = QUARTIERS[int(rng.integers(len(QUARTIERS)))]
+        pharmacies.append({
+            "nom": f"Pharmacie {quartier} {i + 1}",
+            "adresse": f"Lot {int(rng.integers(1, 999))} {quartier}, {nom_ville}",
+            "telephone": f"+261 3{int(rng.integers(2, 5))} {int(rng.integers(10, 99))} "
+                         f"{int(rng.integers(100, 999))} {int(rng.integers(10, 99))}",
+            "latitude": round(float(lat), 6),
+            "longitude": round(float(lon), 6),
+            "horaires": _horaires(rng),
+            "actif": bool(rng.random() > 0.02),
+            "type": "garde" if rng.random() < PART_GARDE else "normale",
+        })
+    return pharmacies
+
+
+def generer_medicaments(n: int, rng: np.random.Generator) -> Tuple[List[dict], np.ndarray]:
+    """Médicaments et prix de référence (ariary)"""
+    medicaments, prix = [], []
+    vus = set()
+    while len(medicaments) < n:
+        dci, prix_dci = DCI[int(rng.integers(len(DCI)))]
+        forme, dosages = FORMES[int(rng.integers(len(FORMES)))]
+        dosage = dosages[int(rng.integers(len(dosages)))]
+        # Générique (nom = DCI) ou spécialité de marque
+        if rng.random() < 0.4:
+            nom = dci
+        else:
+            nom = MARQUES[int(rng.integers(len(MARQUES)))] + dci.split("-")[0].split()[0].lower()[:5]
+        cle = (nom, forme, dosage)
+        if cle in vus:
+            nom = f"{nom} {len(medicaments) + 1}"
+        vus.add(cle)
+        medicaments.append({
+            "nom_commercial": nom,
+            "dci": dci,
+            "laboratoire": LABORATOIRES[int(rng.integers(len(LABORATOIRES)))],
+            "forme": forme,
+            "dosage": dosage,
+        })
+        prix.append(prix_dci * float(rng.lognormal(0, 0.3)))
+    return medicaments, np.array(prix)
+
+
+def generer_stocks(
+    n_pharmacies: int,
+    prix_reference: np.ndarray,
+    densite: float,
+    rng: np.random.Generator
+) -> List[Tuple[int, int, int, float]]:
+    """
+    (index pharmacie, index médicament, quantité, prix)
+
+    Popularité en loi de Zipf : les premiers médicaments sont dans presque
+    toutes les pharmacies, la longue traîne dans quelques-unes.
+    """
+    n_medicaments = len(prix_reference)
+    rangs = rng.permutation(n_medicaments) + 1
+    popularite = 1.0 / rangs ** 0.8
+    popularite /= popularite.sum()
+
+    stocks = []
+    for p in range(n_pharmacies):
+        # Grandes officines et petites pharmacies de quartier
+        taille = int(np.clip(rng.normal(densite, densite / 3), 0.01, 1.0) * n_medicaments)
+        if taille == 0:
+            continue
+        medicaments = rng.choice(n_medicaments, size=taille, replace=False, p=popularite)
+        quantites = rng.poisson(30, size=taille)
+        quantites[rng.random(taille) < PART_RUPTURE] = 0
+        marges = rng.lognormal(0, 0.1, size=taille)
+        for m, quantite, marge in zip(medicaments, quantites, marges):
+            stocks.append((p, int(m), int(quantite), round(float(prix_reference[m] * marge), -1)))
+    return stocks
+
+
+def generer(n_pharmacies: int, n_medicaments: int, densite: float, seed: int):
+    """Jeu de données complet, entièrement déterminé par les paramètres"""
+    rng = np.random.default_rng(seed)
+    pharmacies = generer_pharmacies(n_pharmacies, rng)
+    medicaments, prix = generer_medicaments(n_medicaments, rng)
+    stocks = generer_stocks(n_pharmacies, prix, densite, rng)
+    return pharmacies, medicaments, stocks
+
+
+def inserer(pharmacies, medicaments, stocks, taille_lot: int = 5000) -> None:
+    with engine.begin() as connection:
+        connection.execute(
+            text("""
+                INSERT INTO pharmacies (nom, adresse, telephone, location, horaires, actif, type, created_at, updated_at)
+                VALUES (:nom, :adresse, :telephone,
+                        ST_SetSRID(ST_MakePoint(:longitude, :latitude), 4326)::geography,
+                        CAST(:horaires AS json), :actif, :type, NOW(), NOW())
+            """),
+            [dict(p, horaires=json.dumps(p["horaires"], ensure_ascii=False)) for p in pharmacies]
+        )
+        pharmacie_ids = [r[0] for r in connection.execute(text("SELECT id FROM pharmacies ORDER BY id"))]
+
+        connection.execute(insert(Medicament.__table__), medicaments)
+        medicament_ids = [r[0] for r in connection.execute(text("SELECT id FROM medicaments ORDER BY id"))]
+
+        for debut in range(0, len(stocks), taille_lot):
+            connection.execute(insert(Stock.__table__), [
+                {
+                    "pharmacie_id": pharmacie_ids[p],
+                    "medicament_id": medicament_ids[m],
+                    "quantite": quantite,
+                    "prix": prix,
+                }
+                for p, m, quantite, prix in stocks[debut:debut + taille_lot]
+            ])
+
+        connection.execute(text("ANALYZE pharmacies"))
+        connection.execute(text("ANALYZE medicaments"))
+        connection.execute(text("ANALYZE stocks"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pharmacies", type=int, default=2000)
+    parser.add_argument("--medicaments", type=int, default=1500)
+    parser.add_argument("--densite", type=float, default=0.15,
+                        help="Part moyenne du catalogue présente dans une pharmacie")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reinitialiser", action="store_true",
+                        help="Vider pharmacies, médicaments et stocks avant d'insérer")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        if args.reinitialiser:
+            connection.execute(text(
+                "TRUNCATE stocks, stocks_supprimes, pharmacies, medicaments RESTART IDENTITY CASCADE"
+            ))
+        elif connection.execute(text("SELECT EXISTS (SELECT 1 FROM pharmacies)")).scalar():
+            print("La table pharmacies n'est pas vide : relancer avec --reinitialiser")
+            return 1
+
+    debut = time.perf_counter()
+    pharmacies, medicaments, stocks = generer(args.pharmacies, args.medicaments, args.densite, args.seed)
+    print(f"Généré : {len(pharmacies)} pharmacies, {len(medicaments)} médicaments, "
+          f"{len(stocks)} stocks en {time.perf_counter() - debut:.1f} s")
+
+    debut = time.perf_counter()
+    inserer(pharmacies, medicaments, stocks)
+    print(f"Inséré en {time.perf_counter() - debut:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+-- Initialisation de la base VonjiAIna
+-- Crée le schéma (tables des modèles SQLAlchemy), les extensions et les
+-- index. En production (ENVIRONMENT=production) l'application ne lance pas
+-- Base.metadata.create_all : ce script doit avoir été exécuté avant le
+-- premier démarrage, et rejoué à chaque évolution du schéma.
+-- Idempotent : peut être rejoué sans risque sur une base existante.
+
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+-- Tables (reflet de models/ ; tests/test_demarrage.py vérifie qu'aucune
+-- table ni colonne n'y manque)
+CREATE TABLE IF NOT EXISTS pharmacies (
+    id SERIAL PRIMARY KEY,
+    nom VARCHAR(255) NOT NULL,
+    adresse VARCHAR(500),
+    telephone VARCHAR(20),
+    email VARCHAR(255),
+    location geography(POINT, 4326) NOT NULL,
+    horaires JSON,
+    actif BOOLEAN,
+    type VARCHAR(50),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS ix_pharmacies_id ON pharmacies (id);
+
+CREATE TABLE IF NOT EXISTS medicaments (
+    id SERIAL PRIMARY KEY,
+    nom_commercial VARCHAR(255) NOT NULL,
+    dci VARCHAR(255),
+    laboratoire VARCHAR(255),
+    forme VARCHAR(100),
+    dosage VARCHAR(50),
+    description TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS ix_medicaments_id ON medicaments (id);
+CREATE INDEX IF NOT EXISTS ix_medicaments_nom_commercial ON medicaments (nom_commercial);
+CREATE INDEX IF NOT EXISTS ix_medicaments_dci ON medicaments (dci);
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) NOT NULL,
+    nom VARCHAR(255) NOT NULL,
+    hashed_password VARCHAR(255) NOT NULL,
+    role VARCHAR(50),
+    pharmacie_id INTEGER,
+    is_active BOOLEAN,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_users_id ON users (id);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS stocks (
+    id SERIAL PRIMARY KEY,
+    pharmacie_id INTEGER NOT NULL REFERENCES pharmacies (id),
+    medicament_id INTEGER NOT NULL REFERENCES medicaments (id),
+    quantite INTEGER NOT NULL,
+    prix FLOAT,
+    date_maj TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    xid_ecriture BIGINT NOT NULL DEFAULT pg_current_xact_id()::text::bigint
+);
+CREATE INDEX IF NOT EXISTS ix_stocks_id ON stocks (id);
+
+-- Suppressions de stock, pour le flux /stocks/changes
+CREATE TABLE IF NOT EXISTS stocks_supprimes (
+    id SERIAL PRIMARY KEY,
+    stock_id INTEGER NOT NULL,
+    pharmacie_id INTEGER NOT NULL,
+    medicament_id INTEGER NOT NULL,
+    date_suppression TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    xid_ecriture BIGINT NOT NULL DEFAULT pg_current_xact_id()::text::bigint
+);
+
+-- Bases créées avant ces colonnes : voir les ALTER TABLE ... ADD COLUMN
+-- IF NOT EXISTS plus bas
+
+-- Recherche par rayon : ST_DWithin / ST_Distance sur pharmacies.location
+CREATE INDEX IF NOT EXISTS idx_pharmacies_location
+    ON pharmacies USING gist (location);
+
+ANALYZE pharmacies;
+
+-- Disponibilité : une ligne par (médicament, pharmacie), couvrant quantite et prix
+CREATE UNIQUE INDEX IF NOT EXISTS ux_stocks_medicament_pharmacie
+    ON stocks (medicament_id, pharmacie_id) INCLUDE (quantite, prix);
+
+-- Fraîcheur du stock (tri "pertinence") : les anciennes lignes n'ont pas de date_maj
+UPDATE stocks SET date_maj = now() WHERE date_maj IS NULL;
+
+-- Flux /stocks/changes : curseur (xid_ecriture, id), où xid_ecriture est
+-- l'identifiant 64 bits de la transaction d'écriture (PostgreSQL 13+).
+-- Filtré par pg_snapshot_xmin, il suit l'ordre de validation, contrairement
+-- à une date posée par l'application. Les lignes existantes prennent 0 :
+-- elles sont rendues au premier parcours du flux.
+ALTER TABLE stocks ADD COLUMN IF NOT EXISTS xid_ecriture bigint NOT NULL DEFAULT 0;
+ALTER TABLE stocks ALTER COLUMN xid_ecriture SET DEFAULT pg_current_xact_id()::text::bigint;
+ALTER TABLE stocks_supprimes ADD COLUMN IF NOT EXISTS xid_ecriture bigint NOT NULL DEFAULT 0;
+ALTER TABLE stocks_supprimes ALTER COLUMN xid_ecriture SET DEFAULT pg_current_xact_id()::text::bigint;
+
+-- Toute mise à jour, y compris hors de l'application, avance la ligne dans le flux
+CREATE OR REPLACE FUNCTION marquer_xid_ecriture() RETURNS trigger AS $$
+BEGIN
+    NEW.xid_ecriture := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS stocks_xid_ecriture ON stocks;
+CREATE TRIGGER stocks_xid_ecriture BEFORE UPDATE ON stocks
+    FOR EACH ROW EXECUTE FUNCTION marquer_xid_ecriture();
+
+DROP INDEX IF EXISTS idx_stocks_date_maj_id;
+DROP INDEX IF EXISTS idx_stocks_supprimes_date_id;
+CREATE INDEX IF NOT EXISTS idx_stocks_xid_ecriture_id
+    ON stocks (xid_ecriture, id);
+CREATE INDEX IF NOT EXISTS idx_stocks_supprimes_xid_ecriture_id
+    ON stocks_supprimes (xid_ecriture, id);
+
+ANALYZE stocks;
+
+-- Recherche de médicaments : index trigrammes pour ILIKE '%...%'
+-- (repli de MedicamentRepository.find_by_name avant le chargement de l'index en mémoire)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_medicaments_nom_commercial_trgm
+    ON medicaments USING gin (nom_commercial gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_medicaments_dci_trgm
+    ON medicaments USING gin (dci gin_trgm_ops);
+
+-- ETag / Last-Modified du catalogue (colonne ajoutée après coup)
+ALTER TABLE medicaments ADD COLUMN IF NOT EXISTS updated_at timestamptz;
+UPDATE medicaments SET updated_at = COALESCE(created_at, now()) WHERE updated_at IS NULL;
+
+ANALYZE medicaments;
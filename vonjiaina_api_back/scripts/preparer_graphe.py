@@ -0,0 +1,41 @@
+"""
+Préparer le réseau routier pour ROAD_GRAPH_PATH
+
+Lit un extrait OSM XML (.osm) ou un GeoJSON de voies (LineString avec
+propriétés highway et oneway) et écrit les tableaux du graphe en .npz,
+chargé en quelques millisecondes au démarrage. Les extraits .osm.pbf
+sont à convertir d'abord (osmium cat extrait.osm.pbf -o extrait.osm).
+
+Usage (depuis vonjiaina_api_back/) :
+    python -m scripts.preparer_graphe madagascar.osm data/reseau.npz
+"""
+import argparse
+import sys
+import time
+
+from utils.routage import GrapheRoutier
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("source", help="Extrait .osm ou .geojson")
+    parser.add_argument("destination", help="Fichier .npz à écrire")
+    args = parser.parse_args()
+
+    graphe = GrapheRoutier()
+    debut = time.perf_counter()
+    graphe.charger_fichier(args.source)
+    print(f"Lu en {time.perf_counter() - debut:.1f} s : {graphe.statistiques()}")
+    if not graphe.est_charge:
+        print("Aucune voie trouvée (tag highway)")
+        return 1
+
+    graphe.sauvegarder(args.destination)
+    debut = time.perf_counter()
+    GrapheRoutier().charger_fichier(args.destination)
+    print(f"Écrit dans {args.destination} (rechargé en {(time.perf_counter() - debut) * 1000:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
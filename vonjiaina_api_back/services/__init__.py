@@ -4,8 +4,10 @@ Services contenant la logique métier
 
 from .search_service import SearchService
 from .auth import AuthService
+from .carte_service import CarteService
 
 __all__ = [
     "SearchService",
     "AuthService",
+    "CarteService",
 ]
\ No newline at end of file
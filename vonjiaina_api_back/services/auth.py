@@ -1,10 +1,16 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from repositories.user_repository import UserRepository
+from repositories.async_user_repository import AsyncUserRepository
 from utils.security import verify_password, get_password_hash, create_access_token
+from utils.password_pool import password_pool
 from models.user import User
 from schemas.user import UserCreate
 
+# Rôle de tout compte créé par l'inscription publique
+ROLE_INSCRIPTION = "user"
+
 class AuthService:
     
     @staticmethod
@@ -34,12 +40,48 @@ class AuthService:
             email=user_data.email,
             nom=user_data.nom,
             hashed_password=hashed_password,
-            role=user_data.role,
-            pharmacie_id=user_data.pharmacie_id
+            role=ROLE_INSCRIPTION,
+            pharmacie_id=None
         )
         
         return user
     
+    @staticmethod
+    async def authenticate_user_async(db: AsyncSession, email: str, password: str) -> Optional[User]:
+        """
+        Authentifier un utilisateur (session asynchrone)
+
+        bcrypt tourne dans le pool de hachage ; un hash d'un ancien coût
+        est remplacé de façon transparente
+        """
+        user = await AsyncUserRepository.find_by_email(db, email)
+        if not user:
+            return None
+        valide, nouveau_hash = await password_pool.verifier(password, user.hashed_password)
+        if not valide:
+            return None
+        if nouveau_hash:
+            user = await AsyncUserRepository.update_password(db, user, nouveau_hash)
+        return user
+
+    @staticmethod
+    async def register_user_async(db: AsyncSession, user_data: UserCreate) -> User:
+        """Enregistrer un nouvel utilisateur (session asynchrone)"""
+        existing_user = await AsyncUserRepository.find_by_email(db, user_data.email)
+        if existing_user:
+            raise ValueError("Cet email est déjà utilisé")
+
+        hashed_password = await password_pool.hacher(user_data.password)
+
+        return await AsyncUserRepository.create(
+            db=db,
+            email=user_data.email,
+            nom=user_data.nom,
+            hashed_password=hashed_password,
+            role=ROLE_INSCRIPTION,
+            pharmacie_id=None
+        )
+
     @staticmethod
     def create_token_for_user(user: User) -> str:
         """Créer un token JWT pour un utilisateur"""
@@ -0,0 +1,52 @@
+import asyncio
+from typing import List, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from repositories.pharmacie_repository import PharmacieRepository
+from repositories.async_pharmacie_repository import AsyncPharmacieRepository
+from utils.carte_index import carte_index, tuiles_cache
+
+# Un seul chargement de l'index si plusieurs vues arrivent avant le préchauffage
+_chargement = asyncio.Lock()
+
+
+class CarteService:
+
+    @staticmethod
+    def charger_index(db: Session) -> int:
+        """
+        Charger l'index de la carte (au démarrage)
+        """
+        carte_index.charger(PharmacieRepository.get_marqueurs(db))
+        return len(carte_index)
+
+    @staticmethod
+    async def groupes_async(
+        db: AsyncSession,
+        sud: float,
+        ouest: float,
+        nord: float,
+        est: float,
+        zoom: int
+    ) -> List[dict]:
+        """
+        Groupes de pharmacies visibles dans la vue, lus dans l'index de
+        la carte (chargé depuis la base à la première vue si le
+        préchauffage n'est pas terminé)
+        """
+        if not carte_index.est_charge:
+            async with _chargement:
+                if not carte_index.est_charge:
+                    carte_index.charger(await AsyncPharmacieRepository.get_marqueurs(db))
+        return carte_index.clusters(sud, ouest, nord, est, zoom)
+
+    @staticmethod
+    async def tuile_async(db: AsyncSession, z: int, x: int, y: int) -> Tuple[bytes, str]:
+        """
+        (contenu MVT, empreinte) de la tuile z/x/y, depuis le cache ou
+        calculée par PostGIS puis mise en cache
+        """
+        en_cache = tuiles_cache.get(z, x, y)
+        if en_cache is not None:
+            return en_cache
+        return tuiles_cache.put(z, x, y, await AsyncPharmacieRepository.get_tuile(db, z, x, y))
@@ -0,0 +1,117 @@
+from typing import Dict, List, Set
+from services.pharmacie_statuts_service import PharmacieStatusService
+
+# Colonnes propres à l'offre (médicament en stock), le reste décrit la pharmacie
+COLONNES_OFFRE = ("item", "medicament_id", "nom_commercial", "forme", "dosage", "prix", "quantite", "date_maj")
+
+# Nombre maximum de pharmacies complètes renvoyées
+LIMITE_COMPLETES = 20
+
+
+class OrdonnanceService:
+
+    @staticmethod
+    def composer(
+        medicaments: List[str],
+        offres: List[dict],
+        limite: int = LIMITE_COMPLETES
+    ) -> dict:
+        """
+        Réponse d'une recherche d'ordonnance à partir des offres
+        (une par pharmacie et par item, avec distance)
+
+        - completes : pharmacies ayant tous les médicaments, par distance
+        - couverture : si aucune ne les a tous, un petit ensemble de
+          pharmacies proches qui les couvre ensemble (set cover glouton)
+        - introuvables : médicaments qu'aucune pharmacie de la zone n'a
+        """
+        pharmacies = OrdonnanceService._par_pharmacie(offres)
+        PharmacieStatusService.appliquer_statuts(list(pharmacies.values()))
+
+        tous = set(range(len(medicaments)))
+        trouves = {item for p in pharmacies.values() for item in p['offres']}
+        introuvables = [medicaments[item] for item in sorted(tous - trouves)]
+
+        completes = sorted(
+            (p for p in pharmacies.values() if len(p['offres']) == len(tous)),
+            key=lambda p: p['distance']
+        )[:limite]
+
+        couverture = []
+        if not completes:
+            couverture = [
+                OrdonnanceService._formater(pharmacie, items, medicaments)
+                for pharmacie, items in OrdonnanceService.couvrir(
+                    list(pharmacies.values()), trouves
+                )
+            ]
+
+        return {
+            "completes": [
+                OrdonnanceService._formater(p, set(p['offres']), medicaments)
+                for p in completes
+            ],
+            "couverture": couverture,
+            "introuvables": introuvables,
+        }
+
+    @staticmethod
+    def couvrir(pharmacies: List[dict], items: Set[int]) -> List[tuple]:
+        """
+        Set cover glouton : à chaque étape, la pharmacie qui apporte le
+        plus de médicaments manquants, la plus proche en cas d'égalité
+
+        Returns:
+            Liste de (pharmacie, items achetés dans cette pharmacie)
+        """
+        restants = set(items)
+        choisies = []
+        while restants:
+            meilleure = min(
+                pharmacies,
+                key=lambda p: (-len(restants.intersection(p['offres'])), p['distance']),
+                default=None
+            )
+            if meilleure is None:
+                break
+            apport = restants.intersection(meilleure['offres'])
+            if not apport:
+                break
+            choisies.append((meilleure, apport))
+            restants -= apport
+        return choisies
+
+    @staticmethod
+    def _par_pharmacie(offres: List[dict]) -> Dict[int, dict]:
+        pharmacies: Dict[int, dict] = {}
+        for offre in offres:
+            pharmacie = pharmacies.get(offre['id'])
+            if pharmacie is None:
+                pharmacie = {
+                    cle: valeur for cle, valeur in offre.items()
+                    if cle not in COLONNES_OFFRE
+                }
+                pharmacie['offres'] = {}
+                pharmacies[offre['id']] = pharmacie
+            pharmacie['offres'][offre['item']] = {
+                cle: offre[cle] for cle in COLONNES_OFFRE
+            }
+        return pharmacies
+
+    @staticmethod
+    def _formater(pharmacie: dict, items: Set[int], medicaments: List[str]) -> dict:
+        resultat = {
+            cle: valeur for cle, valeur in pharmacie.items()
+            if cle not in ('offres', 'horaires', 'updated_at')
+        }
+        resultat['distance_km'] = round(pharmacie['distance'] / 1000, 2)
+        resultat['medicaments'] = []
+        for item in sorted(items):
+            offre = dict(pharmacie['offres'][item])
+            offre['demande'] = medicaments[offre.pop('item')]
+            if offre.get('prix'):
+                offre['prix'] = round(offre['prix'], 0)
+            resultat['medicaments'].append(offre)
+        prix = [o['prix'] for o in resultat['medicaments'] if o.get('prix') is not None]
+        resultat['prix_total'] = sum(prix) if prix else None
+        return resultat
@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Profils de tri exposés via le paramètre `tri=` de /pharmacies/search
+# Poids appliqués à des critères normalisés entre 0 et 1 (0 = meilleur) :
+# - distance : distance / rayon de recherche
+# - fermee : 0 si ouverte ou de garde, 1 sinon
+# - prix : 0 pour le moins cher des candidats, 1 pour le plus cher
+# - anciennete : âge de la mise à jour du stock, plafonné à une semaine
+PROFILS: Dict[str, dict] = {
+    # Plus proche d'abord
+    "distance": {"distance": 1.0},
+    # Plus proche parmi les pharmacies ouvertes (les fermées en dernier)
+    "ouverte": {"distance": 1.0, "fermee": 10.0},
+    # Moins cher dans un rayon de 3 km
+    "prix": {"prix": 1.0, "distance": 0.01, "distance_max": 3000},
+    # Uniquement les pharmacies de garde, plus proche d'abord
+    "garde": {"distance": 1.0, "garde_uniquement": True},
+    # Compromis : ouverte, proche, pas chère, stock récent
+    "pertinence": {"distance": 1.0, "fermee": 2.0, "prix": 0.5, "anciennete": 0.3},
+}
+
+TRI_PAR_DEFAUT = "distance"
+
+# Au-delà, un stock est considéré comme ancien
+ANCIENNETE_MAX_HEURES = 7 * 24
+
+
+class RankingService:
+
+    @staticmethod
+    def classer(
+        pharmacies: List[dict],
+        tri: str = TRI_PAR_DEFAUT,
+        filtre_statut: Optional[str] = None,  # "garde", "ouverte", ou None
+        rayon_metres: float = 5000,
+        limite: int = 20,
+        poids: Optional[dict] = None
+    ) -> List[dict]:
+        """
+        Classer les candidates d'une recherche et garder les `limite` meilleures
+
+        Tous les critères sont calculés d'un coup sur des tableaux NumPy,
+        puis un tri partiel (argpartition) sélectionne le top k.
+
+        Args:
+            pharmacies: candidates avec distance, statut, type, prix, date_maj
+            tri: nom d'un profil de PROFILS
+            filtre_statut: filtre appliqué avant le classement
+            poids: poids personnalisés, remplacent ceux du profil
+        """
+        if not pharmacies:
+            return []
+
+        profil = dict(PROFILS[tri])
+        if poids:
+            profil.update(poids)
+
+        n = len(pharmacies)
+        distances = np.fromiter((p['distance'] for p in pharmacies), dtype=np.float64, count=n)
+        statuts = np.array([p.get('statut') for p in pharmacies], dtype=object)
+        types = np.array([p.get('type') for p in pharmacies], dtype=object)
+        prix = np.array(
+            [p['prix'] if p.get('prix') is not None else np.nan for p in pharmacies],
+            dtype=np.float64
+        )
+        anciennete = RankingService._anciennete_heures(pharmacies)
+
+        # Filtres
+        garde = types == "garde"
+        disponible = garde | (statuts == "ouverte")
+        garder = np.ones(n, dtype=bool)
+        if filtre_statut == "garde" or profil.get("garde_uniquement"):
+            garder &= garde
+        if filtre_statut == "ouverte":
+            garder &= disponible
+        if profil.get("distance_max") is not None:
+            garder &= distances <= profil["distance_max"]
+
+        indices = np.flatnonzero(garder)
+        if not len(indices):
+            return []
+
+        # Critères normalisés (0 = meilleur)
+        score = np.zeros(len(indices))
+        if profil.get("distance"):
+            score += profil["distance"] * distances[indices] / max(rayon_metres, 1)
+        if profil.get("fermee"):
+            score += profil["fermee"] * (~disponible[indices])
+        if profil.get("prix"):
+            score += profil["prix"] * RankingService._normaliser(prix[indices])
+        if profil.get("anciennete"):
+            score += profil["anciennete"] * np.minimum(
+                anciennete[indices] / ANCIENNETE_MAX_HEURES, 1.0
+            )
+
+        # Top k par tri partiel, départage par distance
+        k = min(limite, len(indices))
+        if k < len(indices):
+            meilleurs = np.argpartition(score, k - 1)[:k]
+        else:
+            meilleurs = np.arange(len(indices))
+        ordre = meilleurs[np.lexsort((distances[indices][meilleurs], score[meilleurs]))]
+
+        return [pharmacies[i] for i in indices[ordre]]
+
+    @staticmethod
+    def _normaliser(valeurs: np.ndarray) -> np.ndarray:
+        """Ramener entre 0 et 1 ; une valeur inconnue (NaN) vaut 1"""
+        if np.all(np.isnan(valeurs)):
+            return np.ones(len(valeurs))
+        minimum = np.nanmin(valeurs)
+        etendue = np.nanmax(valeurs) - minimum
+        if etendue == 0:
+            normalisees = np.zeros(len(valeurs))
+        else:
+            normalisees = (valeurs - minimum) / etendue
+        return np.where(np.isnan(normalisees), 1.0, normalisees)
+
+    @staticmethod
+    def _anciennete_heures(pharmacies: List[dict]) -> np.ndarray:
+        """Âge en heures de la dernière mise à jour du stock (inconnu = très ancien)"""
+        maintenant = datetime.now(timezone.utc).timestamp()
+        horodatages = np.array(
+            [p['date_maj'].timestamp() if p.get('date_maj') else np.nan for p in pharmacies],
+            dtype=np.float64
+        )
+        anciennete = (maintenant - horodatages) / 3600
+        return np.where(np.isnan(anciennete), ANCIENNETE_MAX_HEURES, anciennete)
@@ -1,9 +1,312 @@
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Callable, List, Optional, Tuple
+from app.observabilite import chronometre
 from repositories.pharmacie_repository import PharmacieRepository
+from repositories.async_pharmacie_repository import AsyncPharmacieRepository
+from repositories.medicament_repository import MedicamentRepository
+from services.pharmacie_statuts_service import PharmacieStatusService
+from services.ranking_service import PROFILS, RankingService, TRI_PAR_DEFAUT
+from services.ordonnance_service import OrdonnanceService
+from utils.spatial_index import pharmacie_index
+from utils.medicament_index import medicament_index
+from utils.suggestion_index import suggestion_index
+from utils.search_cache import search_cache
+from utils.routage import graphe_routier
+
+# Nombre maximum de résultats renvoyés
+LIMITE_RESULTATS = 20
+# Nombre maximum de candidates classées (les plus proches)
+LIMITE_CANDIDATS = 1000
+# Score minimum pour qu'un médicament corresponde à la saisie
+SEUIL_RESOLUTION = 0.6
+# Recherche des k plus proches : distance maximale et nombre d'anneaux
+RAYON_MAX_KM = 50.0
+MAX_ANNEAUX = 8
+# Filtre "ouverte" appliqué après le KNN SQL : candidates par résultat voulu
+FACTEUR_FILTRE_OUVERTE = 5
+# Profils reclassés par temps de trajet (la distance y est le critère principal)
+PROFILS_TRAJET = ("distance", "ouverte", "garde")
+
+
+# Prochain appel au repository : fn(repository, db), où repository est
+# PharmacieRepository ou AsyncPharmacieRepository (qui rend une coroutine)
+Requete = Callable[[type, Any], Any]
+
+
+class _RechercheDansLeRayon:
+    """
+    Pharmacies d'un rayon fixe ayant le médicament
+
+    Depuis le cache de la zone quand l'index spatial est chargé (une
+    requête sur les pharmacies de la zone en cas d'absence), sinon une
+    requête PostGIS. Tout se fait ici sauf l'accès à la base, confié à
+    SearchService._executer ou _executer_async.
+    """
+
+    def __init__(
+        self,
+        medicament: str,
+        latitude: float,
+        longitude: float,
+        rayon_km: float,
+        filtre_statut: Optional[str],
+        tri: str
+    ):
+        self.medicament = medicament
+        self.latitude = latitude
+        self.longitude = longitude
+        self.rayon_metres = int(rayon_km * 1000)
+        self.filtre_statut = filtre_statut
+        self.tri = tri
+        self.candidates: Optional[List[dict]] = None
+        self.cle = None
+
+        if pharmacie_index.est_charge:
+            self.cle = search_cache.cle(latitude, longitude, medicament, self.rayon_metres)
+            en_cache = search_cache.get(self.cle)
+            if en_cache is not None:
+                self.candidates, self.medicament_ids = en_cache
+                SearchService._compter_recherche(self.medicament_ids)
+                return
+        self.medicament_ids = SearchService.resoudre_medicament(medicament)
+
+    def requete(self) -> Optional[Requete]:
+        if self.candidates is not None:
+            return None
+        if self.cle is not None:
+            pharmacie_ids = SearchService._pharmacies_de_la_zone(self.cle, self.rayon_metres)
+            return lambda depot, db: depot.search_by_ids(
+                db, pharmacie_ids, self.medicament, self.medicament_ids
+            )
+        return lambda depot, db: depot.search_with_medicament(
+            db=db,
+            medicament_nom=self.medicament,
+            latitude=self.latitude,
+            longitude=self.longitude,
+            rayon_metres=self.rayon_metres,
+            medicament_ids=self.medicament_ids,
+            limite=LIMITE_CANDIDATS
+        )
+
+    def ajouter(self, lignes: List[dict]) -> None:
+        if self.cle is not None:
+            search_cache.put(self.cle, lignes, self.medicament_ids)
+        self.candidates = lignes
+
+    def resultats(self) -> List[dict]:
+        pharmacies = self.candidates
+        if self.cle is not None:
+            pharmacies = search_cache.autour_de(
+                pharmacies, self.latitude, self.longitude, self.rayon_metres
+            )
+        return SearchService._finaliser(pharmacies, self.filtre_statut, self.tri, self.rayon_metres)
+
+
+class _RechercheParAnneaux:
+    """
+    Les k plus proches par anneaux croissants autour du point, avec
+    l'index spatial en mémoire, sinon par KNN PostGIS (<->)
+
+    Chaque anneau ne contient que les pharmacies pas encore vérifiées :
+    une requête par anneau, sur au plus LIMITE_CANDIDATS pharmacies. Le
+    rayon double jusqu'à `rayon_max` ; la recherche s'arrête dès que k
+    pharmacies retenues sont trouvées, au pire après MAX_ANNEAUX requêtes.
+    """
+
+    def __init__(
+        self,
+        medicament: str,
+        latitude: float,
+        longitude: float,
+        k: int,
+        rayon_initial: float,
+        rayon_max: float,
+        filtre_statut: Optional[str],
+        tri: str
+    ):
+        self.medicament = medicament
+        self.medicament_ids = SearchService.resoudre_medicament(medicament)
+        self.latitude = latitude
+        self.longitude = longitude
+        self.k = k
+        self.rayon = min(rayon_initial, rayon_max)
+        self.rayon_max = rayon_max
+        self.filtre_statut = filtre_statut
+        self.tri = tri
+        self.garde_uniquement = SearchService._garde_uniquement(filtre_statut, tri)
+        self.par_index = pharmacie_index.est_charge
+        # Distance jusqu'à laquelle toutes les pharmacies ont été vérifiées
+        self.couvert = 0.0
+        self.anneaux = 0
+        self.trouvees: List[dict] = []
+        self.nb_retenues = 0
+        self._vues = set()
+        self._distances = {}
+
+    def requete(self) -> Optional[Requete]:
+        if not self.par_index:
+            # Une seule requête KNN
+            if self.anneaux:
+                return None
+            self.anneaux = 1
+            return lambda depot, db: depot.search_plus_proches(
+                db, self.medicament, self.latitude, self.longitude,
+                SearchService._limite_knn(self.k, self.filtre_statut), self.rayon_max,
+                garde_uniquement=self.garde_uniquement,
+                medicament_ids=self.medicament_ids
+            )
+
+        pharmacie_ids = self.prochaines()
+        if pharmacie_ids is None:
+            return None
+        return lambda depot, db: depot.search_by_ids(
+            db, pharmacie_ids, self.medicament, self.medicament_ids
+        )
+
+    def prochaines(self) -> Optional[List[int]]:
+        """Pharmacies du prochain anneau, ou None quand la recherche est finie"""
+        if (self.nb_retenues >= self.k or self.couvert >= self.rayon_max
+                or self.anneaux >= MAX_ANNEAUX):
+            return None
+
+        nouvelles = [
+            (pharmacie_id, distance)
+            for pharmacie_id, distance in pharmacie_index.rechercher(
+                self.latitude, self.longitude, self.rayon
+            )
+            if pharmacie_id not in self._vues
+        ][:LIMITE_CANDIDATS]
+
+        if len(nouvelles) == LIMITE_CANDIDATS:
+            # Anneau trop peuplé : il sera terminé au tour suivant
+            self.couvert = nouvelles[-1][1]
+        else:
+            self.couvert = self.rayon
+            self.rayon = min(self.rayon * 2, self.rayon_max)
+
+        self.anneaux += 1
+        self._vues.update(pharmacie_id for pharmacie_id, _ in nouvelles)
+        self._distances.update(nouvelles)
+        return [pharmacie_id for pharmacie_id, _ in nouvelles]
+
+    def ajouter(self, lignes: List[dict]) -> None:
+        """Pharmacies de l'anneau (ou du KNN) ayant le médicament"""
+        if not self.par_index:
+            self.trouvees = lignes
+            self.couvert = SearchService._distance_couverte(lignes, self.k, self.rayon_max)
+            return
+        for ligne in lignes:
+            ligne['distance'] = self._distances[ligne['id']]
+        PharmacieStatusService.appliquer_statuts(lignes)
+        self.trouvees.extend(lignes)
+        self.nb_retenues += sum(1 for ligne in lignes if self._retenue(ligne))
+
+    def resultats(self) -> Tuple[List[dict], float]:
+        return SearchService._finaliser(
+            self.trouvees, self.filtre_statut, self.tri, self.couvert, limite=self.k
+        ), self.couvert
+
+    def _retenue(self, pharmacie: dict) -> bool:
+        if self.garde_uniquement:
+            return pharmacie.get('type') == "garde"
+        if self.filtre_statut == "ouverte":
+            return pharmacie['statut'] in ("ouverte", "garde")
+        return True
+
+
+class _RechercheOrdonnance:
+    """
+    Offres des pharmacies du rayon pour tous les médicaments d'une
+    ordonnance, en une seule requête, puis composition
+    """
+
+    def __init__(self, medicaments: List[str], latitude: float, longitude: float, rayon_km: float):
+        self.medicaments = medicaments
+        self.latitude = latitude
+        self.longitude = longitude
+        self.rayon_metres = int(rayon_km * 1000)
+        self.medicament_ids = SearchService._resoudre_ordonnance(medicaments)
+        self.offres: Optional[List[dict]] = None
+
+    def requete(self) -> Optional[Requete]:
+        if self.offres is not None:
+            return None
+        pharmacie_ids = SearchService._pharmacies_du_rayon(self.latitude, self.longitude, self.rayon_metres)
+        return lambda depot, db: depot.search_ordonnance(
+            db,
+            self.medicaments,
+            self.latitude,
+            self.longitude,
+            self.rayon_metres,
+            medicament_ids=self.medicament_ids,
+            pharmacie_ids=pharmacie_ids
+        )
+
+    def ajouter(self, lignes: List[dict]) -> None:
+        self.offres = lignes
+
+    def resultats(self) -> dict:
+        with chronometre("classement"):
+            return OrdonnanceService.composer(self.medicaments, self.offres)
+
 
 class SearchService:
-    
+
+    @staticmethod
+    def charger_index(db: Session) -> int:
+        """
+        Charger l'index spatial des pharmacies (au démarrage)
+        """
+        pharmacie_index.charger(PharmacieRepository.get_coordonnees(db))
+        return len(pharmacie_index)
+
+    @staticmethod
+    def charger_index_medicaments(db: Session) -> int:
+        """
+        Charger les index des noms de médicaments : trigrammes pour la
+        recherche, tableau trié pour l'autocomplétion (au démarrage)
+        """
+        noms = MedicamentRepository.get_noms(db)
+        medicament_index.charger(noms)
+        suggestion_index.charger(noms, MedicamentRepository.get_popularite(db))
+        return len(medicament_index)
+
+    @staticmethod
+    def resoudre_medicament(medicament: str) -> Optional[List[int]]:
+        """
+        IDs des médicaments correspondant à la saisie (fautes et accents
+        tolérés), ou None si l'index n'est pas chargé
+        """
+        if not medicament_index.est_charge:
+            return None
+        medicament_ids = [
+            medicament_id for medicament_id, _ in
+            medicament_index.rechercher(medicament, seuil=SEUIL_RESOLUTION)
+        ]
+        SearchService._compter_recherche(medicament_ids)
+        return medicament_ids
+
+    @staticmethod
+    def _compter_recherche(medicament_ids: Optional[List[int]]) -> None:
+        if medicament_ids:
+            # Le meilleur résultat remonte dans l'autocomplétion
+            suggestion_index.enregistrer_recherche(medicament_ids[0])
+
+    @staticmethod
+    def _executer(db: Session, recherche):
+        """Faire une recherche avec une session synchrone"""
+        while (requete := recherche.requete()) is not None:
+            recherche.ajouter(requete(PharmacieRepository, db))
+        return recherche.resultats()
+
+    @staticmethod
+    async def _executer_async(db: AsyncSession, recherche):
+        """Faire une recherche avec une session asynchrone"""
+        while (requete := recherche.requete()) is not None:
+            recherche.ajouter(await requete(AsyncPharmacieRepository, db))
+        return recherche.resultats()
+
     @staticmethod
     def rechercher_pharmacies(
         db: Session,
@@ -11,26 +314,240 @@ class SearchService:
         latitude: float,
         longitude: float,
         rayon_km: float = 5.0,
-        filtre_statut: str = None  # "garde", "ouverte", ou None
+        filtre_statut: str = None,  # "garde", "ouverte", ou None
+        tri: str = TRI_PAR_DEFAUT
     ) -> List[dict]:
         """
         Service de recherche avec filtre de statut
+
+        Les candidates (pharmacies du rayon ayant le médicament) sont
+        récupérées, depuis le cache de la zone si possible, puis classées
+        selon le profil `tri`.
         """
-        rayon_metres = int(rayon_km * 1000)
-        
-        pharmacies = PharmacieRepository.search_with_medicament(
-            db=db,
-            medicament_nom=medicament,
-            latitude=latitude,
-            longitude=longitude,
-            rayon_metres=rayon_metres,
-            filtre_statut=filtre_statut
+        return SearchService._executer(db, _RechercheDansLeRayon(
+            medicament, latitude, longitude, rayon_km, filtre_statut, tri
+        ))
+
+    @staticmethod
+    async def rechercher_pharmacies_async(
+        db: AsyncSession,
+        medicament: str,
+        latitude: float,
+        longitude: float,
+        rayon_km: float = 5.0,
+        filtre_statut: str = None,  # "garde", "ouverte", ou None
+        tri: str = TRI_PAR_DEFAUT
+    ) -> List[dict]:
+        """
+        Même recherche que rechercher_pharmacies, avec une session asynchrone
+        """
+        return await SearchService._executer_async(db, _RechercheDansLeRayon(
+            medicament, latitude, longitude, rayon_km, filtre_statut, tri
+        ))
+
+    @staticmethod
+    def rechercher_plus_proches(
+        db: Session,
+        medicament: str,
+        latitude: float,
+        longitude: float,
+        k: int,
+        rayon_km: float = 5.0,
+        rayon_max_km: float = RAYON_MAX_KM,
+        filtre_statut: str = None,  # "garde", "ouverte", ou None
+        tri: str = TRI_PAR_DEFAUT
+    ) -> Tuple[List[dict], float]:
+        """
+        Les k pharmacies les plus proches ayant le médicament, quelle que
+        soit la densité : anneaux croissants à partir de `rayon_km` avec
+        l'index spatial, sinon KNN PostGIS (<->), jusqu'à `rayon_max_km`
+
+        Returns:
+            (pharmacies classées selon `tri`, distance couverte en mètres)
+        """
+        return SearchService._executer(db, _RechercheParAnneaux(
+            medicament, latitude, longitude, k, rayon_km * 1000, rayon_max_km * 1000, filtre_statut, tri
+        ))
+
+    @staticmethod
+    async def rechercher_plus_proches_async(
+        db: AsyncSession,
+        medicament: str,
+        latitude: float,
+        longitude: float,
+        k: int,
+        rayon_km: float = 5.0,
+        rayon_max_km: float = RAYON_MAX_KM,
+        filtre_statut: str = None,  # "garde", "ouverte", ou None
+        tri: str = TRI_PAR_DEFAUT
+    ) -> Tuple[List[dict], float]:
+        """
+        Même recherche que rechercher_plus_proches, avec une session asynchrone
+        """
+        return await SearchService._executer_async(db, _RechercheParAnneaux(
+            medicament, latitude, longitude, k, rayon_km * 1000, rayon_max_km * 1000, filtre_statut, tri
+        ))
+
+    @staticmethod
+    def _garde_uniquement(filtre_statut: Optional[str], tri: str) -> bool:
+        return filtre_statut == "garde" or bool(PROFILS[tri].get("garde_uniquement"))
+
+    @staticmethod
+    def _limite_knn(k: int, filtre_statut: Optional[str]) -> int:
+        # Le statut "ouverte" dépend des horaires : filtré après la requête
+        if filtre_statut == "ouverte":
+            return min(k * FACTEUR_FILTRE_OUVERTE, LIMITE_CANDIDATS)
+        return k
+
+    @staticmethod
+    def _distance_couverte(pharmacies: List[dict], k: int, rayon_max: float) -> float:
+        """Distance de la k-ième trouvée, ou rayon maximal si moins de k"""
+        if len(pharmacies) >= k:
+            return max(p['distance'] for p in pharmacies)
+        return rayon_max
+
+    @staticmethod
+    def rechercher_ordonnance(
+        db: Session,
+        medicaments: List[str],
+        latitude: float,
+        longitude: float,
+        rayon_km: float = 5.0
+    ) -> dict:
+        """
+        Pharmacies ayant tous les médicaments d'une ordonnance, ou à défaut
+        un ensemble minimal de pharmacies proches qui les couvrent, à
+        partir d'une seule requête sur les stocks
+        """
+        return SearchService._executer(db, _RechercheOrdonnance(medicaments, latitude, longitude, rayon_km))
+
+    @staticmethod
+    async def rechercher_ordonnance_async(
+        db: AsyncSession,
+        medicaments: List[str],
+        latitude: float,
+        longitude: float,
+        rayon_km: float = 5.0
+    ) -> dict:
+        """
+        Même recherche que rechercher_ordonnance, avec une session asynchrone
+        """
+        return await SearchService._executer_async(
+            db, _RechercheOrdonnance(medicaments, latitude, longitude, rayon_km)
         )
-        
-        # Enrichir les données
-        for pharmacie in pharmacies:
-            pharmacie['distance_km'] = round(pharmacie['distance'] / 1000, 2)
-            if pharmacie.get('prix'):
-                pharmacie['prix'] = round(pharmacie['prix'], 0)
-        
-        return pharmacies
\ No newline at end of file
+
+    @staticmethod
+    def _resoudre_ordonnance(medicaments: List[str]) -> Optional[List[List[int]]]:
+        """IDs résolus par item, ou None si l'index n'est pas chargé (ILIKE)"""
+        if not medicament_index.est_charge:
+            return None
+        return [SearchService.resoudre_medicament(nom) or [] for nom in medicaments]
+
+    @staticmethod
+    def _pharmacies_du_rayon(
+        latitude: float,
+        longitude: float,
+        rayon_metres: int
+    ) -> Optional[List[int]]:
+        """Candidates de l'index spatial, ou None s'il n'est pas chargé (ST_DWithin)"""
+        if not pharmacie_index.est_charge:
+            return None
+        return [
+            pharmacie_id for pharmacie_id, _ in
+            pharmacie_index.rechercher(latitude, longitude, rayon_metres)[:LIMITE_CANDIDATS]
+        ]
+
+    @staticmethod
+    def _pharmacies_de_la_zone(cle, rayon_metres: int) -> List[int]:
+        """
+        Pharmacies de la zone mise en cache (rayon élargi autour du centre
+        de la cellule) depuis l'index spatial ; une seule requête gardera
+        ensuite celles qui ont le médicament en stock
+
+        Pas de troncature aux LIMITE_CANDIDATS plus proches du centre :
+        l'entrée sert aussi les utilisateurs du bord de la cellule, pour
+        qui d'autres pharmacies sont les plus proches
+        """
+        latitude, longitude = search_cache.centre(cle)
+        return [
+            pharmacie_id for pharmacie_id, _ in pharmacie_index.rechercher(
+                latitude, longitude, search_cache.rayon_elargi(rayon_metres)
+            )
+        ]
+
+    @staticmethod
+    def _finaliser(
+        pharmacies: List[dict],
+        filtre_statut: Optional[str],
+        tri: str,
+        rayon_metres: int,
+        limite: int = LIMITE_RESULTATS
+    ) -> List[dict]:
+        """
+        Statuts, classement et mise en forme des candidates (sans base)
+        """
+        with chronometre("classement"):
+            # Statut calculé sur un seul instantané pour toute la requête
+            PharmacieStatusService.appliquer_statuts(pharmacies)
+
+            pharmacies = RankingService.classer(
+                pharmacies,
+                tri=tri,
+                filtre_statut=filtre_statut,
+                rayon_metres=rayon_metres,
+                limite=limite
+            )
+
+            # Enrichir les données
+            for pharmacie in pharmacies:
+                pharmacie['distance_km'] = round(pharmacie['distance'] / 1000, 2)
+                if pharmacie.get('prix'):
+                    pharmacie['prix'] = round(pharmacie['prix'], 0)
+
+        return pharmacies
+
+    @staticmethod
+    def classer_par_trajet(
+        pharmacies: List[dict],
+        latitude: float,
+        longitude: float,
+        mode: str,
+        tri: str,
+        budget_ms: float = 50.0,
+        trajet_max_min: float = 60.0
+    ) -> List[dict]:
+        """
+        Ajouter durée et longueur du trajet (à pied ou en voiture) aux
+        résultats, et les reclasser par durée pour les profils fondés sur
+        la distance (PROFILS_TRAJET ; avec "ouverte", les fermées restent
+        en dernier). Le calcul s'arrête après `budget_ms` : les pharmacies
+        non atteintes gardent une durée estimée à vol d'oiseau.
+
+        Les dictionnaires sont copiés : ceux du cache ne sont pas modifiés.
+        """
+        if not pharmacies:
+            return pharmacies
+        with chronometre("classement"):
+            trajets = graphe_routier.trajets(
+                latitude, longitude,
+                [(p['latitude'], p['longitude']) for p in pharmacies],
+                mode=mode,
+                budget_secondes=trajet_max_min * 60,
+                delai_secondes=budget_ms / 1000
+            )
+            resultats = []
+            for pharmacie, (secondes, metres, estime) in zip(pharmacies, trajets):
+                resultats.append({
+                    **pharmacie,
+                    'duree_trajet_min': round(secondes / 60, 1),
+                    'distance_trajet_km': round(metres / 1000, 2),
+                    'trajet_estime': estime,
+                })
+
+            if tri in PROFILS_TRAJET:
+                fermees_en_dernier = tri == "ouverte"
+                resultats.sort(key=lambda p: (
+                    fermees_en_dernier and p.get('statut') not in ("ouverte", "garde"),
+                    p['duree_trajet_min']
+                ))
+        return resultats
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+from typing import Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from repositories.async_stock_repository import AsyncStockRepository
+
+# Changements par page
+LIMITE_PAR_DEFAUT = 500
+
+# Position dans un flux : (xid_ecriture, id) du dernier changement rendu
+Position = Optional[Tuple[int, int]]
+
+
+class StockChangesService:
+
+    @staticmethod
+    async def lister(
+        db: AsyncSession,
+        curseur: Optional[str] = None,
+        limite: int = LIMITE_PAR_DEFAUT
+    ) -> dict:
+        """
+        Page de changements de stock après `curseur` (depuis le début sinon)
+
+        Deux flux parcourus par curseur (transaction d'écriture, id) sur
+        index : les stocks modifiés et les traces de suppression, fusionnés
+        par transaction. Seules les transactions terminées avant toutes
+        celles en cours sont lues (voir StockRepository.requete_changements) :
+        une transaction validée tardivement ne passe pas derrière le
+        curseur. Le curseur rendu garde la position dans chacun des flux.
+
+        Returns:
+            {"changements", "curseur", "a_suivre"}
+        """
+        apres_maj, apres_suppression = StockChangesService.decoder_curseur(curseur)
+
+        # Une ligne de plus par flux pour savoir s'il reste des changements
+        majs = [
+            {"type": "maj", "stock_id": row["id"], "pharmacie_id": row["pharmacie_id"],
+             "medicament_id": row["medicament_id"], "quantite": row["quantite"],
+             "prix": row["prix"], "date": row["date_maj"],
+             "_position": (row["xid_ecriture"], row["id"])}
+            for row in await AsyncStockRepository.changements(db, apres_maj, limite + 1)
+        ]
+        suppressions = [
+            {"type": "suppression", "stock_id": row["stock_id"], "pharmacie_id": row["pharmacie_id"],
+             "medicament_id": row["medicament_id"], "quantite": None, "prix": None,
+             "date": row["date_suppression"],
+             "_position": (row["xid_ecriture"], row["id"])}
+            for row in await AsyncStockRepository.suppressions(db, apres_suppression, limite + 1)
+        ]
+
+        page = sorted(
+            majs + suppressions,
+            key=lambda c: (c["_position"][0], c["type"] == "maj", c["_position"][1])
+        )[:limite]
+
+        for changement in page:
+            position = changement.pop("_position")
+            if changement["type"] == "maj":
+                apres_maj = position
+            else:
+                apres_suppression = position
+
+        return {
+            "changements": page,
+            "curseur": StockChangesService.encoder_curseur(apres_maj, apres_suppression),
+            "a_suivre": len(majs) + len(suppressions) > len(page),
+        }
+
+    @staticmethod
+    def encoder_curseur(apres_maj: Position, apres_suppression: Position) -> str:
+        """Curseur opaque (base64 url) des positions dans les deux flux"""
+        def position(p: Position):
+            return list(p) if p is not None else None
+
+        contenu = json.dumps({"m": position(apres_maj), "s": position(apres_suppression)})
+        return base64.urlsafe_b64encode(contenu.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decoder_curseur(curseur: Optional[str]) -> Tuple[Position, Position]:
+        """Positions (maj, suppression) d'un curseur, ou ValueError"""
+        if not curseur:
+            return None, None
+
+        def position(p) -> Position:
+            if p is None:
+                return None
+            xid, identifiant = p
+            if not isinstance(xid, int) or not isinstance(identifiant, int):
+                raise ValueError("position invalide")
+            return xid, identifiant
+
+        try:
+            contenu = json.loads(base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)))
+            return position(contenu["m"]), position(contenu["s"])
+        except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError):
+            raise ValueError("Curseur invalide")
@@ -0,0 +1,236 @@
+import csv
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from repositories.async_stock_repository import AsyncStockRepository
+
+# Lignes appliquées par requête / transaction
+TAILLE_LOT = 1000
+# Nombre maximum d'erreurs détaillées dans le rapport
+MAX_ERREURS = 1000
+
+FORMATS = ("csv", "ndjson")
+
+
+class RapportImport:
+    """Compteurs et erreurs par ligne d'un import"""
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.lignes_lues = 0
+        self.inserees = 0
+        self.mises_a_jour = 0
+        self.erreurs: List[dict] = []
+        self.nb_erreurs = 0
+
+    def erreur(self, numero: int, message: str) -> None:
+        self.nb_erreurs += 1
+        if len(self.erreurs) < MAX_ERREURS:
+            self.erreurs.append({"ligne": numero, "erreur": message})
+
+    def resume(self) -> dict:
+        duree = time.perf_counter() - self.debut
+        importees = self.inserees + self.mises_a_jour
+        return {
+            "lignes_lues": self.lignes_lues,
+            "lignes_importees": importees,
+            "inserees": self.inserees,
+            "mises_a_jour": self.mises_a_jour,
+            "erreurs": sorted(self.erreurs, key=lambda e: e["ligne"]),
+            "erreurs_tronquees": self.nb_erreurs > len(self.erreurs),
+            "duree_secondes": round(duree, 3),
+            "lignes_par_seconde": round(importees / duree, 1) if duree > 0 else 0.0,
+        }
+
+
+class StockImportService:
+
+    @staticmethod
+    async def importer(
+        db: AsyncSession,
+        flux: AsyncIterator[bytes],
+        format: str = "csv",
+        pharmacie_id: Optional[int] = None,
+        taille_lot: int = TAILLE_LOT,
+        pharmacie_imposee: Optional[int] = None
+    ) -> dict:
+        """
+        Importer des stocks depuis un flux CSV ou NDJSON
+
+        Le flux est lu au fil de l'eau ; chaque lot de `taille_lot` lignes
+        est appliqué en un seul INSERT ... ON CONFLICT DO UPDATE, dans sa
+        propre transaction. Les lignes invalides sont ignorées et
+        signalées dans le rapport.
+
+        CSV : en-tête pharmacie_id, medicament_id, quantite, prix
+        (séparateur , ou ;). NDJSON : un objet par ligne avec ces clés.
+        `pharmacie_id` s'applique aux lignes qui n'en donnent pas
+        (inventaire d'une seule pharmacie). Avec `pharmacie_imposee`
+        (compte pharmacie), les lignes d'une autre pharmacie sont rejetées.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Format inconnu : {format}")
+
+        rapport = RapportImport()
+        lignes = StockImportService._lignes(flux)
+        enregistrements = (
+            StockImportService._lire_csv(lignes) if format == "csv"
+            else StockImportService._lire_ndjson(lignes)
+        )
+
+        lot: List[Tuple[int, dict]] = []
+        async for numero, brut, erreur in enregistrements:
+            rapport.lignes_lues += 1
+            if erreur is None:
+                try:
+                    lot.append((numero, StockImportService._valider(brut, pharmacie_id, pharmacie_imposee)))
+                except (ValueError, TypeError) as e:
+                    erreur = str(e)
+            if erreur is not None:
+                rapport.erreur(numero, erreur)
+
+            if len(lot) >= taille_lot:
+                await StockImportService._appliquer_lot(db, lot, rapport, pharmacie_imposee)
+                lot = []
+
+        if lot:
+            await StockImportService._appliquer_lot(db, lot, rapport, pharmacie_imposee)
+
+        return rapport.resume()
+
+    @staticmethod
+    async def _lignes(flux: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+        """Lignes non vides (numéro, texte) d'un flux d'octets UTF-8"""
+        reste = b""
+        numero = 0
+        async for morceau in flux:
+            reste += morceau
+            *completes, reste = reste.split(b"\n")
+            for ligne in completes:
+                numero += 1
+                texte = ligne.decode("utf-8-sig" if numero == 1 else "utf-8", "replace").strip()
+                if texte:
+                    yield numero, texte
+        if reste.strip():
+            numero += 1
+            yield numero, reste.decode("utf-8-sig" if numero == 1 else "utf-8", "replace").strip()
+
+    @staticmethod
+    async def _lire_csv(lignes) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+        """(numéro, champs, erreur) pour chaque ligne après l'en-tête"""
+        colonnes = None
+        separateur = ","
+        async for numero, texte in lignes:
+            if colonnes is None:
+                if ";" in texte and "," not in texte:
+                    separateur = ";"
+                colonnes = [c.strip().lower() for c in next(csv.reader([texte], delimiter=separateur))]
+                continue
+
+            valeurs = next(csv.reader([texte], delimiter=separateur))
+            if len(valeurs) != len(colonnes):
+                yield numero, None, f"{len(valeurs)} colonnes au lieu de {len(colonnes)}"
+            else:
+                yield numero, dict(zip(colonnes, valeurs)), None
+
+    @staticmethod
+    async def _lire_ndjson(lignes) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+        async for numero, texte in lignes:
+            try:
+                objet = json.loads(texte)
+            except json.JSONDecodeError as e:
+                yield numero, None, f"JSON invalide : {e.msg}"
+                continue
+            if not isinstance(objet, dict):
+                yield numero, None, "un objet JSON est attendu"
+            else:
+                yield numero, objet, None
+
+    @staticmethod
+    def _valider(brut: Dict, pharmacie_id: Optional[int], pharmacie_imposee: Optional[int] = None) -> dict:
+        """Ligne prête pour l'upsert, ou ValueError"""
+        def entier(nom: str, defaut=None) -> int:
+            valeur = brut.get(nom)
+            if valeur is None or valeur == "":
+                if defaut is None:
+                    raise ValueError(f"{nom} manquant")
+                return defaut
+            if isinstance(valeur, float) and not valeur.is_integer():
+                raise ValueError(f"{nom} invalide : {valeur!r}")
+            try:
+                return int(valeur)
+            except ValueError:
+                raise ValueError(f"{nom} invalide : {valeur!r}")
+
+        quantite = entier("quantite")
+        if quantite < 0:
+            raise ValueError("quantite négative")
+
+        prix = brut.get("prix")
+        if prix is None or prix == "":
+            prix = None
+        else:
+            try:
+                prix = float(str(prix).replace(",", "."))
+            except ValueError:
+                raise ValueError(f"prix invalide : {brut.get('prix')!r}")
+            if prix < 0:
+                raise ValueError("prix négatif")
+
+        ligne_pharmacie = entier("pharmacie_id", pharmacie_id)
+        if pharmacie_imposee is not None and ligne_pharmacie != pharmacie_imposee:
+            raise ValueError(f"pharmacie {ligne_pharmacie} non autorisée pour ce compte")
+
+        return {
+            "pharmacie_id": ligne_pharmacie,
+            "medicament_id": entier("medicament_id"),
+            "quantite": quantite,
+            "prix": prix,
+        }
+
+    @staticmethod
+    async def _appliquer_lot(
+        db: AsyncSession,
+        lot: List[Tuple[int, dict]],
+        rapport: RapportImport,
+        pharmacie_imposee: Optional[int] = None
+    ) -> None:
+        # Un couple (pharmacie, médicament) une seule fois par requête : la dernière ligne gagne
+        par_cle: Dict[Tuple[int, int], Tuple[int, dict]] = {}
+        for numero, ligne in lot:
+            cle = (ligne["pharmacie_id"], ligne["medicament_id"])
+            if cle in par_cle:
+                rapport.erreur(par_cle[cle][0], f"remplacée par la ligne {numero}")
+            par_cle[cle] = (numero, ligne)
+
+        # Clés étrangères vérifiées d'avance : une ligne fautive ne fait pas échouer le lot
+        pharmacies, medicaments = await AsyncStockRepository.ids_existants(
+            db,
+            {p for p, _ in par_cle},
+            {m for _, m in par_cle}
+        )
+        valides = []
+        for (pharmacie_id, medicament_id), (numero, ligne) in par_cle.items():
+            if pharmacie_imposee is not None and pharmacie_id != pharmacie_imposee:
+                rapport.erreur(numero, f"pharmacie {pharmacie_id} non autorisée pour ce compte")
+            elif pharmacie_id not in pharmacies:
+                rapport.erreur(numero, f"pharmacie {pharmacie_id} inconnue")
+            elif medicament_id not in medicaments:
+                rapport.erreur(numero, f"médicament {medicament_id} inconnu")
+            else:
+                valides.append((numero, ligne))
+
+        try:
+            resultats = await AsyncStockRepository.upsert_many(db, [l for _, l in valides])
+        except SQLAlchemyError as e:
+            await db.rollback()
+            message = f"lot rejeté : {e.__class__.__name__}"
+            for numero, _ in valides:
+                rapport.erreur(numero, message)
+            return
+
+        inserees = sum(1 for _, _, inseree in resultats if inseree)
+        rapport.inserees += inserees
+        rapport.mises_a_jour += len(resultats) - inserees
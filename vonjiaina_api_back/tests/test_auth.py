@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from models.user import User
+from schemas.user import UserCreate
+from services import auth as auth_service
+from services.auth import AuthService
+
+
+@pytest.fixture
+def inscription(monkeypatch):
+    """Repository et pool de hachage remplacés : rend les champs du compte créé"""
+    crees = []
+
+    async def find_by_email(db, email):
+        return None
+
+    async def create(db, **champs):
+        crees.append(champs)
+        return User(id=1, is_active=True, **champs)
+
+    async def hacher(password):
+        return "hash"
+
+    monkeypatch.setattr(auth_service.AsyncUserRepository, "find_by_email", staticmethod(find_by_email))
+    monkeypatch.setattr(auth_service.AsyncUserRepository, "create", staticmethod(create))
+    monkeypatch.setattr(auth_service.password_pool, "hacher", hacher)
+    return crees
+
+
+def test_inscription_ne_donne_pas_de_role(inscription):
+    donnees = UserCreate.model_validate({
+        "email": "pirate@example.com",
+        "nom": "Pirate",
+        "password": "secret",
+        "role": "admin",
+        "pharmacie_id": 3,
+    })
+
+    user = asyncio.run(AuthService.register_user_async(None, donnees))
+
+    assert user.role == "user"
+    assert user.pharmacie_id is None
+    assert inscription[0]["role"] == "user"
+
+
+def test_schema_inscription_sans_role():
+    assert "role" not in UserCreate.model_fields
+    assert "pharmacie_id" not in UserCreate.model_fields
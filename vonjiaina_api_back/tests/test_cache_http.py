@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.cache_http import en_tetes, etag, non_modifie, reponse_304
+from app.config import get_settings
+from app.database import get_async_db
+from app.main import app
+from models.medicament import Medicament
+from routers import medicaments as routes_medicaments
+
+MODIFICATION = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+VERSION = etag("catalogue", MODIFICATION, 42)
+
+
+def requete(**en_tetes_client) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(nom.replace("_", "-").encode(), valeur.encode()) for nom, valeur in en_tetes_client.items()],
+    })
+
+
+def test_etag_faible_et_stable():
+    assert VERSION.startswith('W/"')
+    assert VERSION == etag("catalogue", MODIFICATION, 42)
+    assert VERSION != etag("catalogue", MODIFICATION, 41)
+
+
+def test_en_tetes():
+    valeurs = en_tetes(VERSION, MODIFICATION, 300)
+
+    assert valeurs["ETag"] == VERSION
+    assert valeurs["Last-Modified"] == "Sun, 01 Mar 2026 12:30:15 GMT"
+    assert "max-age=300" in valeurs["Cache-Control"]
+    assert "Last-Modified" not in en_tetes(VERSION, None, 300)
+
+
+@pytest.mark.parametrize("if_none_match, attendu", [
+    (VERSION, True),
+    (VERSION.removeprefix("W/"), True),  # comparaison faible
+    (f'"autre", {VERSION}', True),
+    ("*", True),
+    ('W/"autre"', False),
+])
+def test_if_none_match(if_none_match, attendu):
+    assert non_modifie(requete(if_none_match=if_none_match), VERSION, MODIFICATION) is attendu
+
+
+def test_if_modified_since():
+    derniere = "Sun, 01 Mar 2026 12:30:15 GMT"
+    avant = "Sun, 01 Mar 2026 12:30:14 GMT"
+
+    assert non_modifie(requete(if_modified_since=derniere), VERSION, MODIFICATION)
+    assert not non_modifie(requete(if_modified_since=avant), VERSION, MODIFICATION)
+    assert not non_modifie(requete(if_modified_since="hier"), VERSION, MODIFICATION)
+    assert not non_modifie(requete(if_modified_since=derniere), VERSION, None)
+    assert not non_modifie(requete(), VERSION, MODIFICATION)
+
+
+def test_if_none_match_prime_sur_if_modified_since():
+    client = requete(if_none_match='W/"autre"', if_modified_since="Sun, 01 Mar 2026 12:30:15 GMT")
+
+    assert not non_modifie(client, VERSION, MODIFICATION)
+
+
+def test_reponse_304():
+    reponse = reponse_304(VERSION, MODIFICATION, 60)
+
+    assert reponse.status_code == 304
+    assert reponse.body == b""
+    assert reponse.headers["etag"] == VERSION
+
+
+@pytest.fixture
+def catalogue(monkeypatch):
+    """Catalogue de 3 médicaments servi sans base"""
+    tous = [Medicament(id=i, nom_commercial=f"Medicament {i}", dci=None) for i in (1, 2, 3)]
+
+    async def get_version_catalogue(db):
+        return MODIFICATION, len(tous)
+
+    async def get_all(db, skip=0, limit=100, after_id=None):
+        restants = [m for m in tous if after_id is None or m.id > after_id]
+        return restants[skip if after_id is None else 0:][:limit]
+
+    async def sans_base():
+        yield None
+
+    depot = routes_medicaments.AsyncMedicamentRepository
+    monkeypatch.setattr(depot, "get_version_catalogue", staticmethod(get_version_catalogue))
+    monkeypatch.setattr(depot, "get_all", staticmethod(get_all))
+    app.dependency_overrides[get_async_db] = sans_base
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_catalogue_304_par_page(catalogue):
+    url = f"{get_settings().API_V1_PREFIX}/medicaments/"
+    premiere = catalogue.get(url, params={"limit": 2})
+    assert premiere.status_code == 200
+    assert premiere.headers["x-next-after-id"] == "2"
+
+    version = premiere.headers["etag"]
+    assert catalogue.get(url, params={"limit": 2}, headers={"If-None-Match": version}).status_code == 304
+
+    # Validateur de la première page envoyé pour la suivante : pas de 304
+    suivante = catalogue.get(url, params={"limit": 2, "after_id": 2}, headers={"If-None-Match": version})
+    assert suivante.status_code == 200
+    assert [m["id"] for m in suivante.json()] == [3]
+    assert suivante.headers["etag"] != version
@@ -0,0 +1,100 @@
+import pytest
+
+from utils.carte_index import CarteIndex, TuilesCache, tuile
+
+# Antananarivo
+LAT, LON = -18.9100, 47.5250
+# Boîte couvrant la ville
+VILLE = (LAT - 0.1, LON - 0.1, LAT + 0.1, LON + 0.1)
+
+
+def index_de_trois():
+    index = CarteIndex()
+    index.charger([
+        (1, LAT, LON, "normale"),
+        (2, LAT + 0.0001, LON + 0.0001, "garde"),
+        (3, LAT + 0.05, LON + 0.05, None),
+        (4, None, LON, "normale"),
+    ])
+    return index
+
+
+def par_nombre(groupes):
+    return sorted(groupes, key=lambda groupe: -groupe["nombre"])
+
+
+def test_regroupement_a_faible_zoom():
+    index = index_de_trois()
+
+    groupe, = index.clusters(*VILLE, zoom=5)
+
+    assert len(index) == 3
+    assert (groupe["nombre"], groupe["nombre_garde"], groupe["id"]) == (3, 1, None)
+    assert groupe["latitude"] == pytest.approx(LAT + 0.0501 / 3, abs=1e-6)
+    assert groupe["longitude"] == pytest.approx(LON + 0.0501 / 3, abs=1e-6)
+
+
+def test_pharmacie_isolee_position_exacte():
+    index = index_de_trois()
+
+    voisines, isolee = par_nombre(index.clusters(*VILLE, zoom=14))
+
+    assert (voisines["nombre"], voisines["nombre_garde"], voisines["id"]) == (2, 1, None)
+    assert isolee["id"] == 3
+    assert (isolee["latitude"], isolee["longitude"]) == (LAT + 0.05, LON + 0.05)
+    # Hors de la boîte
+    assert index.clusters(LAT + 1, LON + 1, LAT + 2, LON + 2, zoom=14) == []
+
+
+def test_ajouter_et_retirer_mettent_a_jour_les_cellules():
+    index = index_de_trois()
+    version = index.version
+
+    index.ajouter(1, LAT + 0.05, LON + 0.05, "garde")
+    assert index.version == version + 1
+    rejointe, seule = par_nombre(index.clusters(*VILLE, zoom=14))
+    assert (rejointe["nombre"], rejointe["nombre_garde"]) == (2, 1)
+    assert (seule["id"], seule["latitude"]) == (2, LAT + 0.0001)
+
+    index.retirer(2)
+    index.retirer(2)
+    assert index.version == version + 2
+    assert [groupe["nombre"] for groupe in index.clusters(*VILLE, zoom=14)] == [2]
+    assert index.statistiques()["cellules"] == index.zoom_max + 1
+
+
+def test_tuiles_lru_par_nombre_et_par_octets():
+    cache = TuilesCache(taille_max=2, octets_max=10)
+
+    cache.put(1, 0, 0, b"aaaa")
+    cache.put(1, 1, 0, b"bbbb")
+    assert cache.get(1, 0, 0)[0] == b"aaaa"
+    cache.put(1, 0, 1, b"cc")
+    assert cache.get(1, 1, 0) is None  # la moins récemment lue
+
+    cache.put(1, 1, 1, b"d" * 8)
+    assert cache.octets <= 10
+    assert cache.get(1, 0, 0) is None and cache.get(1, 0, 1) is not None
+
+    statistiques = cache.statistiques()
+    assert (statistiques["hits"], statistiques["misses"]) == (2, 2)
+    assert statistiques["taux_hit"] == 0.5
+
+
+def test_tuiles_empreinte_et_invalidation_par_zoom():
+    cache = TuilesCache(zoom_max=16)
+    contenu, empreinte = cache.put(12, *tuile(LAT, LON, 12), b"mvt")
+    cache.put(14, *tuile(LAT, LON, 14), b"mvt14")
+    voisine = tuile(LAT + 1, LON, 12)
+    cache.put(12, *voisine, b"autre")
+
+    assert len(empreinte) == 16
+    assert cache.put(12, *tuile(LAT, LON, 12), b"mvt")[1] == empreinte
+
+    cache.invalider(LAT, LON)
+
+    assert cache.get(12, *tuile(LAT, LON, 12)) is None
+    assert cache.get(14, *tuile(LAT, LON, 14)) is None
+    assert cache.get(12, *voisine) == (b"autre", cache.put(12, *voisine, b"autre")[1])
+    assert cache.statistiques()["invalidations"] == 2
+    assert cache.octets == len(b"autre")
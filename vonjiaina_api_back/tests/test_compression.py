@@ -0,0 +1,117 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware, choisir_encodage
+
+GROS = {"pharmacies": [{"id": i, "nom": f"Pharmacie {i}"} for i in range(200)]}
+
+
+def _application() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, taille_minimale=500)
+
+    @app.get("/gros")
+    def gros():
+        return GROS
+
+    @app.get("/petit")
+    def petit():
+        return {"ok": True}
+
+    @app.get("/flux")
+    def flux():
+        lignes = (json.dumps({"id": i}) + "\n" for i in range(500))
+        return StreamingResponse(lignes, media_type="application/x-ndjson")
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"\0" * 2000, media_type="image/png")
+
+    @app.get("/inchange")
+    def inchange():
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    return app
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(_application())
+
+
+def _brut(client, chemin, encodage):
+    """Corps tel qu'envoyé (sans décompression par le client HTTP)"""
+    with client.stream("GET", chemin, headers={"Accept-Encoding": encodage}) as reponse:
+        return reponse, b"".join(reponse.iter_raw())
+
+
+@pytest.mark.parametrize("accept, attendu", [
+    ("gzip, deflate", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "br" if compression.brotli is not None else "gzip"),
+    ("", None),
+])
+def test_choisir_encodage(accept, attendu):
+    assert choisir_encodage(accept) == attendu
+
+
+def test_choisir_encodage_brotli_prefere(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+
+    assert choisir_encodage("gzip, br") == "br"
+
+
+def test_gros_json_compresse(client):
+    reponse, corps = _brut(client, "/gros", "gzip")
+
+    assert reponse.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in reponse.headers["vary"]
+    assert int(reponse.headers["content-length"]) == len(corps)
+    assert json.loads(gzip.decompress(corps)) == GROS
+
+
+def test_petit_corps_non_compresse(client):
+    reponse, corps = _brut(client, "/petit", "gzip")
+
+    assert "content-encoding" not in reponse.headers
+    assert "Accept-Encoding" in reponse.headers["vary"]
+    assert json.loads(corps) == {"ok": True}
+
+
+def test_sans_accept_encoding(client):
+    reponse, corps = _brut(client, "/gros", "identity")
+
+    assert "content-encoding" not in reponse.headers
+    assert json.loads(corps) == GROS
+
+
+def test_flux_compresse_par_morceaux(client):
+    reponse, corps = _brut(client, "/flux", "gzip")
+
+    assert reponse.headers["content-encoding"] == "gzip"
+    assert "content-length" not in reponse.headers
+    lignes = gzip.decompress(corps).decode().splitlines()
+    assert [json.loads(l)["id"] for l in lignes] == list(range(500))
+
+
+def test_types_exclus(client):
+    reponse, corps = _brut(client, "/image", "gzip")
+
+    assert "content-encoding" not in reponse.headers
+    assert corps.startswith(b"\x89PNG")
+
+
+def test_reponse_sans_corps(client):
+    reponse, corps = _brut(client, "/inchange", "gzip")
+
+    assert reponse.status_code == 304
+    assert reponse.headers["etag"] == '"v1"'
+    assert corps == b""
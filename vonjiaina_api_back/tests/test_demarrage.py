@@ -0,0 +1,154 @@
+import asyncio
+import re
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import demarrage
+from app.database import Base
+from app.demarrage import etat_demarrage, prechauffer
+from app.main import app
+from repositories.pharmacie_repository import PharmacieRepository
+from services.carte_service import CarteService
+from services.search_service import SearchService
+
+INIT_DB = Path(__file__).resolve().parent.parent / "scripts" / "init_db.sql"
+
+
+@pytest.fixture(autouse=True)
+def etat_neuf():
+    """État de démarrage vierge, rétabli après le test"""
+    etat_demarrage.__init__()
+    yield
+    etat_demarrage.__init__()
+
+
+@pytest.fixture
+def sans_base(monkeypatch):
+    """Chargements des index sans base ; appels à create_all enregistrés"""
+    class Session:
+        def close(self):
+            pass
+
+    create_all = []
+    monkeypatch.setattr(demarrage, "SessionLocal", Session)
+    monkeypatch.setattr(Base.metadata, "create_all", lambda bind: create_all.append(bind))
+    monkeypatch.setattr(SearchService, "charger_index", staticmethod(lambda db: 3))
+    monkeypatch.setattr(SearchService, "charger_index_medicaments", staticmethod(lambda db: 5))
+    monkeypatch.setattr(PharmacieRepository, "compiler_horaires", staticmethod(lambda db: 3))
+    monkeypatch.setattr(CarteService, "charger_index", staticmethod(lambda db: 3))
+    monkeypatch.setattr(demarrage.settings, "ROAD_GRAPH_PATH", "")
+    return create_all
+
+
+def tables_existantes(monkeypatch, tables):
+    class Inspecteur:
+        def get_table_names(self):
+            return list(tables)
+
+    monkeypatch.setattr(demarrage, "inspect", lambda engine: Inspecteur())
+
+
+def test_ready_503_pendant_le_prechauffage_puis_200(monkeypatch):
+    commence, liberer = threading.Event(), threading.Event()
+
+    def prechauffer_sync():
+        commence.set()
+        liberer.wait(5)
+
+    async def ouvrir_pool():
+        return 1
+
+    monkeypatch.setattr(demarrage, "_prechauffer_sync", prechauffer_sync)
+    monkeypatch.setattr(demarrage, "_ouvrir_pool", ouvrir_pool)
+
+    client = TestClient(app)
+    prechauffage = threading.Thread(target=asyncio.run, args=(prechauffer(),))
+    prechauffage.start()
+    try:
+        assert commence.wait(5)
+        pendant = client.get("/ready")
+    finally:
+        liberer.set()
+        prechauffage.join(5)
+
+    assert pendant.status_code == 503
+    assert pendant.json()["pret"] is False
+    apres = client.get("/ready")
+    assert apres.status_code == 200
+    assert apres.json()["pret"] is True
+    assert apres.json()["etapes"]["pool"]["nombre"] == 1
+
+
+def test_production_sans_create_all(monkeypatch, sans_base):
+    monkeypatch.setattr(demarrage.settings, "ENVIRONMENT", "production")
+    tables_existantes(monkeypatch, Base.metadata.tables)
+
+    demarrage._prechauffer_sync()
+
+    assert sans_base == []
+    assert "tables" not in etat_demarrage.etapes
+    assert etat_demarrage.etapes["schema"]["nombre"] == len(Base.metadata.tables)
+    assert etat_demarrage.etapes["medicaments"]["nombre"] == 5
+
+
+def test_developpement_cree_les_tables(monkeypatch, sans_base):
+    monkeypatch.setattr(demarrage.settings, "ENVIRONMENT", "development")
+
+    demarrage._prechauffer_sync()
+
+    assert sans_base == [demarrage.engine]
+    assert "schema" not in etat_demarrage.etapes
+
+
+def test_production_schema_absent(monkeypatch, sans_base):
+    monkeypatch.setattr(demarrage.settings, "ENVIRONMENT", "production")
+    tables_existantes(monkeypatch, set(Base.metadata.tables) - {"stocks_supprimes"})
+
+    with pytest.raises(RuntimeError, match="stocks_supprimes.*init_db.sql"):
+        demarrage._prechauffer_sync()
+    assert sans_base == []
+    assert "pharmacies" not in etat_demarrage.etapes
+
+
+def test_etape_echouee_reessayee_sans_marquer_pret(monkeypatch):
+    vu_au_second_essai = []
+
+    def prechauffer_sync():
+        if etat_demarrage.tentatives == 1:
+            raise ConnectionError("base injoignable")
+        vu_au_second_essai.append(
+            (etat_demarrage.pret, etat_demarrage.erreur)
+        )
+
+    async def ouvrir_pool():
+        return 1
+
+    monkeypatch.setattr(demarrage, "_prechauffer_sync", prechauffer_sync)
+    monkeypatch.setattr(demarrage, "_ouvrir_pool", ouvrir_pool)
+    monkeypatch.setattr(demarrage, "ATTENTE_INITIALE", 0.0)
+
+    asyncio.run(prechauffer())
+
+    assert vu_au_second_essai == [(False, "ConnectionError: base injoignable")]
+    assert etat_demarrage.tentatives == 2
+    assert etat_demarrage.pret is True
+    assert etat_demarrage.erreur is None
+
+
+def test_init_db_cree_toutes_les_tables_des_modeles():
+    script = INIT_DB.read_text(encoding="utf-8")
+    creees = {
+        table: {ligne.split()[0] for ligne in corps.strip().splitlines()}
+        for table, corps in re.findall(
+            r"CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\n\);", script, re.S
+        )
+    }
+
+    for table in Base.metadata.sorted_tables:
+        assert table.name in creees, table.name
+        assert {colonne.name for colonne in table.columns} <= creees[table.name], table.name
+        for index in table.indexes:
+            assert re.search(rf"INDEX IF NOT EXISTS {index.name}\b", script), index.name
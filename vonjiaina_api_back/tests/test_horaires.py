@@ -0,0 +1,172 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from services.pharmacie_statuts_service import PharmacieStatusService
+from utils.horaires import (
+    JOURS,
+    MINUTES_PAR_JOUR,
+    MINUTES_PAR_SEMAINE,
+    HorairesCache,
+    compiler_horaires,
+    horaires_cache
+)
+
+
+def minute(jour: int, heures: int, minutes: int = 0) -> int:
+    return jour * MINUTES_PAR_JOUR + heures * 60 + minutes
+
+
+LUNDI, MARDI, DIMANCHE = 0, 1, 6
+
+
+def test_plage_simple():
+    compiles = compiler_horaires({"lundi": "8h-18h"})
+
+    assert not compiles.est_ouverte(minute(LUNDI, 7, 59))
+    assert compiles.est_ouverte(minute(LUNDI, 8))
+    assert compiles.est_ouverte(minute(LUNDI, 17, 59))
+    assert not compiles.est_ouverte(minute(LUNDI, 18))
+    assert not compiles.est_ouverte(minute(MARDI, 10))
+
+
+def test_passage_de_minuit():
+    compiles = compiler_horaires({"lundi": "20h-2h"})
+
+    assert compiles.est_ouverte(minute(LUNDI, 23, 30))
+    assert compiles.est_ouverte(minute(MARDI, 1, 59))
+    assert not compiles.est_ouverte(minute(MARDI, 2))
+    assert not compiles.est_ouverte(minute(LUNDI, 1))
+
+
+def test_dimanche_soir_deborde_sur_lundi():
+    compiles = compiler_horaires({"dimanche": "22h-3h"})
+
+    assert compiles.est_ouverte(minute(DIMANCHE, 23))
+    assert compiles.est_ouverte(minute(LUNDI, 2, 30))
+    assert not compiles.est_ouverte(minute(LUNDI, 3))
+    assert compiles.debuts[0] == 0
+    assert compiles.fins[-1] == MINUTES_PAR_SEMAINE
+
+
+def test_fusion_et_formats():
+    compiles = compiler_horaires({
+        "lundi": "8h-12h, 11h-14h",
+        "mardi": {"ouverture": "08:30", "fermeture": "12:00"},
+        "mercredi": [{"ouverture": "8h", "fermeture": "10h"}, "14h-16h"],
+    })
+
+    assert compiles.debuts[:2] == (minute(LUNDI, 8), minute(MARDI, 8, 30))
+    assert compiles.fins[0] == minute(LUNDI, 14)
+    assert len(compiles.debuts) == 4
+
+
+def test_horaires_invalides_ignores():
+    compiles = compiler_horaires({"lundi": "n'importe quoi", "mardi": "25h-26h", "mercredi": "8h-12h"})
+
+    assert compiles.debuts == (minute(2, 8),)
+    assert compiler_horaires(None).debuts == ()
+
+
+def test_libelles_prochaine_ouverture():
+    horaires = {"lundi": "8h-12h, 14h-18h", "mercredi": "9h-17h"}
+
+    assert PharmacieStatusService.get_prochaine_ouverture(horaires, minute(LUNDI, 12, 30)) == "Aujourd'hui à 14h"
+    assert PharmacieStatusService.get_prochaine_ouverture(horaires, minute(MARDI, 20)) == "Demain à 9h"
+    assert PharmacieStatusService.get_prochaine_ouverture(horaires, minute(LUNDI, 19)) == "Mercredi à 9h"
+    # Fin de semaine : première ouverture de la semaine suivante
+    assert PharmacieStatusService.get_prochaine_ouverture(horaires, minute(DIMANCHE, 10)) == "Demain à 8h"
+    assert PharmacieStatusService.get_prochaine_ouverture(horaires, minute(4, 10)) == "Lundi à 8h"
+    assert PharmacieStatusService.get_prochaine_ouverture(None, 0) is None
+
+
+def test_get_status_passe_par_le_cache():
+    horaires = {"lundi": "8h-18h"}
+    maj = datetime(2026, 1, 1)
+    horaires_cache.retirer(-1)
+
+    statut = PharmacieStatusService.get_status("normale", horaires, minute(LUNDI, 9), pharmacie_id=-1, updated_at=maj)
+    version = horaires_cache.version
+    assert statut == "ouverte"
+
+    # Même updated_at : pas de recompilation, même si le JSON diffère
+    PharmacieStatusService.get_status("normale", {"lundi": "20h-21h"}, minute(LUNDI, 9), pharmacie_id=-1, updated_at=maj)
+    assert horaires_cache.version == version
+    assert PharmacieStatusService.get_status("garde", None, 0) == "garde"
+    horaires_cache.retirer(-1)
+
+
+def test_etat_reutilise_jusqu_a_la_borne_suivante():
+    compiles = compiler_horaires({"lundi": "8h-12h, 14h-18h"})
+
+    etat = compiles.etat(minute(LUNDI, 12, 30))
+    assert not etat.ouverte
+    assert (etat.depuis, etat.jusqu_a) == (minute(LUNDI, 12), minute(LUNDI, 14))
+    assert compiles.etat(minute(LUNDI, 13, 59)) is etat
+    assert etat.prochaine_ouverture(minute(LUNDI, 13)) == (60, "14h")
+
+    ouverte = compiles.etat(minute(LUNDI, 14))
+    assert ouverte is not etat and ouverte.ouverte
+    # Après la dernière plage : première ouverture de la semaine suivante
+    assert compiles.etat(minute(DIMANCHE, 10)).prochaine_ouverture(minute(DIMANCHE, 10)) == (
+        minute(LUNDI, 8) + MINUTES_PAR_SEMAINE - minute(DIMANCHE, 10), "8h"
+    )
+    assert compiler_horaires(None).etat(0).prochaine_ouverture(0) is None
+
+
+def test_modifier_une_pharmacie_ne_recalcule_qu_elle():
+    cache = HorairesCache()
+    autre = cache.compiler(1, None, {"lundi": "8h-18h"})
+    etat_autre = autre.etat(minute(LUNDI, 9))
+    cache.compiler(2, None, {})
+
+    cache.compiler(2, datetime(2026, 1, 1), {"lundi": "10h-18h"})
+    cache.retirer(2)
+
+    assert cache.get(1, None, None) is autre
+    assert autre.etat(minute(LUNDI, 9)) is etat_autre
+    assert len(cache) == 1
+
+
+def test_appliquer_statuts_identique_au_calcul_direct():
+    aleatoire = random.Random(3)
+    choix = ["8h-18h", "8h-12h, 14h-18h", "20h-2h", "22h-6h", "9h-17h"]
+    pharmacies = [
+        {
+            "id": 10_000 + i,
+            "updated_at": None,
+            "type": "garde" if i % 9 == 0 else "normale",
+            "horaires": {jour: aleatoire.choice(choix) for jour in JOURS if aleatoire.random() < 0.8},
+        }
+        for i in range(200)
+    ]
+
+    for instant in range(0, MINUTES_PAR_SEMAINE, 97):
+        PharmacieStatusService.appliquer_statuts(pharmacies, instant)
+        for pharmacie in pharmacies:
+            attendu = PharmacieStatusService.get_status(pharmacie["type"], pharmacie["horaires"], instant)
+            assert pharmacie["statut"] == attendu
+            assert pharmacie["prochaine_ouverture"] == (
+                PharmacieStatusService.get_prochaine_ouverture(pharmacie["horaires"], instant)
+                if attendu == "fermée" else None
+            )
+
+    for pharmacie in pharmacies:
+        horaires_cache.retirer(pharmacie["id"])
+
+
+@pytest.mark.parametrize("instant, statut", [
+    (minute(DIMANCHE, 23), "ouverte"),
+    (minute(LUNDI, 1), "ouverte"),
+    (minute(LUNDI, 6), "fermée"),
+])
+def test_appliquer_statuts_nuit_de_dimanche(instant, statut):
+    pharmacie = {"id": -2, "updated_at": None, "type": "normale", "horaires": {"dimanche": "20h-2h"}}
+
+    PharmacieStatusService.appliquer_statuts([pharmacie], instant)
+
+    assert pharmacie["statut"] == statut
+    if statut == "fermée":
+        assert pharmacie["prochaine_ouverture"] == "Dimanche à 20h"
+    horaires_cache.retirer(-2)
@@ -0,0 +1,90 @@
+from repositories.medicament_repository import motif_contient
+from utils.medicament_index import MIN_COMPACTAGE, MedicamentIndex, normaliser, trigrammes
+
+MEDICAMENTS = [
+    (1, "Doliprane", "Paracétamol"),
+    (2, "Efferalgan", "Paracétamol"),
+    (3, "Amoxil", "Amoxicilline"),
+    (4, "Augmentin", "Amoxicilline-Acide clavulanique"),
+    (5, "Spasfon", "Phloroglucinol"),
+]
+
+
+def _index():
+    index = MedicamentIndex()
+    index.charger(MEDICAMENTS)
+    return index
+
+
+def _ids(resultats):
+    return [medicament_id for medicament_id, _ in resultats]
+
+
+def test_normaliser_et_trigrammes():
+    assert normaliser("Paracétamol 500mg") == "paracetamol 500mg"
+    assert normaliser(None) == ""
+    assert trigrammes("para") == {"  p", " pa", "par", "ara", "ra "}
+
+
+def test_accents_omis_et_faute_de_frappe():
+    index = _index()
+    assert set(_ids(index.rechercher("paracetamol")[:2])) == {1, 2}
+    assert _ids(index.rechercher("dolipran"))[0] == 1
+    assert _ids(index.rechercher("amoxicilinne"))[0] in (3, 4)
+
+
+def test_scores_decroissants_et_limite():
+    resultats = _index().rechercher("amoxicilline", limite=1)
+    assert len(resultats) == 1
+    scores = [score for _, score in _index().rechercher("paracetamol")]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_sans_correspondance():
+    assert _index().rechercher("zzzz") == []
+    assert _index().rechercher("") == []
+
+
+def test_ajouter_remplace_et_retirer():
+    index = _index()
+    index.ajouter(1, "Dafalgan", "Paracétamol")
+    assert 1 not in _ids(index.rechercher("doliprane"))
+    assert _ids(index.rechercher("dafalgan"))[0] == 1
+
+    index.retirer(5)
+    assert 5 not in _ids(index.rechercher("spasfon"))
+    assert len(index) == 4
+
+
+def test_compactage_borne_les_listes_inversees():
+    index = MedicamentIndex()
+    index.charger([(i, f"Produit{i}", "Ibuprofène") for i in range(100)])
+    # Modifications répétées : les anciennes entrées sont compactées
+    for tour in range(10):
+        for i in range(100):
+            index.ajouter(i, f"Produit{i}", "Ibuprofène")
+    statistiques = index.statistiques()
+    assert statistiques["entrees"] <= 200 * 1.25 + MIN_COMPACTAGE
+    assert statistiques["inactives"] <= 0.25 * statistiques["entrees"] + MIN_COMPACTAGE
+
+    assert _ids(index.rechercher("produit42"))[0] == 42
+    assert len(index.rechercher("ibuprofene", limite=100)) == 100
+
+
+def test_compactage_apres_retraits():
+    index = MedicamentIndex()
+    index.charger([(i, f"Alpha{i}", None) for i in range(200)])
+    for i in range(150):
+        index.retirer(i)
+    statistiques = index.statistiques()
+    assert statistiques["entrees"] - statistiques["inactives"] == 50
+    assert statistiques["entrees"] < 200
+    assert _ids(index.rechercher("alpha160"))[0] == 160
+    assert all(medicament_id >= 150 for medicament_id in _ids(index.rechercher("alpha1", limite=50)))
+
+
+def test_motif_contient_echappe_les_jokers():
+    assert motif_contient("para") == "%para%"
+    assert motif_contient("_") == "%\\_%"
+    assert motif_contient("100%") == "%100\\%%"
+    assert motif_contient("a\\b") == "%a\\\\b%"
@@ -0,0 +1,233 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import get_async_db
+from app.dependencies import get_current_user
+from app.main import app
+from models.medicament import Medicament
+from models.user import User
+from repositories.async_medicament_repository import AsyncMedicamentRepository
+from repositories.medicament_repository import MedicamentRepository
+from routers import medicaments as routeur_medicaments
+from utils.medicament_index import medicament_index
+from utils.search_cache import search_cache
+from utils.suggestion_index import suggestion_index
+
+
+def sql(requete) -> str:
+    return str(requete.compile(dialect=postgresql.dialect()))
+
+
+class SessionFactice:
+    """Session (sync ou async) sans base : enregistre commits et suppressions"""
+
+    def __init__(self, asynchrone: bool):
+        self.asynchrone = asynchrone
+        self.commits = 0
+        self.supprimes = []
+
+    def _resultat(self, valeur=None):
+        if not self.asynchrone:
+            return valeur
+
+        async def attendre():
+            return valeur
+        return attendre()
+
+    def commit(self):
+        self.commits += 1
+        return self._resultat()
+
+    def refresh(self, objet):
+        return self._resultat()
+
+    def delete(self, objet):
+        self.supprimes.append(objet)
+        return self._resultat()
+
+
+@pytest.fixture
+def medicament(monkeypatch):
+    existant = Medicament(id=987654, nom_commercial="Zyrtecset", dci="Cétirizine")
+    medicament_index.retirer(existant.id)
+    suggestion_index.retirer(existant.id)
+
+    async def trouver_async(db, medicament_id):
+        return existant if medicament_id == existant.id else None
+
+    monkeypatch.setattr(
+        MedicamentRepository, "find_by_id",
+        staticmethod(lambda db, medicament_id: existant if medicament_id == existant.id else None)
+    )
+    monkeypatch.setattr(AsyncMedicamentRepository, "find_by_id", staticmethod(trouver_async))
+    yield existant
+    medicament_index.retirer(existant.id)
+    suggestion_index.retirer(existant.id)
+
+
+def _suggestions(prefixe):
+    return [s["id"] for s in suggestion_index.suggerer(prefixe)]
+
+
+def _mettre_a_jour(asynchrone, db, *args, **kwargs):
+    if asynchrone:
+        return asyncio.run(AsyncMedicamentRepository.update(db, *args, **kwargs))
+    return MedicamentRepository.update(db, *args, **kwargs)
+
+
+def _supprimer(asynchrone, db, *args):
+    if asynchrone:
+        return asyncio.run(AsyncMedicamentRepository.delete(db, *args))
+    return MedicamentRepository.delete(db, *args)
+
+
+@pytest.mark.parametrize("asynchrone", [False, True])
+def test_update_et_delete_maintiennent_index_et_cache(medicament, asynchrone, monkeypatch):
+    vidages = []
+    monkeypatch.setattr(search_cache, "invalider_medicament", vidages.append)
+    db = SessionFactice(asynchrone)
+
+    modifie = _mettre_a_jour(asynchrone, db, medicament.id, nom_commercial="Xyzalrenom", dci=None)
+    assert modifie is medicament
+    assert medicament.nom_commercial == "Xyzalrenom"
+    assert medicament.dci == "Cétirizine"
+    assert medicament.id in _suggestions("xyzalre")
+    assert vidages == [medicament.id]
+
+    assert _supprimer(asynchrone, db, medicament.id)
+    assert db.supprimes == [medicament]
+    assert medicament.id not in _suggestions("xyzalre")
+    assert medicament.id not in dict(medicament_index.rechercher("Xyzalrenom"))
+    assert vidages == [medicament.id] * 2
+
+    assert _mettre_a_jour(asynchrone, db, 1, nom_commercial="x") is None
+    assert not _supprimer(asynchrone, db, 1)
+    assert db.commits == 2
+
+
+def test_requetes_partagees():
+    assert "ESCAPE" in sql(MedicamentRepository.requete_recherche_ilike("50%", 10))
+    assert "OFFSET" in sql(MedicamentRepository.requete_get_all(skip=20))
+    pagination_par_cle = sql(MedicamentRepository.requete_get_all(skip=20, after_id=5))
+    assert "OFFSET" not in pagination_par_cle
+    assert "medicaments.id >" in pagination_par_cle
+
+
+def test_creation_garde_le_cache(monkeypatch):
+    vidages = []
+    monkeypatch.setattr(search_cache, "invalider_medicament", vidages.append)
+    monkeypatch.setattr(search_cache, "vider", lambda: vidages.append("tout"))
+    medicament = Medicament(id=987655, nom_commercial="Nouveaumed", dci=None)
+
+    MedicamentRepository.indexer(medicament, creation=True)
+
+    assert vidages == []
+    assert medicament.id in _suggestions("nouveaumed")
+    MedicamentRepository.desindexer(medicament.id)
+    assert vidages == [medicament.id]
+
+
+@pytest.mark.parametrize("role, attendu", [(None, 401), ("user", 403), ("pharmacie", 403)])
+def test_creation_reservee_aux_administrateurs(role, attendu, monkeypatch):
+    creations = []
+
+    async def create(db, **champs):
+        creations.append(champs)
+
+    async def sans_base():
+        yield None
+
+    monkeypatch.setattr(AsyncMedicamentRepository, "create", staticmethod(create))
+    app.dependency_overrides[get_async_db] = sans_base
+    if role is not None:
+        app.dependency_overrides[get_current_user] = lambda: User(
+            id=1, email=f"{role}@example.com", nom=role, role=role, is_active=True
+        )
+    try:
+        reponse = TestClient(app).post(
+            f"{get_settings().API_V1_PREFIX}/medicaments/", json={"nom_commercial": "Pirate"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert reponse.status_code == attendu
+    assert creations == []
+
+
+class SessionAsyncSurSqlite:
+    """Session async minimale (stream) au-dessus d'une session SQLite synchrone"""
+
+    def __init__(self, session):
+        self.session = session
+        self.requetes = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def stream(self, requete):
+        self.requetes.append(requete)
+        resultat = self.session.execute(requete)
+
+        async def lignes():
+            for row in resultat:
+                yield row
+        return lignes()
+
+
+@pytest.fixture
+def catalogue(tmp_path, monkeypatch):
+    """25 médicaments en SQLite ; lots de 7 lignes, envois de 10 lignes"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalogue.db'}")
+    Medicament.__table__.create(engine)
+    session = Session(engine)
+    session.add_all(
+        Medicament(id=i, nom_commercial=f"Médicament {i}", dci="Paracétamol" if i % 2 else None)
+        for i in range(1, 26)
+    )
+    session.commit()
+
+    monkeypatch.setattr(MedicamentRepository, "TAILLE_LOT_EXPORT", 7)
+    monkeypatch.setattr(routeur_medicaments, "LIGNES_PAR_ENVOI", 10)
+    session_async = SessionAsyncSurSqlite(session)
+    monkeypatch.setattr(routeur_medicaments, "AsyncSessionLocal", lambda: session_async)
+    yield session_async
+    session.close()
+    engine.dispose()
+
+
+def test_export_ndjson(catalogue):
+    with TestClient(app).stream("GET", f"{get_settings().API_V1_PREFIX}/medicaments/export") as reponse:
+        envois = list(reponse.iter_text())
+
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("application/x-ndjson")
+    assert "medicaments.ndjson" in reponse.headers["content-disposition"]
+
+    lignes = "".join(envois).splitlines()
+    medicaments = [json.loads(ligne) for ligne in lignes]
+    assert [m["id"] for m in medicaments] == list(range(1, 26))
+    assert medicaments[0] == {
+        "id": 1, "nom_commercial": "Médicament 1", "dci": "Paracétamol",
+        "laboratoire": None, "forme": None, "dosage": None, "description": None,
+    }
+    assert catalogue.requetes[0].get_execution_options()["yield_per"] == 7
+
+
+def test_iter_export_parcourt_tous_les_lots(catalogue):
+    async def lire():
+        return [ligne async for ligne in AsyncMedicamentRepository.iter_export(catalogue)]
+
+    asynchrone = asyncio.run(lire())
+
+    assert [m["id"] for m in asynchrone] == list(range(1, 26))
+    assert list(MedicamentRepository.iter_export(catalogue.session)) == asynchrone
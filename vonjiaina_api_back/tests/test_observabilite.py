@@ -0,0 +1,165 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+import services.search_service as search_service
+from app.config import get_settings
+from app.database import get_async_db
+from app.main import app
+from app.observabilite import (
+    BORNES_SECONDES,
+    Histogramme,
+    MesuresRequete,
+    instrumenter_sql,
+    mesures_courantes,
+    metriques_http,
+)
+from utils.horaires import horaires_cache
+from utils.medicament_index import MedicamentIndex
+from utils.spatial_index import SpatialIndex
+
+ROUTE_RECHERCHE = f"{get_settings().API_V1_PREFIX}/pharmacies/search"
+PARAMETRES = {"medicament": "doliprane", "latitude": -18.91, "longitude": 47.52}
+
+
+@pytest.fixture
+def base():
+    """Moteur SQLite instrumenté comme ceux de app.database (partagé avec le thread de l'application)"""
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    instrumenter_sql(engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE candidates (id INTEGER PRIMARY KEY, nom TEXT, type TEXT, "
+            "latitude REAL, longitude REAL, distance REAL, prix REAL, quantite INTEGER)"
+        ))
+        conn.execute(text(
+            "INSERT INTO candidates VALUES "
+            "(901, 'Pharmacie Analakely', 'garde', -18.905, 47.525, 800.0, 2500.0, 4), "
+            "(902, 'Pharmacie Behoririka', 'normale', -18.900, 47.530, 1900.0, 2400.0, 9)"
+        ))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def recherche_sqlite(base, monkeypatch):
+    """
+    /pharmacies/search sans index chargés : la requête PostGIS est remplacée
+    par une requête sur le moteur SQLite instrumenté
+    """
+    async def search_with_medicament(db, **kwargs):
+        with base.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(text("SELECT * FROM candidates"))]
+
+    async def sans_base():
+        yield None
+
+    monkeypatch.setattr(search_service, "pharmacie_index", SpatialIndex())
+    monkeypatch.setattr(search_service, "medicament_index", MedicamentIndex())
+    monkeypatch.setattr(
+        search_service.AsyncPharmacieRepository, "search_with_medicament",
+        staticmethod(search_with_medicament)
+    )
+    app.dependency_overrides[get_async_db] = sans_base
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    for pharmacie_id in (901, 902):
+        horaires_cache.retirer(pharmacie_id)
+
+
+def test_server_timing_de_la_recherche(recherche_sqlite):
+    reponse = recherche_sqlite.get(ROUTE_RECHERCHE, params=PARAMETRES)
+
+    assert reponse.status_code == 200
+    assert [p["id"] for p in reponse.json()["resultats"]] == [901, 902]
+    phases = [partie.split(";")[0] for partie in reponse.headers["Server-Timing"].split(", ")]
+    assert phases == ["db", "classement", "serialisation", "total"]
+    assert re.match(r'db;dur=[\d.]+;desc="1 SQL"', reponse.headers["Server-Timing"])
+
+
+def test_requetes_sql_comptees_par_route(recherche_sqlite):
+    nb_avant = metriques_http.nb_sql.get(ROUTE_RECHERCHE, 0)
+    db_avant = metriques_http.phases.get((ROUTE_RECHERCHE, "db"), 0.0)
+
+    for _ in range(2):
+        assert recherche_sqlite.get(ROUTE_RECHERCHE, params=PARAMETRES).status_code == 200
+
+    assert metriques_http.nb_sql[ROUTE_RECHERCHE] == nb_avant + 2
+    assert metriques_http.phases[(ROUTE_RECHERCHE, "db")] > db_avant
+
+
+def test_metrics_format_prometheus(recherche_sqlite):
+    recherche_sqlite.get(ROUTE_RECHERCHE, params=PARAMETRES)
+
+    reponse = recherche_sqlite.get("/metrics")
+
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lignes = reponse.text.splitlines()
+    assert "# TYPE vonjiaina_http_request_duration_seconds histogram" in lignes
+    etiquettes = f'route="{ROUTE_RECHERCHE}",method="GET",status="200"'
+    assert any(
+        ligne.startswith(f'vonjiaina_http_request_duration_seconds_bucket{{{etiquettes},le="+Inf"}} ')
+        for ligne in lignes
+    )
+    assert any(ligne.startswith(f'vonjiaina_sql_queries_total{{route="{ROUTE_RECHERCHE}"}} ') for ligne in lignes)
+    assert "# TYPE vonjiaina_pool_connexions gauge" in lignes
+    assert any(ligne.startswith('vonjiaina_pool_connexions{pool="api",etat="taille"} ') for ligne in lignes)
+    assert any(ligne.startswith('vonjiaina_cache{cache="recherche",mesure="lignes_max"} ') for ligne in lignes)
+    # Une ligne de mesure : nom{étiquettes} valeur
+    for ligne in lignes:
+        if not ligne.startswith("#"):
+            assert re.fullmatch(r'\w+(\{[^}]*\})? -?[\d.e+-]+', ligne), ligne
+
+
+def test_sql_impute_a_la_requete_en_cours(base):
+    mesures = MesuresRequete()
+    jeton = mesures_courantes.set(mesures)
+    try:
+        with base.connect() as conn:
+            conn.execute(text("SELECT count(*) FROM candidates"))
+            assert (mesures.nb_sql, mesures.phases["db"] > 0) == (1, True)
+            conn.execute(text("SELECT nom FROM candidates"))
+            duree = mesures.phases["db"]
+            assert mesures.nb_sql == 2
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM table_absente"))
+            # Requête en erreur : ni comptée, ni laissée dans la pile des débuts
+            assert mesures.nb_sql == 2
+            assert conn.info["debuts_sql"] == []
+    finally:
+        mesures_courantes.reset(jeton)
+
+    assert duree > 0
+    # Hors requête HTTP : rien n'est imputé
+    with base.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert mesures.nb_sql == 2
+
+
+def test_histogramme_cumulatif():
+    histogramme = Histogramme()
+    for valeur in (0.001, 0.03, 0.03, 20.0):
+        histogramme.observer(valeur)
+
+    lignes = histogramme.lignes("h", 'route="/x"')
+
+    compteurs = [int(ligne.rsplit(" ", 1)[1]) for ligne in lignes[:len(BORNES_SECONDES) + 1]]
+    assert compteurs[0] == 1  # le="0.005"
+    assert compteurs[BORNES_SECONDES.index(0.05)] == 3
+    assert compteurs[-1] == 4  # le="+Inf"
+    assert compteurs == sorted(compteurs)
+    assert lignes[-2:] == ['h_sum{route="/x"} 20.061000', 'h_count{route="/x"} 4']
+
+
+def test_server_timing_sans_sql():
+    mesures = MesuresRequete()
+    mesures.ajouter("serialisation", 0.002)
+
+    assert mesures.server_timing(0.005) == "serialisation;dur=2.0, total;dur=5.0"
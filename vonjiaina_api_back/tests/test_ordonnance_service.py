@@ -0,0 +1,97 @@
+import pytest
+
+from services.ordonnance_service import OrdonnanceService
+from utils.horaires import horaires_cache
+
+MEDICAMENTS = ["doliprane", "amoxicilline", "spasfon"]
+
+
+def offre(pharmacie_id, item, distance, prix=None, medicament_id=None):
+    return {
+        "id": pharmacie_id,
+        "nom": f"Pharmacie {pharmacie_id}",
+        "type": "garde",
+        "horaires": None,
+        "updated_at": None,
+        "distance": distance,
+        "item": item,
+        "medicament_id": medicament_id or 100 + item,
+        "nom_commercial": MEDICAMENTS[item].capitalize(),
+        "forme": None,
+        "dosage": None,
+        "prix": prix,
+        "quantite": 5,
+        "date_maj": None,
+    }
+
+
+@pytest.fixture(autouse=True)
+def horaires_propres():
+    """Horaires compilés des pharmacies de test retirés du cache partagé"""
+    yield
+    for pharmacie_id in (1, 2, 3):
+        horaires_cache.retirer(pharmacie_id)
+
+
+def ids(pharmacies):
+    return [p["id"] for p in pharmacies]
+
+
+def test_completes_par_distance():
+    offres = [offre(p, item, distance) for p, distance in ((1, 900), (2, 300)) for item in range(3)]
+    offres.append(offre(3, 0, 50))
+
+    reponse = OrdonnanceService.composer(MEDICAMENTS, offres)
+
+    assert ids(reponse["completes"]) == [2, 1]
+    assert reponse["couverture"] == []
+    assert reponse["introuvables"] == []
+    assert [m["demande"] for m in reponse["completes"][0]["medicaments"]] == MEDICAMENTS
+
+
+def test_couverture_gloutonne():
+    offres = [
+        offre(1, 0, 100), offre(1, 1, 100),
+        offre(2, 1, 200), offre(2, 2, 200),
+        offre(3, 2, 50),
+    ]
+
+    reponse = OrdonnanceService.composer(MEDICAMENTS, offres)
+
+    assert reponse["completes"] == []
+    # 1 apporte deux médicaments ; pour le dernier, 3 est plus proche que 2
+    assert ids(reponse["couverture"]) == [1, 3]
+    assert [[m["demande"] for m in p["medicaments"]] for p in reponse["couverture"]] == [
+        ["doliprane", "amoxicilline"], ["spasfon"]
+    ]
+
+
+def test_egalite_departagee_par_distance():
+    pharmacies = [
+        {"id": 1, "distance": 800, "offres": {0: {}, 1: {}}},
+        {"id": 2, "distance": 200, "offres": {1: {}, 2: {}}},
+        {"id": 3, "distance": 100, "offres": {0: {}}},
+    ]
+
+    choisies = OrdonnanceService.couvrir(pharmacies, {0, 1, 2})
+
+    assert [(p["id"], items) for p, items in choisies] == [(2, {1, 2}), (3, {0})]
+
+
+def test_introuvables_et_prix_total():
+    offres = [offre(1, 0, 100, prix=1500.4), offre(1, 1, 100, prix=2000)]
+
+    reponse = OrdonnanceService.composer(MEDICAMENTS, offres)
+
+    assert reponse["introuvables"] == ["spasfon"]
+    pharmacie, = reponse["couverture"]
+    assert pharmacie["prix_total"] == 3500
+    assert pharmacie["distance_km"] == 0.1
+    assert "horaires" not in pharmacie and "offres" not in pharmacie
+
+
+def test_rien_a_couvrir():
+    reponse = OrdonnanceService.composer(MEDICAMENTS, [])
+
+    assert reponse == {"completes": [], "couverture": [], "introuvables": MEDICAMENTS}
+    assert OrdonnanceService.couvrir([], {0}) == []
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from app.config import get_settings
+from app.database import get_async_db
+from app.main import app
+from models.user import User
+from services import auth as auth_service
+from services.auth import AuthService
+from utils.password_pool import PasswordPool, PoolSatureError
+
+# Hash d'un ancien coût bcrypt (la configuration des tests est à 4)
+ANCIEN_COUT = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5)
+
+
+def test_pool_borne_workers_plus_file():
+    pool = PasswordPool(workers=2, file_max=1)
+    liberer = threading.Event()
+    actifs, max_actifs = [0], [0]
+    verrou = threading.Lock()
+
+    def bloquer(valeur):
+        with verrou:
+            actifs[0] += 1
+            max_actifs[0] = max(max_actifs[0], actifs[0])
+        liberer.wait(5)
+        with verrou:
+            actifs[0] -= 1
+        return valeur
+
+    async def scenario():
+        taches = [asyncio.create_task(pool._executer(bloquer, i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSatureError):
+            await pool._executer(bloquer, 3)
+        statistiques = pool.statistiques()
+        liberer.set()
+        return await asyncio.gather(*taches), statistiques
+
+    try:
+        resultats, statistiques = asyncio.run(scenario())
+    finally:
+        liberer.set()
+        pool.fermer()
+
+    assert resultats == [0, 1, 2]
+    assert (statistiques["en_cours"], statistiques["en_attente"]) == (3, 1)
+    assert max_actifs[0] == 2
+    assert (pool.refusees, pool.max_en_cours, pool.en_cours, pool.nombre) == (1, 3, 0, 3)
+
+
+@pytest.fixture
+def compte(monkeypatch):
+    """Utilisateur dont le hash a un ancien coût ; mises à jour enregistrées"""
+    user = User(
+        id=1, email="rakoto@example.com", nom="Rakoto", role="user", is_active=True,
+        hashed_password=ANCIEN_COUT.hash("secret")
+    )
+    mises_a_jour = []
+
+    async def find_by_email(db, email):
+        return user if email == user.email else None
+
+    async def update_password(db, utilisateur, hashed_password):
+        mises_a_jour.append(hashed_password)
+        utilisateur.hashed_password = hashed_password
+        return utilisateur
+
+    depot = auth_service.AsyncUserRepository
+    monkeypatch.setattr(depot, "find_by_email", staticmethod(find_by_email))
+    monkeypatch.setattr(depot, "update_password", staticmethod(update_password))
+    return user, mises_a_jour
+
+
+def test_connexion_refait_le_hash_d_un_ancien_cout(compte):
+    user, mises_a_jour = compte
+
+    assert asyncio.run(AuthService.authenticate_user_async(None, user.email, "faux")) is None
+    assert mises_a_jour == []
+
+    assert asyncio.run(AuthService.authenticate_user_async(None, user.email, "secret")) is user
+    assert len(mises_a_jour) == 1
+    assert mises_a_jour[0].startswith(f"$2b${get_settings().BCRYPT_ROUNDS:02d}$")
+    assert user.hashed_password == mises_a_jour[0]
+
+    # Hash déjà au bon coût : rien à enregistrer
+    assert asyncio.run(AuthService.authenticate_user_async(None, user.email, "secret")) is user
+    assert len(mises_a_jour) == 1
+
+
+def test_login_pool_sature_503(compte, monkeypatch):
+    user, mises_a_jour = compte
+    pool = PasswordPool(workers=1, file_max=0)
+    pool.en_cours = 1  # un hachage en cours, aucune place en file
+    monkeypatch.setattr(auth_service, "password_pool", pool)
+
+    async def sans_base():
+        yield None
+
+    app.dependency_overrides[get_async_db] = sans_base
+    try:
+        reponse = TestClient(app).post(
+            f"{get_settings().API_V1_PREFIX}/auth/login",
+            json={"email": user.email, "password": "secret"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert reponse.status_code == 503
+    assert reponse.headers["Retry-After"] == "1"
+    assert pool.refusees == 1
+    assert mises_a_jour == []
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from repositories.pharmacie_repository import PharmacieRepository
+from scripts.check_search_plan import INDEX_ATTENDU, index_utilises
+
+PARAMETRES = {
+    "motif": "%Paracétamol%",
+    "latitude": -18.8792,
+    "longitude": 47.5079,
+    "rayon_metres": 5000,
+    "limite": 20,
+}
+
+
+def test_index_utilises_parcourt_les_sous_plans():
+    plan = {
+        "Node Type": "Limit",
+        "Plans": [{
+            "Node Type": "Nested Loop",
+            "Plans": [
+                {"Node Type": "Bitmap Index Scan", "Index Name": INDEX_ATTENDU},
+                {"Node Type": "Index Scan", "Index Name": "ux_stocks_medicament_pharmacie"},
+            ],
+        }],
+    }
+    assert index_utilises(plan) == {INDEX_ATTENDU, "ux_stocks_medicament_pharmacie"}
+    assert index_utilises({"Node Type": "Seq Scan"}) == set()
+
+
+def test_predicat_indexable():
+    # ST_DWithin sur la colonne geography elle-même (pas de cast ni de
+    # fonction appliquée à p.location), sinon l'index GiST est ignoré
+    sql = " ".join(PharmacieRepository.requete_recherche().text.split())
+    where = sql.split(" WHERE ", 1)[1]
+    assert "ST_DWithin( p.location," in where
+    assert "p.location::" not in where
+
+
+@pytest.fixture(scope="module")
+def connexion():
+    from app.database import engine
+    try:
+        with engine.connect() as connection:
+            yield connection
+    except OperationalError:
+        pytest.skip("PostgreSQL non joignable")
+
+
+def test_explain_utilise_l_index_gist(connexion):
+    with connexion.begin():
+        connexion.execute(text("SET LOCAL enable_seqscan = off"))
+        resultat = connexion.execute(
+            text(f"EXPLAIN (FORMAT JSON) {PharmacieRepository.requete_recherche().text}"),
+            PARAMETRES
+        ).scalar()
+    plan = resultat if isinstance(resultat, list) else json.loads(resultat)
+    assert INDEX_ATTENDU in index_utilises(plan[0]["Plan"])
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.pool_metrics import (
+    AsyncPoolInstrumente,
+    PoolInstrumente,
+    instrumenter,
+    metriques_pools,
+    route_courante
+)
+
+
+@pytest.fixture
+def moteur(tmp_path):
+    """Pool d'une seule connexion, sans débordement"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=PoolInstrumente,
+        pool_logging_name="test",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.2
+    )
+    metriques = instrumenter(engine, "test")
+    yield engine, metriques
+    engine.dispose()
+    metriques_pools.pop("test", None)
+
+
+def test_connexions_utilisees(moteur):
+    engine, metriques = moteur
+
+    with engine.connect() as connexion:
+        connexion.execute(text("SELECT 1"))
+        assert metriques.resume()["connexions_utilisees"] == 1
+
+    resume = metriques.resume()
+    assert resume["connexions_utilisees"] == 0
+    assert resume["connexions_libres"] == 1
+    assert resume["taille"] == 1
+
+
+def test_attente_quand_le_pool_est_plein(moteur):
+    engine, metriques = moteur
+    obtenue = threading.Event()
+
+    def second_client():
+        with engine.connect():
+            obtenue.set()
+
+    with engine.connect():
+        client = threading.Thread(target=second_client)
+        client.start()
+        time.sleep(0.1)
+        assert not obtenue.is_set()
+    client.join(timeout=5)
+
+    assert obtenue.is_set()
+    assert metriques.attente.nombre == 2
+    assert metriques.attente.maximum >= 80
+    assert metriques.expirations == 0
+
+
+def test_attente_expiree(moteur):
+    engine, metriques = moteur
+
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    assert metriques.expirations == 1
+    assert metriques.attente.maximum >= 150
+
+
+def test_utilisation_par_route(moteur):
+    engine, metriques = moteur
+
+    jeton = route_courante.set("/api/v1/pharmacies/search")
+    try:
+        with engine.connect():
+            time.sleep(0.05)
+    finally:
+        route_courante.reset(jeton)
+    with engine.connect():
+        pass
+
+    par_route = metriques.resume()["utilisation_par_route"]
+    assert par_route["/api/v1/pharmacies/search"]["nombre"] == 1
+    assert par_route["/api/v1/pharmacies/search"]["max_ms"] >= 40
+    assert par_route["hors requête"]["nombre"] == 1
+
+
+def test_pool_asynchrone(tmp_path):
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=AsyncPoolInstrumente,
+        pool_logging_name="test_async",
+        pool_size=1,
+        max_overflow=0
+    )
+    metriques = instrumenter(engine, "test_async")
+
+    async def scenario():
+        jeton = route_courante.set("/api/v1/medicaments")
+        try:
+            async with engine.connect() as connexion:
+                await connexion.execute(text("SELECT 1"))
+                assert metriques.resume()["connexions_utilisees"] == 1
+        finally:
+            route_courante.reset(jeton)
+        await engine.dispose()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        metriques_pools.pop("test_async", None)
+
+    assert metriques.attente.nombre == 1
+    assert metriques.par_route["/api/v1/medicaments"].nombre == 1
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.database import get_async_db
+from app.main import app
+from services.ranking_service import PROFILS, RankingService
+
+
+def pharmacie(id, distance, statut="ouverte", type="normale", prix=None, date_maj=None):
+    return {
+        "id": id,
+        "distance": distance,
+        "statut": statut,
+        "type": type,
+        "prix": prix,
+        "date_maj": date_maj,
+    }
+
+
+def ids(pharmacies):
+    return [p["id"] for p in pharmacies]
+
+
+CANDIDATES = [
+    pharmacie(1, 800, statut="fermée", prix=1000),
+    pharmacie(2, 300, statut="ouverte", prix=3000),
+    pharmacie(3, 1500, statut="garde", type="garde", prix=500),
+    pharmacie(4, 4000, statut="ouverte", prix=200),
+    pharmacie(5, 100, statut="fermée"),
+]
+
+
+def test_distance():
+    assert ids(RankingService.classer(CANDIDATES, tri="distance")) == [5, 2, 1, 3, 4]
+
+
+def test_ouverte_ferme_en_dernier():
+    assert ids(RankingService.classer(CANDIDATES, tri="ouverte")) == [2, 3, 4, 5, 1]
+
+
+def test_prix_dans_le_rayon():
+    # 4 est la moins chère mais hors des 3 km ; prix inconnu = le plus cher,
+    # départagé par la distance
+    assert ids(RankingService.classer(CANDIDATES, tri="prix")) == [3, 1, 5, 2]
+
+
+def test_garde_uniquement():
+    assert ids(RankingService.classer(CANDIDATES, tri="garde")) == [3]
+
+
+def test_filtre_statut():
+    assert ids(RankingService.classer(CANDIDATES, filtre_statut="ouverte")) == [2, 3, 4]
+    assert ids(RankingService.classer(CANDIDATES, filtre_statut="garde")) == [3]
+
+
+def test_limite_top_k():
+    proches = [pharmacie(i, distance) for i, distance in enumerate([900, 100, 500, 300, 700, 200])]
+
+    assert ids(RankingService.classer(proches, limite=3)) == [1, 5, 3]
+    assert RankingService.classer([], limite=3) == []
+
+
+def test_departage_par_distance():
+    # Même prix : le score est identique, la plus proche passe devant
+    egales = [pharmacie(1, 900, prix=100), pharmacie(2, 100, prix=100)]
+
+    assert ids(RankingService.classer(egales, tri="prix", poids={"distance": 0})) == [2, 1]
+
+
+def test_anciennete():
+    maintenant = datetime.now(timezone.utc)
+    candidates = [
+        pharmacie(1, 100, date_maj=maintenant - timedelta(days=6)),
+        pharmacie(2, 100, date_maj=maintenant - timedelta(hours=1)),
+        pharmacie(3, 100),
+    ]
+
+    assert ids(RankingService.classer(candidates, tri="pertinence")) == [2, 1, 3]
+
+
+def test_poids_personnalises_ne_modifient_pas_le_profil():
+    RankingService.classer(CANDIDATES, tri="distance", poids={"prix": 5.0})
+
+    assert PROFILS["distance"] == {"distance": 1.0}
+
+
+def test_statut_inconnu_refuse():
+    async def sans_base():
+        yield None
+
+    app.dependency_overrides[get_async_db] = sans_base
+    try:
+        reponse = TestClient(app).get(
+            f"{get_settings().API_V1_PREFIX}/pharmacies/search",
+            params={"medicament": "doliprane", "latitude": -18.91, "longitude": 47.52, "statut": "fermee"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert reponse.status_code == 422
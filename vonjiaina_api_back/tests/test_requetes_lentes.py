@@ -0,0 +1,84 @@
+import json
+
+from app.requetes_lentes import JournalRequetesLentes, decrire_parametres, masquer_plan
+
+ROUTE = "/api/v1/pharmacies/search"
+SQL = "SELECT * FROM pharmacies WHERE ST_DWithin(location, ST_MakePoint(%s, %s), %s) AND nom ILIKE %s"
+PARAMETRES = (47.5251, -18.9102, 5000, "%doliprane%")
+
+
+def test_decrire_parametres():
+    assert decrire_parametres(PARAMETRES) == ["float", "float", "int", "str(11)"]
+    assert decrire_parametres({"lat": 1.5, "ids": [1, 2, 3], "rien": None}) == {
+        "lat": "float", "ids": "list(3)", "rien": "null"
+    }
+    assert decrire_parametres(None) == "null"
+
+
+def test_masquer_plan():
+    plan = [{"Plan": {
+        "Filter": "((nom)::text ~~* '%doliprane%'::text)",
+        "Index Cond": "(location && st_expand('47.5251'::double precision, '-18.9102'::double precision))",
+        "Plans": [{"Rows": 5000, "Relation Name": "pharmacies"}],
+    }}]
+
+    texte = json.dumps(masquer_plan(plan, PARAMETRES))
+
+    assert "doliprane" not in texte and "47.5251" not in texte and "-18.9102" not in texte
+    assert "'?'::text" in texte and '"Rows": 5000' in texte
+
+
+def test_journal_sans_valeurs(tmp_path):
+    fichier = tmp_path / "lentes.log"
+    journal = JournalRequetesLentes(seuil_ms=0, taux_explain=0, fichier=str(fichier))
+
+    entree = journal.enregistrer(ROUTE, SQL, PARAMETRES, 350.0)
+
+    assert entree["parametres"] == ["float", "float", "int", "str(11)"]
+    ecrit = fichier.read_text(encoding="utf-8")
+    assert "doliprane" not in ecrit and "47.5251" not in ecrit
+    assert journal.dernieres() == [entree]
+
+
+class _ConnexionFactice:
+    """Connexion DBAPI qui rend un plan recopiant les paramètres reçus"""
+
+    def __init__(self):
+        self.recus = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement, parameters):
+        self.recus = parameters
+
+    def fetchone(self):
+        return ([{"Plan": {"Filter": f"(nom ~~* '{self.recus[3]}'::text)"}}],)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _MoteurFactice:
+    def __init__(self):
+        self.connexion = _ConnexionFactice()
+
+    def raw_connection(self):
+        return self.connexion
+
+
+def test_explain_recoit_les_valeurs_brutes(tmp_path):
+    fichier = tmp_path / "lentes.log"
+    journal = JournalRequetesLentes(seuil_ms=0, taux_explain=1.0, fichier=str(fichier))
+    journal._sync_engine = moteur = _MoteurFactice()
+
+    journal.enregistrer(ROUTE, SQL, PARAMETRES, 350.0)
+    journal._executor.shutdown(wait=True)
+
+    assert moteur.connexion.recus == PARAMETRES
+    entree, = journal.dernieres(avec_plan=True)
+    assert entree["plan"] == [{"Plan": {"Filter": "(nom ~~* '?'::text)"}}]
+    assert "doliprane" not in fichier.read_text(encoding="utf-8")
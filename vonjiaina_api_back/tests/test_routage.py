@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from utils.routage import GrapheRoutier, VITESSES_KMH, grille_synthetique
+
+PAS = 100.0
+PIED = VITESSES_KMH["pied"]["residential"] / 3.6  # m/s
+
+
+def noeud(i, j, colonnes=5):
+    return i * colonnes + j
+
+
+def test_grille_dimensions():
+    graphe = grille_synthetique(5, 5, PAS)
+
+    assert len(graphe) == 25
+    # 2 * 5 * 4 arêtes, dans les deux sens
+    assert graphe.nb_arcs == 80
+
+
+def test_temps_depuis_coin_oppose():
+    graphe = grille_synthetique(5, 5, PAS)
+
+    resultats = graphe.temps_depuis(noeud(0, 0), {noeud(4, 4), noeud(0, 1)}, "pied")
+
+    secondes, metres = resultats[noeud(4, 4)]
+    assert metres == pytest.approx(8 * PAS, rel=5e-3)
+    assert secondes == pytest.approx(8 * PAS / PIED, rel=5e-3)
+    assert resultats[noeud(0, 1)][1] == pytest.approx(PAS, rel=5e-3)
+
+
+def test_bidirectionnel_egal_a_dijkstra():
+    aleatoire = random.Random(2)
+    # Quelques voies coupées et plus lentes pour des chemins non triviaux
+    graphe = grille_synthetique(
+        8, 8, PAS,
+        classe=lambda i, j, i2, j2: None if aleatoire.random() < 0.15 else aleatoire.choice(["residential", "steps"])
+    )
+
+    for _ in range(30):
+        source, cible = aleatoire.randrange(64), aleatoire.randrange(64)
+        attendu = graphe.temps_depuis(source, {cible}, "pied").get(cible)
+        obtenu = graphe.temps_entre(source, cible, "pied")
+        if attendu is None:
+            assert obtenu is None
+        else:
+            assert obtenu == pytest.approx(attendu[0])
+
+
+def test_coupure_impose_un_detour():
+    # Mur entre les colonnes 1 et 2, sauf sur la dernière ligne
+    graphe = grille_synthetique(
+        5, 5, PAS,
+        classe=lambda i, j, i2, j2: None if (j, j2) == (1, 2) and i < 4 else "residential"
+    )
+
+    _, metres = graphe.temps_depuis(noeud(0, 1), {noeud(0, 2)}, "pied")[noeud(0, 2)]
+
+    assert metres == pytest.approx(9 * PAS, rel=5e-3)
+
+
+def test_budget_et_modes():
+    autoroute = grille_synthetique(3, 3, PAS, classe=lambda *_: "motorway")
+
+    assert autoroute.temps_depuis(0, {8}, "pied") == {}
+    assert 8 in autoroute.temps_depuis(0, {8}, "voiture")
+    assert autoroute.temps_entre(0, 8, "voiture", budget_secondes=1.0) is None
+
+
+def test_sens_unique_a_pied_seulement():
+    graphe = GrapheRoutier()
+    graphe.charger_aretes([-18.91, -18.91], [47.52, 47.521], [(0, 1, "residential", True)])
+
+    assert 1 in graphe.temps_depuis(0, {1}, "voiture")
+    assert graphe.temps_depuis(1, {0}, "voiture") == {}
+    assert 0 in graphe.temps_depuis(1, {0}, "pied")
+
+
+def test_trajets_reseau_et_estimation():
+    graphe = grille_synthetique(5, 5, PAS)
+    depart = (graphe.latitudes[0], graphe.longitudes[0])
+    sur_reseau = (graphe.latitudes[noeud(4, 4)], graphe.longitudes[noeud(4, 4)])
+    hors_reseau = (depart[0] + 0.1, depart[1])
+
+    (secondes, metres, estime), (_, _, estime_loin) = graphe.trajets(*depart, [sur_reseau, hors_reseau])
+
+    assert not estime
+    assert metres == pytest.approx(8 * PAS, rel=5e-3)
+    assert estime_loin
+    assert graphe.noeud_proche(*hors_reseau) is None
+
+
+def test_graphe_vide_estime_tout():
+    (secondes, metres, estime), = GrapheRoutier().trajets(-18.91, 47.52, [(-18.92, 47.52)], "voiture")
+
+    assert estime and secondes > 0 and metres > 0
+
+
+def test_sauvegarde_npz(tmp_path):
+    graphe = grille_synthetique(4, 4, PAS)
+    chemin = str(tmp_path / "graphe.npz")
+    graphe.sauvegarder(chemin)
+
+    recharge = GrapheRoutier()
+    assert recharge.charger_fichier(chemin) == 16
+    assert recharge.temps_entre(0, 15, "pied") == pytest.approx(graphe.temps_entre(0, 15, "pied"))
+    with pytest.raises(ValueError):
+        recharge.charger_fichier("reseau.shp")
@@ -0,0 +1,159 @@
+import random
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import services.search_service as search_service
+from services.search_service import LIMITE_CANDIDATS, SearchService
+from utils.search_cache import SearchCache, search_cache
+from utils.spatial_index import METRES_PAR_DEGRE, SpatialIndex, distance_metres
+
+# Antananarivo
+LAT, LON = -18.9100, 47.5250
+
+
+def candidate(id, latitude, longitude):
+    return {"id": id, "latitude": latitude, "longitude": longitude, "type": "normale", "horaires": None}
+
+
+def test_cle_par_cellule_sans_filtre_de_statut():
+    cache = SearchCache(taille_cellule_deg=0.005)
+
+    cle = cache.cle(LAT, LON, "Paracétamol", 5000)
+    assert cle == cache.cle(LAT + 0.001, LON + 0.001, "paracetamol", 5000)
+    assert cle != cache.cle(LAT + 0.01, LON, "paracetamol", 5000)
+    assert len(cle) == 4
+
+
+def test_zone_couvre_le_bord_de_la_cellule():
+    cache = SearchCache(taille_cellule_deg=0.005)
+    cle = cache.cle(LAT, LON, "doliprane", 1000)
+    centre_lat, centre_lon = cache.centre(cle)
+
+    # Coin de la cellule : le cercle de recherche reste dans la zone
+    coin_lat = (cle[0] + 1) * cache.taille_cellule_deg - 1e-9
+    coin_lon = (cle[1] + 1) * cache.taille_cellule_deg - 1e-9
+    extremite_lat = coin_lat + 1000 / METRES_PAR_DEGRE
+    assert distance_metres(centre_lat, centre_lon, extremite_lat, coin_lon) <= cache.rayon_elargi(1000)
+
+
+def test_get_put_ttl_et_lru(monkeypatch):
+    horloge = [100.0]
+    # utils.search_cache désigne aussi le singleton réexporté par utils
+    monkeypatch.setattr(sys.modules[SearchCache.__module__], "time", SimpleNamespace(monotonic=lambda: horloge[0]))
+    cache = SearchCache(taille_max=2, duree_secondes=10)
+    cles = [cache.cle(LAT + i * 0.1, LON, "x", 1000) for i in range(3)]
+
+    for cle in cles[:2]:
+        cache.put(cle, [], [1])
+    assert cache.get(cles[0]) == ([], {1})
+
+    cache.put(cles[2], [], None)
+    assert cache.get(cles[1]) is None  # le moins récemment utilisé
+    assert cache.get(cles[0]) is not None
+
+    horloge[0] += 11
+    assert cache.get(cles[0]) is None
+    assert cache.expirations == 1
+
+
+def test_borne_en_lignes_candidates():
+    cache = SearchCache(lignes_max=5)
+    cles = [cache.cle(LAT + i * 0.1, LON, "x", 1000) for i in range(3)]
+    lignes = [candidate(i, LAT, LON) for i in range(3)]
+
+    cache.put(cles[0], lignes, [1])
+    cache.put(cles[1], lignes[:2], [1])
+    assert cache.lignes == 5
+    cache.put(cles[2], lignes[:1], [1])
+
+    assert cache.get(cles[0]) is None  # la moins récemment utilisée
+    assert cache.lignes == 3
+    # Une zone plus grosse que la borne n'est pas gardée
+    cache.put(cles[1], lignes * 2, [1])
+    assert cache.get(cles[1]) is None
+    assert cache.statistiques()["lignes"] == 1
+
+
+def test_invalidation_par_position_et_medicament():
+    cache = SearchCache()
+    ici = cache.cle(LAT, LON, "x", 2000)
+    loin = cache.cle(LAT + 1, LON, "x", 2000)
+    cache.put(ici, [], [7])
+    cache.put(loin, [], [7])
+
+    assert cache.invalider(LAT + 0.005, LON, medicament_id=8) == 0
+    assert cache.invalider(LAT + 0.005, LON, medicament_id=7) == 1
+    assert cache.get(ici) is None
+    assert cache.get(loin) is not None
+
+
+def test_invalidation_par_medicament_dans_toutes_les_zones():
+    cache = SearchCache()
+    ici = cache.cle(LAT, LON, "x", 2000)
+    loin = cache.cle(LAT + 1, LON, "x", 2000)
+    autre = cache.cle(LAT, LON, "y", 2000)
+    sans_index = cache.cle(LAT, LON, "z", 2000)
+    cache.put(ici, [], [7])
+    cache.put(loin, [], [7, 8])
+    cache.put(autre, [], [9])
+    cache.put(sans_index, [], None)
+
+    assert cache.invalider_medicament(7) == 3
+    assert cache.get(autre) is not None
+    assert cache.get(ici) is None and cache.get(loin) is None and cache.get(sans_index) is None
+
+
+def test_autour_de_copie_avec_distance():
+    proche, eloignee = candidate(1, LAT, LON + 0.005), candidate(2, LAT, LON + 0.05)
+
+    resultats = SearchCache().autour_de([proche, eloignee], LAT, LON, 1000)
+
+    assert [r["id"] for r in resultats] == [1]
+    assert 0 < resultats[0]["distance"] < 1000
+    assert "distance" not in proche
+
+
+def test_zone_non_tronquee(monkeypatch):
+    """Plus de LIMITE_CANDIDATS pharmacies : toutes sont gardées pour la zone"""
+    aleatoire = random.Random(1)
+    index = SpatialIndex()
+    index.charger(
+        (i, LAT + aleatoire.uniform(-0.02, 0.02), LON + aleatoire.uniform(-0.02, 0.02))
+        for i in range(3 * LIMITE_CANDIDATS)
+    )
+    monkeypatch.setattr(search_service, "pharmacie_index", index)
+    cle = search_cache.cle(LAT, LON, "x", 5000)
+
+    assert len(SearchService._pharmacies_de_la_zone(cle, 5000)) == 3 * LIMITE_CANDIDATS
+
+
+@pytest.fixture
+def recherche_sans_base(monkeypatch):
+    """Index spatial chargé, requête de stock remplacée par un compteur"""
+    index = SpatialIndex()
+    index.charger([(1, LAT, LON + 0.002), (2, LAT + 0.003, LON)])
+    monkeypatch.setattr(search_service, "pharmacie_index", index)
+    appels = []
+
+    def search_by_ids(db, pharmacie_ids, medicament, medicament_ids):
+        appels.append(pharmacie_ids)
+        return [
+            dict(candidate(1, LAT, LON + 0.002), type="garde"),
+            candidate(2, LAT + 0.003, LON),
+        ]
+
+    monkeypatch.setattr(search_service.PharmacieRepository, "search_by_ids", staticmethod(search_by_ids))
+    search_cache.vider()
+    yield appels
+    search_cache.vider()
+
+
+def test_filtre_de_statut_partage_l_entree(recherche_sans_base):
+    toutes = SearchService.rechercher_pharmacies(None, "cachetest", LAT, LON, rayon_km=1)
+    de_garde = SearchService.rechercher_pharmacies(None, "cachetest", LAT, LON, rayon_km=1, filtre_statut="garde")
+
+    assert len(recherche_sans_base) == 1
+    assert {p["id"] for p in toutes} == {1, 2}
+    assert [p["id"] for p in de_garde] == [1]
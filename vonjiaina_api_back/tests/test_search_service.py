@@ -0,0 +1,119 @@
+import asyncio
+import math
+
+import pytest
+
+import services.search_service as search_service
+from services.search_service import SearchService
+from utils.horaires import horaires_cache
+from utils.spatial_index import METRES_PAR_DEGRE, SpatialIndex
+
+# Antananarivo
+LAT, LON = -18.9100, 47.5250
+
+# Pharmacies à l'est du point, à ces distances (mètres)
+DISTANCES = {1: 800, 2: 3000, 3: 9000, 4: 30000, 5: 60000}
+
+
+def _longitude(distance: float) -> float:
+    return LON + distance / (METRES_PAR_DEGRE * math.cos(math.radians(LAT)))
+
+
+@pytest.fixture
+def anneaux(monkeypatch):
+    """Index spatial chargé ; la requête de stock rend chaque pharmacie demandée"""
+    index = SpatialIndex()
+    index.charger((i, LAT, _longitude(d)) for i, d in DISTANCES.items())
+    monkeypatch.setattr(search_service, "pharmacie_index", index)
+    requetes = []
+
+    def search_by_ids(db, pharmacie_ids, medicament, medicament_ids):
+        requetes.append(list(pharmacie_ids))
+        return [
+            {"id": i, "nom": f"Pharmacie {i}", "type": "garde", "horaires": None,
+             "updated_at": None, "prix": None, "date_maj": None}
+            for i in pharmacie_ids
+        ]
+
+    monkeypatch.setattr(search_service.PharmacieRepository, "search_by_ids", staticmethod(search_by_ids))
+    yield requetes
+    for pharmacie_id in DISTANCES:
+        horaires_cache.retirer(pharmacie_id)
+
+
+def test_anneaux_s_arretent_au_rayon_max(anneaux):
+    pharmacies, couvert = SearchService.rechercher_plus_proches(
+        None, "x", LAT, LON, k=10, rayon_km=1, rayon_max_km=20
+    )
+
+    # Rayons 1, 2, 4, 8, 16 puis 20 km : jamais au-delà
+    assert len(anneaux) == 6
+    assert couvert == 20000
+    assert [p["id"] for p in pharmacies] == [1, 2, 3]
+    vues = [i for requete in anneaux for i in requete]
+    assert sorted(vues) == [1, 2, 3]  # chaque pharmacie vérifiée une seule fois
+
+
+def test_anneaux_s_arretent_a_k(anneaux):
+    pharmacies, couvert = SearchService.rechercher_plus_proches(
+        None, "x", LAT, LON, k=2, rayon_km=1, rayon_max_km=50
+    )
+
+    assert [p["id"] for p in pharmacies] == [1, 2]
+    assert couvert == 4000
+    assert 4 not in [i for requete in anneaux for i in requete]
+
+
+def test_anneau_trop_peuple(anneaux, monkeypatch):
+    monkeypatch.setattr(search_service, "LIMITE_CANDIDATS", 2)
+
+    pharmacies, _ = SearchService.rechercher_plus_proches(
+        None, "x", LAT, LON, k=3, rayon_km=10, rayon_max_km=10
+    )
+
+    # Les deux plus proches d'abord, le reste de l'anneau au tour suivant
+    assert anneaux == [[1, 2], [3]]
+    assert [p["id"] for p in pharmacies] == [1, 2, 3]
+
+
+def test_nombre_d_anneaux_borne(anneaux, monkeypatch):
+    monkeypatch.setattr(search_service, "MAX_ANNEAUX", 2)
+
+    SearchService.rechercher_plus_proches(None, "x", LAT, LON, k=10, rayon_km=1, rayon_max_km=50)
+
+    assert len(anneaux) == 2
+
+
+def test_variante_async_identique(anneaux, monkeypatch):
+    async def search_by_ids(db, pharmacie_ids, medicament, medicament_ids):
+        return search_service.PharmacieRepository.search_by_ids(db, pharmacie_ids, medicament, medicament_ids)
+
+    monkeypatch.setattr(search_service.AsyncPharmacieRepository, "search_by_ids", staticmethod(search_by_ids))
+    parametres = dict(medicament="x", latitude=LAT, longitude=LON, k=2, rayon_km=1, rayon_max_km=50)
+
+    synchrone = SearchService.rechercher_plus_proches(None, **parametres)
+    asynchrone = asyncio.run(SearchService.rechercher_plus_proches_async(None, **parametres))
+
+    assert asynchrone == synchrone
+    assert len(anneaux) == 6  # trois anneaux pour chacune
+
+
+def test_knn_sans_index(monkeypatch):
+    monkeypatch.setattr(search_service, "pharmacie_index", SpatialIndex())
+    appels = []
+
+    def search_plus_proches(db, medicament, latitude, longitude, limite, rayon_max, **options):
+        appels.append((limite, rayon_max, options["garde_uniquement"]))
+        return [{"id": 1, "nom": "P", "type": "garde", "horaires": None, "updated_at": None,
+                 "prix": None, "date_maj": None, "distance": 1200.0}]
+
+    monkeypatch.setattr(search_service.PharmacieRepository, "search_plus_proches", staticmethod(search_plus_proches))
+
+    pharmacies, couvert = SearchService.rechercher_plus_proches(
+        None, "x", LAT, LON, k=1, rayon_max_km=10, filtre_statut="garde"
+    )
+
+    assert appels == [(1, 10000, True)]
+    assert couvert == 1200.0
+    assert [p["id"] for p in pharmacies] == [1]
+    horaires_cache.retirer(1)
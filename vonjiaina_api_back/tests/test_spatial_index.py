@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from utils.spatial_index import SpatialIndex, distance_metres
+
+CENTRE = (-18.8792, 47.5079)  # Antananarivo
+
+
+def _points(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [
+        (i, CENTRE[0] + rng.gauss(0, 0.05), CENTRE[1] + rng.gauss(0, 0.05))
+        for i in range(1, n + 1)
+    ]
+
+
+def _balayage(points, latitude, longitude, rayon):
+    resultats = [
+        (pid, distance_metres(latitude, longitude, lat, lon))
+        for pid, lat, lon in points
+    ]
+    return sorted((r for r in resultats if r[1] <= rayon), key=lambda r: r[1])
+
+
+def test_distance_metres_connue():
+    # Un degré de latitude ~ 111,2 km
+    assert distance_metres(0, 0, 1, 0) == pytest.approx(111195, rel=1e-3)
+    assert distance_metres(*CENTRE, *CENTRE) == 0
+
+
+@pytest.mark.parametrize("rayon", [200, 1000, 5000, 20000])
+def test_rechercher_egale_balayage_complet(rayon):
+    points = _points(3000)
+    index = SpatialIndex()
+    index.charger(points)
+    rng = random.Random(rayon)
+    for _ in range(20):
+        latitude = CENTRE[0] + rng.gauss(0, 0.05)
+        longitude = CENTRE[1] + rng.gauss(0, 0.05)
+        attendu = _balayage(points, latitude, longitude, rayon)
+        obtenu = index.rechercher(latitude, longitude, rayon)
+        assert [pid for pid, _ in obtenu] == [pid for pid, _ in attendu]
+        assert [d for _, d in obtenu] == pytest.approx([d for _, d in attendu])
+
+
+def test_rechercher_trie_par_distance():
+    index = SpatialIndex()
+    index.charger(_points(500))
+    distances = [d for _, d in index.rechercher(*CENTRE, 5000)]
+    assert distances == sorted(distances)
+
+
+def test_bord_de_cellule_et_coordonnees_negatives():
+    # Deux points de part et d'autre d'une frontière de cellule (0.01°)
+    index = SpatialIndex()
+    index.charger([(1, -18.8999, 47.4999), (2, -18.9001, 47.5001)])
+    assert {pid for pid, _ in index.rechercher(-18.9, 47.5, 50)} == {1, 2}
+
+
+def test_ajouter_deplacer_retirer():
+    index = SpatialIndex()
+    index.charger([(1, *CENTRE)])
+    assert [pid for pid, _ in index.rechercher(*CENTRE, 100)] == [1]
+
+    index.ajouter(2, CENTRE[0] + 0.0001, CENTRE[1])
+    assert [pid for pid, _ in index.rechercher(*CENTRE, 100)] == [1, 2]
+
+    # Déplacée loin : plus dans le rayon, position mise à jour
+    index.ajouter(1, -21.45, 47.08)
+    assert [pid for pid, _ in index.rechercher(*CENTRE, 100)] == [2]
+    assert index.position(1) == (-21.45, 47.08)
+
+    index.retirer(2)
+    assert index.rechercher(*CENTRE, 100) == []
+    assert len(index) == 1
+
+
+def test_index_vide():
+    index = SpatialIndex()
+    assert not index.est_charge
+    assert index.rechercher(*CENTRE, 5000) == []
+    index.charger([])
+    assert index.est_charge
+    assert index.rechercher(*CENTRE, 5000) == []
+
+
+def test_candidats_contiennent_les_resultats():
+    points = _points(1000)
+    index = SpatialIndex()
+    index.charger(points)
+    candidats = set(index.candidats(*CENTRE, 3000))
+    assert {pid for pid, _ in index.rechercher(*CENTRE, 3000)} <= candidats
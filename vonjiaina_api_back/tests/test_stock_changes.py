@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from repositories.stock_repository import StockRepository
+from services import stock_changes_service
+from services.stock_changes_service import StockChangesService
+
+DATE = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def sql(requete) -> str:
+    return str(requete.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.parametrize("positions", [
+    (None, None),
+    ((752, 3), None),
+    ((2 ** 40 + 7, 12), (751, 1)),
+])
+def test_curseur_aller_retour(positions):
+    curseur = StockChangesService.encoder_curseur(*positions)
+
+    assert "=" not in curseur
+    assert StockChangesService.decoder_curseur(curseur) == positions
+
+
+@pytest.mark.parametrize("curseur", [
+    "pas du base64 !",
+    "e30",  # {}
+    StockChangesService.encoder_curseur(None, None)[:-3],
+    # ancien format (date ISO, id)
+    "eyJtIjogWyIyMDI2LTAzLTAxVDAwOjAwOjAwKzAwOjAwIiwgMV0sICJzIjogbnVsbH0",
+])
+def test_curseur_invalide(curseur):
+    with pytest.raises(ValueError):
+        StockChangesService.decoder_curseur(curseur)
+
+
+def test_requetes_filtrees_par_xmin():
+    majs = sql(StockRepository.requete_changements((10, 2), 100))
+    suppressions = sql(StockRepository.requete_suppressions(None, 100))
+
+    for requete in (majs, suppressions):
+        assert "pg_snapshot_xmin(pg_current_snapshot())" in requete
+        assert "ORDER BY" in requete and "xid_ecriture" in requete.split("ORDER BY")[1]
+    assert "(stocks.xid_ecriture, stocks.id) >" in majs
+
+
+def test_fusion_des_flux_par_transaction(monkeypatch):
+    majs = [
+        {"id": 5, "pharmacie_id": 1, "medicament_id": 9, "quantite": 3, "prix": 100.0,
+         "date_maj": DATE, "xid_ecriture": 700},
+        {"id": 2, "pharmacie_id": 1, "medicament_id": 8, "quantite": 0, "prix": None,
+         "date_maj": DATE, "xid_ecriture": 702},
+    ]
+    suppressions = [
+        {"id": 1, "stock_id": 4, "pharmacie_id": 1, "medicament_id": 7,
+         "date_suppression": DATE, "xid_ecriture": 701},
+    ]
+    appels = []
+
+    async def changements(db, apres, limite):
+        appels.append(("m", apres))
+        return [m for m in majs if apres is None or (m["xid_ecriture"], m["id"]) > apres][:limite]
+
+    async def supprimes(db, apres, limite):
+        appels.append(("s", apres))
+        return [s for s in suppressions if apres is None or (s["xid_ecriture"], s["id"]) > apres][:limite]
+
+    depot = stock_changes_service.AsyncStockRepository
+    monkeypatch.setattr(depot, "changements", staticmethod(changements))
+    monkeypatch.setattr(depot, "suppressions", staticmethod(supprimes))
+
+    page = asyncio.run(StockChangesService.lister(None, None, limite=2))
+    assert [(c["type"], c["stock_id"]) for c in page["changements"]] == [("maj", 5), ("suppression", 4)]
+    assert page["a_suivre"]
+    assert StockChangesService.decoder_curseur(page["curseur"]) == ((700, 5), (701, 1))
+
+    suite = asyncio.run(StockChangesService.lister(None, page["curseur"], limite=2))
+    assert [(c["type"], c["stock_id"]) for c in suite["changements"]] == [("maj", 2)]
+    assert not suite["a_suivre"]
+    assert appels[-2:] == [("m", (700, 5)), ("s", (701, 1))]
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_async_db
+from app.dependencies import get_current_user
+from app.config import get_settings
+from app.main import app
+from models.user import User
+from services import stock_import_service
+from services.stock_import_service import StockImportService
+
+CSV = (
+    "pharmacie_id,medicament_id,quantite,prix\n"
+    "1,10,5,1200\n"
+    "2,10,7,\n"
+    ",11,3,500\n"
+)
+
+
+async def flux(texte: str):
+    yield texte.encode()
+
+
+@pytest.fixture
+def base_factice(monkeypatch):
+    """Repository de stock remplacé : enregistre les lignes upsertées"""
+    upsertees = []
+
+    async def ids_existants(db, pharmacie_ids, medicament_ids):
+        return set(pharmacie_ids), set(medicament_ids)
+
+    async def upsert_many(db, lignes):
+        upsertees.extend(lignes)
+        return [(l["pharmacie_id"], l["medicament_id"], True) for l in lignes]
+
+    depot = stock_import_service.AsyncStockRepository
+    monkeypatch.setattr(depot, "ids_existants", staticmethod(ids_existants))
+    monkeypatch.setattr(depot, "upsert_many", staticmethod(upsert_many))
+    return upsertees
+
+
+def test_import_avec_pharmacie_par_defaut(base_factice):
+    rapport = asyncio.run(StockImportService.importer(None, flux(CSV), pharmacie_id=1))
+
+    assert rapport["lignes_importees"] == 3
+    assert {(l["pharmacie_id"], l["medicament_id"]) for l in base_factice} == {(1, 10), (2, 10), (1, 11)}
+
+
+def test_import_limite_a_la_pharmacie_imposee(base_factice):
+    rapport = asyncio.run(StockImportService.importer(
+        None, flux(CSV), pharmacie_id=1, pharmacie_imposee=1
+    ))
+
+    assert rapport["lignes_importees"] == 2
+    assert {l["pharmacie_id"] for l in base_factice} == {1}
+    assert [e["ligne"] for e in rapport["erreurs"]] == [3]
+    assert "non autorisée" in rapport["erreurs"][0]["erreur"]
+
+
+def test_lot_rejette_une_autre_pharmacie(base_factice):
+    rapport = stock_import_service.RapportImport()
+    lot = [(2, {"pharmacie_id": 2, "medicament_id": 10, "quantite": 1, "prix": None})]
+
+    asyncio.run(StockImportService._appliquer_lot(None, lot, rapport, pharmacie_imposee=1))
+
+    assert base_factice == []
+    assert rapport.nb_erreurs == 1
+
+
+def _utilisateur(role, pharmacie_id=None):
+    return User(id=1, email=f"{role}@example.com", nom=role, role=role, pharmacie_id=pharmacie_id, is_active=True)
+
+
+@pytest.fixture
+def client(base_factice):
+    async def sans_base():
+        yield None
+
+    app.dependency_overrides[get_async_db] = sans_base
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _connecter(user):
+    app.dependency_overrides[get_current_user] = lambda: user
+
+
+def _importer(client, params=None):
+    return client.post(f"{get_settings().API_V1_PREFIX}/stocks/import", params=params, content=CSV, headers={"Content-Type": "text/csv"})
+
+
+def test_import_compte_pharmacie_force_sa_pharmacie(client, base_factice):
+    _connecter(_utilisateur("pharmacie", pharmacie_id=1))
+
+    reponse = _importer(client)
+
+    assert reponse.status_code == 200
+    assert reponse.json()["lignes_importees"] == 2
+    assert {l["pharmacie_id"] for l in base_factice} == {1}
+
+
+def test_import_compte_pharmacie_autre_pharmacie_interdite(client, base_factice):
+    _connecter(_utilisateur("pharmacie", pharmacie_id=1))
+
+    assert _importer(client, {"pharmacie_id": 2}).status_code == 403
+    assert base_factice == []
+
+
+def test_import_compte_pharmacie_sans_pharmacie(client, base_factice):
+    _connecter(_utilisateur("pharmacie"))
+
+    assert _importer(client).status_code == 403
+    assert base_factice == []
+
+
+def test_import_admin_toutes_pharmacies(client, base_factice):
+    _connecter(_utilisateur("admin"))
+
+    reponse = _importer(client, {"pharmacie_id": 1})
+
+    assert reponse.status_code == 200
+    assert {l["pharmacie_id"] for l in base_factice} == {1, 2}
+
+
+def test_import_sans_token(client, base_factice):
+    reponse = _importer(client)
+
+    assert reponse.status_code == 401
+    assert reponse.headers["WWW-Authenticate"] == "Bearer"
+    assert base_factice == []
+
+
+def test_import_compte_utilisateur_interdit(client, base_factice):
+    _connecter(_utilisateur("user"))
+
+    assert _importer(client).status_code == 403
+    assert base_factice == []
@@ -0,0 +1,68 @@
+from utils.suggestion_index import SuggestionIndex
+
+MEDICAMENTS = [
+    (1, "Doliprane", "Paracétamol"),
+    (2, "Dafalgan", "Paracétamol"),
+    (3, "Amoxil", "Amoxicilline"),
+    (4, "Paracétamol Biogaran", "Paracétamol"),
+]
+
+
+def _index(**kwargs):
+    index = SuggestionIndex(**kwargs)
+    index.charger(MEDICAMENTS, popularite={2: 5.0, 1: 1.0})
+    return index
+
+
+def _ids(suggestions):
+    return [s["id"] for s in suggestions]
+
+
+def test_prefixe_par_popularite():
+    index = _index()
+    assert _ids(index.suggerer("d")) == [2, 1]
+    assert index.suggerer("dol") == [{"id": 1, "nom_commercial": "Doliprane"}]
+
+
+def test_prefixe_sur_la_dci_sans_accents():
+    # "paracetamol" (sans accent) complète les noms et les DCI
+    assert set(_ids(_index().suggerer("PARACE"))) == {1, 2, 4}
+
+
+def test_k_et_prefixe_vide():
+    index = _index()
+    assert len(index.suggerer("d", k=1)) == 1
+    assert index.suggerer("") == []
+    assert index.suggerer("zz") == []
+
+
+def test_ajouter_renommer_retirer():
+    index = _index(duree_cache_secondes=0)
+    index.ajouter(5, "Dolko", None)
+    assert 5 in _ids(index.suggerer("dol"))
+
+    index.ajouter(1, "Efferalgan", "Paracétamol")
+    assert 1 not in _ids(index.suggerer("dol"))
+    assert _ids(index.suggerer("eff")) == [1]
+
+    index.retirer(3)
+    assert index.suggerer("amox") == []
+    assert len(index) == 4
+
+
+def test_popularite_visible_apres_expiration_du_cache():
+    index = _index(duree_cache_secondes=3600)
+    assert _ids(index.suggerer("d")) == [2, 1]
+    index.enregistrer_recherche(1, poids=10)
+    # Réponse en cache tant qu'elle n'a pas expiré
+    assert _ids(index.suggerer("d")) == [2, 1]
+
+    index.duree_cache_secondes = 0
+    assert _ids(index.suggerer("d")) == [1, 2]
+
+
+def test_modification_vide_le_cache():
+    index = _index(duree_cache_secondes=3600)
+    assert index.suggerer("amo") != []
+    index.retirer(3)
+    assert index.suggerer("amo") == []
@@ -8,10 +8,74 @@ from .security import (
     create_access_token,
     verify_token
 )
+from .spatial_index import (
+    SpatialIndex,
+    pharmacie_index,
+    distance_metres
+)
+from .medicament_index import (
+    MedicamentIndex,
+    medicament_index,
+    normaliser
+)
+from .suggestion_index import (
+    SuggestionIndex,
+    suggestion_index
+)
+from .search_cache import (
+    SearchCache,
+    search_cache
+)
+from .password_pool import (
+    PasswordPool,
+    PoolSatureError,
+    password_pool
+)
+from .auth_cache import (
+    ClaimsCache,
+    UserCache,
+    claims_cache,
+    user_cache
+)
+from .routage import (
+    GrapheRoutier,
+    graphe_routier,
+    grille_synthetique
+)
+from .carte_index import (
+    CarteIndex,
+    TuilesCache,
+    carte_index,
+    tuiles_cache
+)
 
 __all__ = [
     "get_password_hash",
     "verify_password",
     "create_access_token",
     "verify_token",
+    "SpatialIndex",
+    "pharmacie_index",
+    "distance_metres",
+    "MedicamentIndex",
+    "medicament_index",
+    "normaliser",
+    "SuggestionIndex",
+    "suggestion_index",
+    "SearchCache",
+    "search_cache",
+    "PasswordPool",
+    "PoolSatureError",
+    "password_pool",
+    "ClaimsCache",
+    "UserCache",
+    "claims_cache",
+    "user_cache",
+    "GrapheRoutier",
+    "graphe_routier",
+    "grille_synthetique",
+    "CarteIndex",
+    "TuilesCache",
+    "carte_index",
+    "tuiles_cache",
 ]
\ No newline at end of file
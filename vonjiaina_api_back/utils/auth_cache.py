@@ -0,0 +1,147 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import get_settings
+from utils.security import verify_token
+
+settings = get_settings()
+
+
+def _empreinte(token: str) -> str:
+    # Le token lui-même n'est jamais gardé en mémoire comme clé
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class ClaimsCache:
+    """
+    Claims des tokens JWT déjà vérifiés
+
+    Vérifier la signature d'un token à chaque appel est inutile : tant
+    qu'il n'a pas expiré, le résultat ne change pas. On garde les claims
+    par empreinte SHA-256 du token jusqu'à leur `exp`, dans un LRU borné.
+    """
+
+    def __init__(self, taille_max: int = 10000):
+        self.taille_max = taille_max
+        self._lock = threading.Lock()
+        self._entrees: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    def verifier(self, token: str) -> Optional[dict]:
+        """Claims d'un token valide et non expiré, ou None"""
+        cle = _empreinte(token)
+        maintenant = time.time()
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                claims, expire_a = entree
+                if expire_a > maintenant:
+                    self._entrees.move_to_end(cle)
+                    self.hits += 1
+                    return claims
+                del self._entrees[cle]
+            self.misses += 1
+
+        claims = verify_token(token)
+        if claims is None or "exp" not in claims:
+            return None
+
+        with self._lock:
+            self._entrees[cle] = (claims, float(claims["exp"]))
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+        return claims
+
+    def vider(self) -> None:
+        with self._lock:
+            self._entrees.clear()
+
+    def statistiques(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entrees": len(self._entrees),
+            "taille_max": self.taille_max,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_hit": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class UserCache:
+    """
+    Utilisateurs récemment chargés, par email (le `sub` des tokens)
+
+    Durée de vie courte : un changement fait par un autre worker (rôle,
+    désactivation) est vu au plus tard après `duree_secondes`. Les
+    modifications faites par ce processus passent par invalider().
+    Les objets sont détachés de leur session et partagés entre requêtes :
+    ils ne doivent pas être modifiés.
+    """
+
+    def __init__(self, taille_max: int = 10000, duree_secondes: float = 30.0):
+        self.taille_max = taille_max
+        self.duree_secondes = duree_secondes
+        self._lock = threading.Lock()
+        self._entrees: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    def get(self, email: str):
+        with self._lock:
+            entree = self._entrees.get(email)
+            if entree is None or entree[1] <= time.monotonic():
+                self._entrees.pop(email, None)
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(email)
+            self.hits += 1
+            return entree[0]
+
+    def put(self, user) -> None:
+        with self._lock:
+            self._entrees[user.email] = (user, time.monotonic() + self.duree_secondes)
+            self._entrees.move_to_end(user.email)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def invalider(self, email: str) -> None:
+        with self._lock:
+            if self._entrees.pop(email, None) is not None:
+                self.invalidations += 1
+
+    def vider(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entrees)
+            self._entrees.clear()
+
+    def statistiques(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entrees": len(self._entrees),
+            "taille_max": self.taille_max,
+            "duree_secondes": self.duree_secondes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_hit": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+# Caches partagés par l'application
+claims_cache = ClaimsCache(taille_max=settings.AUTH_CACHE_TAILLE)
+user_cache = UserCache(
+    taille_max=settings.AUTH_CACHE_TAILLE,
+    duree_secondes=settings.USER_CACHE_SECONDES
+)
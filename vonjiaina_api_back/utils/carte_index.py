@@ -0,0 +1,262 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Zooms agrégés (tuiles web 256 px) ; au-delà, la grille du zoom maximal
+ZOOM_MAX = 18
+# Côté d'une cellule de regroupement, en pixels à l'écran
+TAILLE_CELLULE_PX = 64
+# Latitude maximale de la projection Web Mercator
+LATITUDE_MAX = 85.05112878
+
+
+def mercator(latitude: float, longitude: float) -> Tuple[float, float]:
+    """Position Web Mercator normalisée : (0, 0) nord-ouest, (1, 1) sud-est"""
+    latitude = max(-LATITUDE_MAX, min(LATITUDE_MAX, latitude))
+    x = (longitude + 180.0) / 360.0
+    sinus = math.sin(math.radians(latitude))
+    y = 0.5 - math.log((1 + sinus) / (1 - sinus)) / (4 * math.pi)
+    return x, y
+
+
+def tuile(latitude: float, longitude: float, zoom: int) -> Tuple[int, int]:
+    """Tuile z/x/y (schéma XYZ) contenant le point"""
+    return _cle(*mercator(latitude, longitude), 2 ** zoom)
+
+
+def _cle(x: float, y: float, n: int) -> Tuple[int, int]:
+    return min(int(x * n), n - 1), min(int(y * n), n - 1)
+
+
+class _Cellule:
+    __slots__ = ("ids", "nombre_garde", "somme_lat", "somme_lon")
+
+    def __init__(self):
+        self.ids: Set[int] = set()
+        self.nombre_garde = 0
+        self.somme_lat = 0.0
+        self.somme_lon = 0.0
+
+
+class CarteIndex:
+    """
+    Regroupement des pharmacies pour la carte, précalculé par zoom
+
+    Pour chaque zoom, les pharmacies sont agrégées dans une grille de
+    cellules de TAILLE_CELLULE_PX pixels à l'écran (nombre, pharmacies de
+    garde, somme des coordonnées pour le centroïde). Une vue de la carte
+    ne lit que les cellules de sa boîte englobante : déplacer ou zoomer
+    ne coûte pas de requête SQL. Une pharmacie créée, déplacée ou
+    supprimée met à jour ses cellules à tous les zooms.
+    """
+
+    def __init__(self, zoom_max: int = ZOOM_MAX, taille_cellule_px: int = TAILLE_CELLULE_PX):
+        self.zoom_max = zoom_max
+        self.taille_cellule_px = taille_cellule_px
+        self._grilles: List[Dict[Tuple[int, int], _Cellule]] = [{} for _ in range(zoom_max + 1)]
+        self._marqueurs: Dict[int, Tuple[float, float, bool]] = {}
+        self._lock = threading.RLock()
+        self._charge = False
+        # Change à chaque modification (ETag des vues)
+        self.version = 0
+
+    @property
+    def est_charge(self) -> bool:
+        return self._charge
+
+    def __len__(self) -> int:
+        return len(self._marqueurs)
+
+    def _cellules_par_axe(self, zoom: int) -> int:
+        return (2 ** zoom) * 256 // self.taille_cellule_px
+
+    def charger(self, marqueurs: Iterable[Tuple[int, float, float, Optional[str]]]) -> None:
+        """
+        (Re)construire les grilles à partir de tuples
+        (id, latitude, longitude, type)
+        """
+        with self._lock:
+            self._grilles = [{} for _ in range(self.zoom_max + 1)]
+            self._marqueurs = {}
+            for pharmacie_id, latitude, longitude, type_pharmacie in marqueurs:
+                if latitude is None or longitude is None:
+                    continue
+                self._ajouter(pharmacie_id, float(latitude), float(longitude), type_pharmacie == "garde")
+            self._charge = True
+            self.version += 1
+
+    def ajouter(self, pharmacie_id: int, latitude: float, longitude: float, type_pharmacie: Optional[str]) -> None:
+        """Ajouter, déplacer ou modifier une pharmacie"""
+        with self._lock:
+            self._retirer(pharmacie_id)
+            self._ajouter(pharmacie_id, latitude, longitude, type_pharmacie == "garde")
+            self.version += 1
+
+    def retirer(self, pharmacie_id: int) -> None:
+        with self._lock:
+            if self._retirer(pharmacie_id):
+                self.version += 1
+
+    def _ajouter(self, pharmacie_id: int, latitude: float, longitude: float, garde: bool) -> None:
+        self._marqueurs[pharmacie_id] = (latitude, longitude, garde)
+        x, y = mercator(latitude, longitude)
+        for zoom, grille in enumerate(self._grilles):
+            cle = _cle(x, y, self._cellules_par_axe(zoom))
+            cellule = grille.get(cle)
+            if cellule is None:
+                cellule = grille[cle] = _Cellule()
+            cellule.ids.add(pharmacie_id)
+            cellule.nombre_garde += garde
+            cellule.somme_lat += latitude
+            cellule.somme_lon += longitude
+
+    def _retirer(self, pharmacie_id: int) -> bool:
+        marqueur = self._marqueurs.pop(pharmacie_id, None)
+        if marqueur is None:
+            return False
+        latitude, longitude, garde = marqueur
+        x, y = mercator(latitude, longitude)
+        for zoom, grille in enumerate(self._grilles):
+            cle = _cle(x, y, self._cellules_par_axe(zoom))
+            cellule = grille[cle]
+            cellule.ids.discard(pharmacie_id)
+            if not cellule.ids:
+                del grille[cle]
+                continue
+            cellule.nombre_garde -= garde
+            cellule.somme_lat -= latitude
+            cellule.somme_lon -= longitude
+        return True
+
+    def clusters(
+        self,
+        sud: float,
+        ouest: float,
+        nord: float,
+        est: float,
+        zoom: int
+    ) -> List[dict]:
+        """
+        Groupes de pharmacies visibles dans la boîte, au zoom demandé :
+        centroïde, nombre, nombre de pharmacies de garde, et id si le
+        groupe n'a qu'une pharmacie
+        """
+        zoom = max(0, min(zoom, self.zoom_max))
+        n = self._cellules_par_axe(zoom)
+        x_min, y_min = mercator(nord, ouest)
+        x_max, y_max = mercator(sud, est)
+        i_min, i_max = int(x_min * n), min(int(x_max * n), n - 1)
+        j_min, j_max = int(y_min * n), min(int(y_max * n), n - 1)
+
+        with self._lock:
+            grille = self._grilles[zoom]
+            if (i_max - i_min + 1) * (j_max - j_min + 1) <= len(grille):
+                cles = [(i, j) for i in range(i_min, i_max + 1) for j in range(j_min, j_max + 1)]
+                cellules = [(cle, grille[cle]) for cle in cles if cle in grille]
+            else:
+                cellules = [
+                    (cle, cellule) for cle, cellule in grille.items()
+                    if i_min <= cle[0] <= i_max and j_min <= cle[1] <= j_max
+                ]
+
+            resultats = []
+            for _, cellule in cellules:
+                nombre = len(cellule.ids)
+                groupe = {
+                    "latitude": round(cellule.somme_lat / nombre, 6),
+                    "longitude": round(cellule.somme_lon / nombre, 6),
+                    "nombre": nombre,
+                    "nombre_garde": cellule.nombre_garde,
+                    "id": None,
+                }
+                if nombre == 1:
+                    groupe["id"] = next(iter(cellule.ids))
+                    # Position exacte plutôt que la somme (arrondis cumulés)
+                    groupe["latitude"], groupe["longitude"], _ = self._marqueurs[groupe["id"]]
+                resultats.append(groupe)
+        return resultats
+
+    def statistiques(self) -> dict:
+        with self._lock:
+            return {
+                "pharmacies": len(self._marqueurs),
+                "cellules": sum(len(grille) for grille in self._grilles),
+                "version": self.version,
+            }
+
+
+class TuilesCache:
+    """
+    Tuiles vectorielles (MVT) déjà calculées, par z/x/y
+
+    LRU bornée en nombre d'entrées et en octets. Une pharmacie modifiée
+    invalide, à chaque zoom, la seule tuile qui contient sa position.
+    """
+
+    def __init__(self, taille_max: int = 5000, octets_max: int = 64 * 1024 * 1024, zoom_max: int = 22):
+        self.taille_max = taille_max
+        self.octets_max = octets_max
+        self.zoom_max = zoom_max
+        self._lock = threading.Lock()
+        self._entrees: "OrderedDict[Tuple[int, int, int], Tuple[bytes, str]]" = OrderedDict()
+        self.octets = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, z: int, x: int, y: int) -> Optional[Tuple[bytes, str]]:
+        """(contenu, empreinte) de la tuile, ou None"""
+        with self._lock:
+            entree = self._entrees.get((z, x, y))
+            if entree is None:
+                self.misses += 1
+                return None
+            self._entrees.move_to_end((z, x, y))
+            self.hits += 1
+            return entree
+
+    def put(self, z: int, x: int, y: int, contenu: bytes) -> Tuple[bytes, str]:
+        entree = (contenu, hashlib.sha1(contenu).hexdigest()[:16])
+        with self._lock:
+            ancienne = self._entrees.pop((z, x, y), None)
+            if ancienne is not None:
+                self.octets -= len(ancienne[0])
+            self._entrees[(z, x, y)] = entree
+            self.octets += len(contenu)
+            while self._entrees and (len(self._entrees) > self.taille_max or self.octets > self.octets_max):
+                _, (retiree, _) = self._entrees.popitem(last=False)
+                self.octets -= len(retiree)
+        return entree
+
+    def invalider(self, latitude: float, longitude: float) -> None:
+        """Retirer les tuiles contenant le point, à tous les zooms"""
+        with self._lock:
+            for z in range(self.zoom_max + 1):
+                entree = self._entrees.pop((z, *tuile(latitude, longitude, z)), None)
+                if entree is not None:
+                    self.octets -= len(entree[0])
+                    self.invalidations += 1
+
+    def vider(self) -> None:
+        with self._lock:
+            self._entrees.clear()
+            self.octets = 0
+
+    def statistiques(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entrees": len(self._entrees),
+                "octets": self.octets,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taux_hit": round(self.hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# Index et cache partagés par l'application
+carte_index = CarteIndex()
+tuiles_cache = TuilesCache()
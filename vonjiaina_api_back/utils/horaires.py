@@ -0,0 +1,263 @@
+import bisect
+import logging
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+TZ_MADAGASCAR = pytz.timezone('Indian/Antananarivo')
+
+MINUTES_PAR_JOUR = 24 * 60
+MINUTES_PAR_SEMAINE = 7 * MINUTES_PAR_JOUR
+
+# Jours de la semaine en français (0 = lundi)
+JOURS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+
+
+def minute_de_semaine(moment: Optional[datetime] = None) -> int:
+    """
+    Minute de la semaine à Madagascar (0 = lundi 00:00)
+    À calculer une seule fois par requête et à réutiliser
+    """
+    if moment is None:
+        moment = datetime.now(TZ_MADAGASCAR)
+    else:
+        moment = moment.astimezone(TZ_MADAGASCAR)
+    return moment.weekday() * MINUTES_PAR_JOUR + moment.hour * 60 + moment.minute
+
+
+def _parse_heure(heure_str: str) -> int:
+    """
+    Convertir "8h", "8h30", "08:00" ou "8" en minutes depuis minuit
+    """
+    parties = heure_str.strip().lower().replace('h', ':').split(':')
+    heures = int(parties[0])
+    minutes = int(parties[1]) if len(parties) > 1 and parties[1] else 0
+    if not (0 <= heures <= 24 and 0 <= minutes < 60):
+        raise ValueError(f"heure invalide : {heure_str!r}")
+    return heures * 60 + minutes
+
+
+def _plages_du_jour(horaire_jour) -> List[Tuple[int, int, str]]:
+    """
+    Plages (ouverture, fermeture, libellé d'ouverture) d'une journée
+
+    Formats acceptés :
+    - "8h-18h", "8h30-12h, 14h-18h"
+    - {"ouverture": "08:00", "fermeture": "18:00"}
+    - une liste de l'un ou l'autre
+    """
+    if isinstance(horaire_jour, list):
+        return [plage for element in horaire_jour for plage in _plages_du_jour(element)]
+
+    if isinstance(horaire_jour, dict):
+        ouverture = horaire_jour.get('ouverture', '')
+        fermeture = horaire_jour.get('fermeture', '')
+        if not ouverture or not fermeture:
+            return []
+        return [(_parse_heure(ouverture), _parse_heure(fermeture), ouverture)]
+
+    if isinstance(horaire_jour, str):
+        plages = []
+        for morceau in re.split(r"[,;/]", horaire_jour):
+            morceau = morceau.replace(' ', '')
+            if not morceau:
+                continue
+            parties = morceau.split('-')
+            if len(parties) != 2:
+                raise ValueError(f"plage invalide : {morceau!r}")
+            plages.append((_parse_heure(parties[0]), _parse_heure(parties[1]), parties[0]))
+        return plages
+
+    return []
+
+
+class EtatHoraires:
+    """
+    Statut d'une pharmacie, valable pour toute minute de [depuis, jusqu_a)
+
+    Entre deux bornes d'intervalle, ouverte ou non ne change pas et la
+    prochaine ouverture reste la même : l'état est réutilisé par toutes
+    les requêtes jusqu'à la borne suivante.
+    """
+
+    __slots__ = ("depuis", "jusqu_a", "ouverte", "prochaine", "libelle", "texte")
+
+    def __init__(
+        self,
+        depuis: int,
+        jusqu_a: int,
+        ouverte: bool,
+        prochaine: Optional[int] = None,
+        libelle: Optional[str] = None
+    ):
+        self.depuis = depuis
+        self.jusqu_a = jusqu_a
+        self.ouverte = ouverte
+        # Minute de la prochaine ouverture (au-delà de la semaine si elle
+        # est la semaine suivante)
+        self.prochaine = prochaine
+        self.libelle = libelle
+        # (jour, libellé formaté) de la prochaine ouverture, par jour
+        self.texte: Optional[Tuple[int, Optional[str]]] = None
+
+    def prochaine_ouverture(self, minute: int) -> Optional[Tuple[int, str]]:
+        """(minutes d'attente, libellé), comme HorairesCompiles.prochaine_ouverture"""
+        if self.prochaine is None:
+            return None
+        return self.prochaine - minute, self.libelle
+
+
+class HorairesCompiles:
+    """
+    Horaires d'une pharmacie sous forme d'intervalles [début, fin) en
+    minutes de la semaine, triés et disjoints : le statut se lit par
+    recherche binaire
+    """
+
+    __slots__ = ("debuts", "fins", "libelles", "_etat")
+
+    def __init__(self, plages: Sequence[Tuple[int, int, str]] = ()):
+        # Fusion des plages qui se chevauchent ou se touchent
+        fusion: List[List] = []
+        for debut, fin, libelle in sorted(plages):
+            if fusion and debut <= fusion[-1][1]:
+                fusion[-1][1] = max(fusion[-1][1], fin)
+            else:
+                fusion.append([debut, fin, libelle])
+
+        self.debuts = tuple(p[0] for p in fusion)
+        self.fins = tuple(p[1] for p in fusion)
+        self.libelles = tuple(p[2] for p in fusion)
+        self._etat: Optional[EtatHoraires] = None
+
+    def est_ouverte(self, minute: int) -> bool:
+        i = bisect.bisect_right(self.debuts, minute) - 1
+        return i >= 0 and minute < self.fins[i]
+
+    def prochaine_ouverture(self, minute: int) -> Optional[Tuple[int, str]]:
+        """
+        (minutes d'attente, libellé) de la prochaine ouverture après `minute`
+        """
+        if not self.debuts:
+            return None
+        i = bisect.bisect_right(self.debuts, minute)
+        if i < len(self.debuts):
+            return self.debuts[i] - minute, self.libelles[i]
+        # Pas d'autre ouverture cette semaine : première de la semaine suivante
+        return self.debuts[0] + MINUTES_PAR_SEMAINE - minute, self.libelles[0]
+
+    def etat(self, minute: int) -> EtatHoraires:
+        """
+        État à `minute`, recalculé seulement quand `minute` sort de
+        l'intervalle de validité du précédent
+        """
+        etat = self._etat
+        if etat is None or not etat.depuis <= minute < etat.jusqu_a:
+            etat = self._etat = self._calculer_etat(minute)
+        return etat
+
+    def _calculer_etat(self, minute: int) -> EtatHoraires:
+        if not self.debuts:
+            return EtatHoraires(0, MINUTES_PAR_SEMAINE, False)
+        i = bisect.bisect_right(self.debuts, minute) - 1
+        if i >= 0 and minute < self.fins[i]:
+            return EtatHoraires(self.debuts[i], self.fins[i], True)
+
+        depuis = self.fins[i] if i >= 0 else 0
+        if i + 1 < len(self.debuts):
+            return EtatHoraires(depuis, self.debuts[i + 1], False, self.debuts[i + 1], self.libelles[i + 1])
+        # Pas d'autre ouverture cette semaine : première de la semaine suivante
+        return EtatHoraires(
+            depuis, MINUTES_PAR_SEMAINE, False,
+            self.debuts[0] + MINUTES_PAR_SEMAINE, self.libelles[0]
+        )
+
+
+def compiler_horaires(horaires: Optional[Dict]) -> HorairesCompiles:
+    """
+    Compiler le JSON `horaires` d'une pharmacie en intervalles
+    de minutes de la semaine
+
+    Une fermeture antérieure à l'ouverture (ex: "20h-2h") déborde sur le
+    lendemain ; le dimanche soir déborde sur le lundi.
+    """
+    plages = []
+    for index_jour, nom_jour in enumerate(JOURS):
+        if not horaires or nom_jour not in horaires:
+            continue
+        try:
+            plages_jour = _plages_du_jour(horaires[nom_jour])
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning("Horaire ignoré (%s) : %s", nom_jour, e)
+            continue
+
+        decalage = index_jour * MINUTES_PAR_JOUR
+        for ouverture, fermeture, libelle in plages_jour:
+            if fermeture <= ouverture:
+                fermeture += MINUTES_PAR_JOUR
+            debut, fin = decalage + ouverture, decalage + fermeture
+            if fin > MINUTES_PAR_SEMAINE:
+                plages.append((debut, MINUTES_PAR_SEMAINE, libelle))
+                plages.append((0, fin - MINUTES_PAR_SEMAINE, libelle))
+            else:
+                plages.append((debut, fin, libelle))
+
+    return HorairesCompiles(plages)
+
+
+class HorairesCache:
+    """
+    Horaires compilés par pharmacie, invalidés par `updated_at`
+
+    Chaque entrée garde son propre état courant (HorairesCompiles.etat) :
+    modifier une pharmacie ne recalcule qu'elle, et le passage d'une
+    minute ne recalcule que les pharmacies lues qui ont franchi une borne.
+    `version` compte les compilations et suppressions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiles: Dict[int, Tuple[Optional[datetime], HorairesCompiles]] = {}
+        self.version = 0
+
+    def get(
+        self,
+        pharmacie_id: int,
+        updated_at: Optional[datetime],
+        horaires: Optional[Dict]
+    ) -> HorairesCompiles:
+        """Horaires compilés d'une pharmacie (compilés au premier accès)"""
+        en_cache = self._compiles.get(pharmacie_id)
+        if en_cache is not None and en_cache[0] == updated_at:
+            return en_cache[1]
+        return self.compiler(pharmacie_id, updated_at, horaires)
+
+    def compiler(
+        self,
+        pharmacie_id: int,
+        updated_at: Optional[datetime],
+        horaires: Optional[Dict]
+    ) -> HorairesCompiles:
+        """Compiler et mettre en cache (à l'écriture ou au chargement)"""
+        compiles = compiler_horaires(horaires)
+        with self._lock:
+            self._compiles[pharmacie_id] = (updated_at, compiles)
+            self.version += 1
+        return compiles
+
+    def retirer(self, pharmacie_id: int) -> None:
+        with self._lock:
+            if self._compiles.pop(pharmacie_id, None) is not None:
+                self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._compiles)
+
+
+# Cache partagé par l'application
+horaires_cache = HorairesCache()
@@ -0,0 +1,259 @@
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Compactage des listes inversées au-delà de cette part d'entrées retirées
+SEUIL_COMPACTAGE = 0.25
+# ... et de ce nombre d'entrées retirées (évite de compacter un petit index)
+MIN_COMPACTAGE = 64
+
+
+def normaliser(texte: Optional[str]) -> str:
+    """
+    Minuscules, sans accents ni ponctuation
+    Exemple: "Paracétamol 500mg" -> "paracetamol 500mg"
+    """
+    if not texte:
+        return ""
+    decompose = unicodedata.normalize("NFKD", texte)
+    sans_accents = "".join(c for c in decompose if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", sans_accents.lower()).strip()
+
+
+def trigrammes(texte: str) -> Set[str]:
+    """
+    Trigrammes à la manière de pg_trgm : chaque mot est entouré
+    de deux espaces devant et un derrière
+    Exemple: "para" -> {"  p", " pa", "par", "ara", "ra "}
+    """
+    resultat = set()
+    for mot in normaliser(texte).split():
+        mot = f"  {mot} "
+        for i in range(len(mot) - 2):
+            resultat.add(mot[i:i + 3])
+    return resultat
+
+
+class MedicamentIndex:
+    """
+    Index n-grammes (trigrammes) en mémoire sur nom_commercial et dci
+
+    Chaque champ indexé occupe une "entrée" ; une liste inversée associe
+    chaque trigramme aux entrées qui le contiennent. Le score combine la
+    similarité de Jaccard (comme similarity() de pg_trgm) et la part des
+    trigrammes de la requête retrouvés, pour tolérer les fautes de frappe
+    comme les saisies partielles.
+
+    Un médicament modifié ou retiré désactive ses entrées sans les ôter
+    des listes inversées ; quand elles dépassent SEUIL_COMPACTAGE des
+    entrées, les listes sont compactées (entrées renumérotées).
+    """
+
+    # Champs indexés pour chaque médicament
+    CHAMPS = ("nom_commercial", "dci")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reinitialiser()
+        self._charge = False
+
+    def _reinitialiser(self) -> None:
+        self._vocabulaire: Dict[str, int] = {}
+        self._postings: List[List[int]] = []
+        self._postings_np: Dict[int, np.ndarray] = {}
+        # Par entrée : médicament, nombre de trigrammes, active ou non
+        self._entree_medicament: List[int] = []
+        self._entree_taille: List[int] = []
+        self._entree_active: List[bool] = []
+        self._entrees_par_medicament: Dict[int, List[int]] = {}
+        self._nb_inactives = 0
+        self._tableaux: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @property
+    def est_charge(self) -> bool:
+        return self._charge
+
+    def __len__(self) -> int:
+        return len(self._entrees_par_medicament)
+
+    def charger(self, medicaments: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> None:
+        """
+        (Re)construire l'index à partir de tuples (id, nom_commercial, dci)
+        """
+        with self._lock:
+            self._reinitialiser()
+            for medicament_id, nom_commercial, dci in medicaments:
+                self._ajouter(medicament_id, nom_commercial, dci)
+            self._charge = True
+
+    def ajouter(
+        self,
+        medicament_id: int,
+        nom_commercial: Optional[str],
+        dci: Optional[str] = None
+    ) -> None:
+        """Ajouter ou remplacer un médicament dans l'index"""
+        with self._lock:
+            self._retirer(medicament_id)
+            self._ajouter(medicament_id, nom_commercial, dci)
+            self._compacter_si_besoin()
+
+    def retirer(self, medicament_id: int) -> None:
+        """Retirer un médicament de l'index"""
+        with self._lock:
+            self._retirer(medicament_id)
+            self._compacter_si_besoin()
+
+    def _ajouter(self, medicament_id: int, *valeurs: Optional[str]) -> None:
+        entrees = []
+        for valeur in valeurs:
+            grammes = trigrammes(valeur)
+            if not grammes:
+                continue
+
+            entree = len(self._entree_medicament)
+            self._entree_medicament.append(medicament_id)
+            self._entree_taille.append(len(grammes))
+            self._entree_active.append(True)
+            entrees.append(entree)
+
+            for gramme in grammes:
+                gramme_id = self._vocabulaire.get(gramme)
+                if gramme_id is None:
+                    gramme_id = len(self._postings)
+                    self._vocabulaire[gramme] = gramme_id
+                    self._postings.append([])
+                self._postings[gramme_id].append(entree)
+                self._postings_np.pop(gramme_id, None)
+
+        self._entrees_par_medicament[medicament_id] = entrees
+        self._tableaux = None
+
+    def _retirer(self, medicament_id: int) -> None:
+        # Les entrées sont désactivées, pas supprimées des listes inversées
+        for entree in self._entrees_par_medicament.pop(medicament_id, []):
+            self._entree_active[entree] = False
+            self._nb_inactives += 1
+        self._tableaux = None
+
+    def _compacter_si_besoin(self) -> None:
+        if (self._nb_inactives >= MIN_COMPACTAGE
+                and self._nb_inactives > SEUIL_COMPACTAGE * len(self._entree_active)):
+            self._compacter()
+
+    def _compacter(self) -> None:
+        """Ôter les entrées inactives des listes inversées et renuméroter"""
+        actives = np.asarray(self._entree_active, dtype=bool)
+        nouvel_id = np.cumsum(actives) - 1
+
+        vocabulaire: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        for gramme, gramme_id in self._vocabulaire.items():
+            anciennes = np.asarray(self._postings[gramme_id], dtype=np.int64)
+            restantes = nouvel_id[anciennes[actives[anciennes]]]
+            if len(restantes):
+                vocabulaire[gramme] = len(postings)
+                postings.append(restantes.tolist())
+
+        self._vocabulaire = vocabulaire
+        self._postings = postings
+        self._postings_np = {}
+        self._entree_medicament = [m for m, a in zip(self._entree_medicament, actives) if a]
+        self._entree_taille = [t for t, a in zip(self._entree_taille, actives) if a]
+        self._entree_active = [True] * len(self._entree_medicament)
+        self._entrees_par_medicament = {
+            medicament_id: [int(nouvel_id[e]) for e in entrees]
+            for medicament_id, entrees in self._entrees_par_medicament.items()
+        }
+        self._nb_inactives = 0
+        self._tableaux = None
+
+    def statistiques(self) -> dict:
+        with self._lock:
+            return {
+                "medicaments": len(self._entrees_par_medicament),
+                "entrees": len(self._entree_active),
+                "inactives": self._nb_inactives,
+                "trigrammes": len(self._vocabulaire),
+            }
+
+    def _postings_de(self, gramme_id: int) -> np.ndarray:
+        postings = self._postings_np.get(gramme_id)
+        if postings is None:
+            postings = np.asarray(self._postings[gramme_id], dtype=np.int32)
+            self._postings_np[gramme_id] = postings
+        return postings
+
+    def _tableaux_entrees(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._tableaux is None:
+            self._tableaux = (
+                np.asarray(self._entree_medicament, dtype=np.int64),
+                np.asarray(self._entree_taille, dtype=np.float32),
+                np.asarray(self._entree_active, dtype=bool)
+            )
+        return self._tableaux
+
+    def rechercher(
+        self,
+        requete: str,
+        limite: int = 20,
+        seuil: float = 0.3
+    ) -> List[Tuple[int, float]]:
+        """
+        Médicaments les plus proches de la requête
+
+        Returns:
+            Liste de tuples (medicament_id, score) par score décroissant
+        """
+        grammes = trigrammes(requete)
+        if not grammes:
+            return []
+
+        with self._lock:
+            gramme_ids = [
+                self._vocabulaire[g] for g in grammes if g in self._vocabulaire
+            ]
+            if not gramme_ids:
+                return []
+
+            medicaments, tailles, actives = self._tableaux_entrees()
+            toutes = np.concatenate([self._postings_de(g) for g in gramme_ids])
+
+        # Nombre de trigrammes communs par entrée
+        comptes = np.bincount(toutes, minlength=len(medicaments))
+        entrees = np.flatnonzero(comptes)
+        communs = comptes[entrees].astype(np.float32)
+        taille_requete = float(len(grammes))
+
+        jaccard = communs / (taille_requete + tailles[entrees] - communs)
+        couverture = communs / taille_requete
+        scores = (jaccard + couverture) / 2
+
+        retenues = (scores >= seuil) & actives[entrees]
+        entrees, scores = entrees[retenues], scores[retenues]
+        if not len(entrees):
+            return []
+
+        # Tri partiel : un médicament a au plus len(CHAMPS) entrées
+        k = min(len(scores), limite * len(self.CHAMPS))
+        meilleures = np.argpartition(-scores, k - 1)[:k]
+        meilleures = meilleures[np.argsort(-scores[meilleures], kind="stable")]
+
+        resultats = []
+        vus = set()
+        for position in meilleures:
+            medicament_id = int(medicaments[entrees[position]])
+            if medicament_id in vus:
+                continue
+            vus.add(medicament_id)
+            resultats.append((medicament_id, round(float(scores[position]), 4)))
+            if len(resultats) >= limite:
+                break
+        return resultats
+
+
+# Index partagé par l'application, chargé au démarrage
+medicament_index = MedicamentIndex()
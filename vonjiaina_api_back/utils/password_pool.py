@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Optional, Tuple
+
+from app.config import get_settings
+from utils.security import get_password_hash, verify_and_update_password
+
+settings = get_settings()
+
+
+class PoolSatureError(Exception):
+    """Trop de hachages en attente : la requête est refusée plutôt que mise en file"""
+
+
+def _chronometre(fonction, *args):
+    # Exécuté dans le worker : renvoie aussi l'instant de début pour mesurer l'attente
+    debut = time.monotonic()
+    return debut, fonction(*args)
+
+
+class PasswordPool:
+    """
+    Hachage et vérification bcrypt hors de la boucle d'événements
+
+    bcrypt coûte 100 à 300 ms de CPU : exécuté dans la boucle, il bloque
+    toutes les autres requêtes du worker. Les calculs partent dans un pool
+    de `workers` threads (bcrypt libère le GIL) ou processus ; au-delà de
+    `file_max` demandes en attente, les nouvelles sont refusées.
+    """
+
+    def __init__(self, workers: int = 2, file_max: int = 64, processus: bool = False):
+        self.workers = workers
+        self.file_max = file_max
+        self.processus = processus
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.en_cours = 0
+        self.max_en_cours = 0
+        self.refusees = 0
+        self.nombre = 0
+        self._attentes: Deque[float] = deque(maxlen=1000)
+        self._durees: Deque[float] = deque(maxlen=1000)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = (
+                        ProcessPoolExecutor(max_workers=self.workers) if self.processus
+                        else ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+                    )
+        return self._executor
+
+    async def _executer(self, fonction, *args):
+        with self._lock:
+            # Demandes déjà soumises : celles des workers plus celles en file
+            if self.en_cours >= self.workers + self.file_max:
+                self.refusees += 1
+                raise PoolSatureError("Trop de connexions simultanées, réessayez")
+            self.en_cours += 1
+            self.max_en_cours = max(self.max_en_cours, self.en_cours)
+
+        soumis = time.monotonic()
+        try:
+            debut, resultat = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _chronometre, fonction, *args
+            )
+        finally:
+            with self._lock:
+                self.en_cours -= 1
+
+        fin = time.monotonic()
+        with self._lock:
+            self.nombre += 1
+            self._attentes.append((debut - soumis) * 1000)
+            self._durees.append((fin - debut) * 1000)
+        return resultat
+
+    async def hacher(self, mot_de_passe: str) -> str:
+        return await self._executer(get_password_hash, mot_de_passe)
+
+    async def verifier(self, mot_de_passe: str, hash_actuel: str) -> Tuple[bool, Optional[str]]:
+        """
+        (mot de passe correct, nouveau hash si le coût bcrypt a changé)
+        """
+        return await self._executer(verify_and_update_password, mot_de_passe, hash_actuel)
+
+    def statistiques(self) -> dict:
+        def resume(valeurs) -> dict:
+            triees = sorted(valeurs)
+            if not triees:
+                return {"moyenne_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            return {
+                "moyenne_ms": round(sum(triees) / len(triees), 1),
+                "p95_ms": round(triees[min(int(len(triees) * 0.95), len(triees) - 1)], 1),
+                "max_ms": round(triees[-1], 1),
+            }
+
+        with self._lock:
+            return {
+                "executeur": "processus" if self.processus else "threads",
+                "workers": self.workers,
+                "file_max": self.file_max,
+                "en_cours": self.en_cours,
+                "en_attente": max(self.en_cours - self.workers, 0),
+                "max_en_cours": self.max_en_cours,
+                "nombre": self.nombre,
+                "refusees": self.refusees,
+                "attente": resume(self._attentes),
+                "calcul": resume(self._durees),
+            }
+
+    def fermer(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Pool partagé par l'application
+password_pool = PasswordPool(
+    workers=settings.HASH_WORKERS,
+    file_max=settings.HASH_FILE_MAX,
+    processus=settings.HASH_PROCESSUS
+)
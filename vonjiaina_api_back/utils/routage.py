@@ -0,0 +1,499 @@
+import heapq
+import json
+import math
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.spatial_index import METRES_PAR_DEGRE, distance_metres
+
+# Types de voie OSM (tag highway) retenus ; l'indice est stocké par arc
+CLASSES = (
+    "motorway", "trunk", "primary", "secondary", "tertiary", "unclassified",
+    "residential", "living_street", "service", "track", "road",
+    "path", "footway", "pedestrian", "steps",
+)
+_INDICE_CLASSE = {nom: i for i, nom in enumerate(CLASSES)}
+
+# Vitesses (km/h) par mode et type de voie ; absent = voie interdite
+VITESSES_KMH: Dict[str, Dict[str, float]] = {
+    "pied": {
+        **{nom: 4.5 for nom in CLASSES if nom not in ("motorway", "trunk")},
+        "steps": 2.5,
+        "track": 4.0,
+    },
+    "voiture": {
+        "motorway": 80, "trunk": 70, "primary": 50, "secondary": 40,
+        "tertiary": 35, "unclassified": 30, "residential": 25,
+        "living_street": 10, "service": 15, "track": 15, "road": 25,
+    },
+}
+MODES = tuple(VITESSES_KMH)
+
+# Vitesse moyenne et détour utilisés quand le trajet n'est pas calculable
+VITESSE_ESTIMEE_KMH = {"pied": 4.5, "voiture": 25.0}
+FACTEUR_DETOUR = 1.4
+# Le point de départ et les pharmacies rejoignent la route à pied
+VITESSE_ACCES_KMH = 4.5
+
+# Accroche au réseau : cellule de la grille des nœuds, distance maximale
+TAILLE_CELLULE_DEG = 0.005
+DISTANCE_ACCROCHE_MAX = 500.0
+
+
+class GrapheRoutier:
+    """
+    Réseau routier compact en mémoire (tableaux CSR) pour les temps de trajet
+
+    Nœuds : latitude/longitude dans des tableaux NumPy. Arcs : pour le
+    nœud u, cibles[debuts[u]:debuts[u+1]] avec longueur, type de voie et
+    indicateur de contresens (arc inverse d'une voie à sens unique,
+    autorisé à pied seulement). Les temps par arc sont précalculés pour
+    chaque mode, ainsi que le graphe inverse pour la recherche
+    bidirectionnelle. Les parcours (Dijkstra bornés) sont en Python pur
+    sur des listes, plus rapides que l'accès élément par élément NumPy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latitudes = np.zeros(0)
+        self.longitudes = np.zeros(0)
+        self.debuts = np.zeros(1, dtype=np.int64)
+        self.cibles = np.zeros(0, dtype=np.int32)
+        self.longueurs = np.zeros(0, dtype=np.float32)
+        self.classes = np.zeros(0, dtype=np.uint8)
+        self.contresens = np.zeros(0, dtype=bool)
+        self._adjacence: Dict[str, tuple] = {}
+        self._adjacence_inverse: Dict[str, tuple] = {}
+        self._cellules: Dict[Tuple[int, int], List[int]] = {}
+
+    @property
+    def est_charge(self) -> bool:
+        return len(self.latitudes) > 0
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    @property
+    def nb_arcs(self) -> int:
+        return len(self.cibles)
+
+    # Construction
+
+    def charger_aretes(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        aretes: Iterable[Tuple[int, int, str, bool]]
+    ) -> None:
+        """
+        Construire le graphe à partir de nœuds et d'arêtes
+        (u, v, type de voie, sens unique u -> v)
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        origines, cibles, classes, contresens = [], [], [], []
+        for u, v, classe, sens_unique in aretes:
+            indice = _INDICE_CLASSE.get(classe)
+            if indice is None or u == v:
+                continue
+            origines += [u, v]
+            cibles += [v, u]
+            classes += [indice, indice]
+            contresens += [False, bool(sens_unique)]
+
+        origines = np.asarray(origines, dtype=np.int64)
+        cibles = np.asarray(cibles, dtype=np.int32)
+        longueurs = _haversine(
+            latitudes[origines], longitudes[origines], latitudes[cibles], longitudes[cibles]
+        ).astype(np.float32)
+        self._installer(
+            latitudes, longitudes, origines, cibles, longueurs,
+            np.asarray(classes, dtype=np.uint8), np.asarray(contresens, dtype=bool)
+        )
+
+    def _installer(self, latitudes, longitudes, origines, cibles, longueurs, classes, contresens) -> None:
+        ordre = np.argsort(origines, kind="stable")
+        debuts = np.zeros(len(latitudes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origines, minlength=len(latitudes)), out=debuts[1:])
+
+        cellules: Dict[Tuple[int, int], List[int]] = {}
+        for noeud, (lat, lon) in enumerate(zip(latitudes.tolist(), longitudes.tolist())):
+            cellules.setdefault(_cellule(lat, lon), []).append(noeud)
+
+        adjacence, adjacence_inverse = {}, {}
+        for mode in MODES:
+            temps = _temps_arcs(longueurs[ordre], classes[ordre], contresens[ordre], mode)
+            adjacence[mode] = _csr_listes(debuts, cibles[ordre], temps, longueurs[ordre])
+            adjacence_inverse[mode] = _inverse(len(latitudes), origines[ordre], cibles[ordre],
+                                               temps, longueurs[ordre])
+
+        with self._lock:
+            self.latitudes, self.longitudes = latitudes, longitudes
+            self.debuts = debuts
+            self.cibles = cibles[ordre]
+            self.longueurs = longueurs[ordre]
+            self.classes = classes[ordre]
+            self.contresens = contresens[ordre]
+            self._adjacence = adjacence
+            self._adjacence_inverse = adjacence_inverse
+            self._cellules = cellules
+
+    def charger_fichier(self, chemin: str) -> int:
+        """
+        Charger un réseau depuis un fichier local : .npz (préparé par
+        scripts/preparer_graphe.py), .geojson/.json (LineString avec
+        propriétés highway/oneway) ou extrait OSM XML (.osm)
+
+        Returns:
+            Nombre de nœuds
+        """
+        if chemin.endswith(".npz"):
+            donnees = np.load(chemin)
+            debuts = donnees["debuts"]
+            origines = np.repeat(np.arange(len(debuts) - 1), np.diff(debuts))
+            self._installer(
+                donnees["latitudes"], donnees["longitudes"], origines, donnees["cibles"],
+                donnees["longueurs"], donnees["classes"], donnees["contresens"]
+            )
+        elif chemin.endswith((".geojson", ".json")):
+            self.charger_aretes(*_lire_geojson(chemin))
+        elif chemin.endswith(".osm"):
+            self.charger_aretes(*_lire_osm(chemin))
+        else:
+            raise ValueError(f"Format de réseau non pris en charge : {chemin} (.npz, .geojson, .osm)")
+        return len(self)
+
+    def sauvegarder(self, chemin: str) -> None:
+        """Écrire les tableaux du graphe (.npz) pour un chargement rapide"""
+        np.savez_compressed(
+            chemin,
+            latitudes=self.latitudes, longitudes=self.longitudes, debuts=self.debuts,
+            cibles=self.cibles, longueurs=self.longueurs, classes=self.classes,
+            contresens=self.contresens
+        )
+
+    # Requêtes
+
+    def noeud_proche(
+        self,
+        latitude: float,
+        longitude: float,
+        distance_max: float = DISTANCE_ACCROCHE_MAX
+    ) -> Optional[Tuple[int, float]]:
+        """(nœud, distance en mètres) le plus proche du point, ou None"""
+        i, j = _cellule(latitude, longitude)
+        meilleur = None
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for noeud in self._cellules.get((i + di, j + dj), ()):
+                    distance = distance_metres(
+                        latitude, longitude, self.latitudes[noeud], self.longitudes[noeud]
+                    )
+                    if meilleur is None or distance < meilleur[1]:
+                        meilleur = (noeud, distance)
+        if meilleur is None or meilleur[1] > distance_max:
+            return None
+        return meilleur
+
+    def temps_depuis(
+        self,
+        source: int,
+        cibles: Iterable[int],
+        mode: str = "pied",
+        budget_secondes: float = 3600.0,
+        echeance: Optional[float] = None
+    ) -> Dict[int, Tuple[float, float]]:
+        """
+        Dijkstra borné d'un nœud vers plusieurs : s'arrête quand toutes
+        les cibles sont atteintes, au-delà de `budget_secondes` de trajet,
+        ou à l'instant `echeance` (time.perf_counter)
+
+        Returns:
+            {cible atteinte: (secondes, mètres)}
+        """
+        debuts, voisins, temps, longueurs = self._adjacence[mode]
+        restantes = set(cibles)
+        resultats: Dict[int, Tuple[float, float]] = {}
+        meilleurs = {source: 0.0}
+        file = [(0.0, 0.0, source)]
+        iterations = 0
+
+        while file and restantes:
+            duree, distance, noeud = heapq.heappop(file)
+            if duree > meilleurs.get(noeud, math.inf) or duree > budget_secondes:
+                if duree > budget_secondes:
+                    break
+                continue
+            if noeud in restantes:
+                restantes.discard(noeud)
+                resultats[noeud] = (duree, distance)
+
+            iterations += 1
+            if echeance is not None and iterations % 256 == 0 and time.perf_counter() > echeance:
+                break
+
+            for k in range(debuts[noeud], debuts[noeud + 1]):
+                nouvelle = duree + temps[k]
+                voisin = voisins[k]
+                if nouvelle < meilleurs.get(voisin, math.inf):
+                    meilleurs[voisin] = nouvelle
+                    heapq.heappush(file, (nouvelle, distance + longueurs[k], voisin))
+        return resultats
+
+    def temps_entre(
+        self,
+        source: int,
+        cible: int,
+        mode: str = "pied",
+        budget_secondes: float = 3600.0
+    ) -> Optional[float]:
+        """
+        Temps de trajet (secondes) d'un nœud à un autre par Dijkstra
+        bidirectionnel borné, ou None au-delà du budget
+        """
+        if source == cible:
+            return 0.0
+        directions = (
+            (self._adjacence[mode], {source: 0.0}, [(0.0, source)], set()),
+            (self._adjacence_inverse[mode], {cible: 0.0}, [(0.0, cible)], set()),
+        )
+        meilleur = math.inf
+
+        while directions[0][2] and directions[1][2]:
+            if directions[0][2][0][0] + directions[1][2][0][0] >= min(meilleur, budget_secondes):
+                break
+            # On avance le côté dont la frontière est la plus petite
+            cote = 0 if len(directions[0][2]) <= len(directions[1][2]) else 1
+            (debuts, voisins, temps, _), distances, file, fixes = directions[cote]
+            autres_distances = directions[1 - cote][1]
+
+            duree, noeud = heapq.heappop(file)
+            if noeud in fixes:
+                continue
+            fixes.add(noeud)
+            for k in range(debuts[noeud], debuts[noeud + 1]):
+                voisin = voisins[k]
+                nouvelle = duree + temps[k]
+                if nouvelle < distances.get(voisin, math.inf):
+                    distances[voisin] = nouvelle
+                    heapq.heappush(file, (nouvelle, voisin))
+                if voisin in autres_distances:
+                    meilleur = min(meilleur, nouvelle + autres_distances[voisin])
+
+        return meilleur if meilleur <= budget_secondes else None
+
+    def trajets(
+        self,
+        latitude: float,
+        longitude: float,
+        destinations: Sequence[Tuple[float, float]],
+        mode: str = "pied",
+        budget_secondes: float = 3600.0,
+        delai_secondes: Optional[float] = None
+    ) -> List[Tuple[float, float, bool]]:
+        """
+        (secondes, mètres, estimé) du point vers chaque destination
+
+        Départ et destinations sont accrochés au nœud le plus proche (le
+        bout de chemin jusqu'à la route se fait à pied). Une destination
+        hors réseau, hors budget ou non atteinte dans le délai de calcul
+        reçoit une estimation à vol d'oiseau (estimé = True).
+        """
+        echeance = time.perf_counter() + delai_secondes if delai_secondes is not None else None
+        depart = self.noeud_proche(latitude, longitude) if self.est_charge else None
+
+        accroches = [
+            self.noeud_proche(lat, lon) if depart is not None else None
+            for lat, lon in destinations
+        ]
+        atteints = {}
+        if depart is not None:
+            atteints = self.temps_depuis(
+                depart[0], {a[0] for a in accroches if a is not None},
+                mode, budget_secondes, echeance
+            )
+
+        resultats = []
+        for (lat, lon), accroche in zip(destinations, accroches):
+            trajet = atteints.get(accroche[0]) if accroche is not None else None
+            if trajet is None:
+                distance = distance_metres(latitude, longitude, lat, lon) * FACTEUR_DETOUR
+                resultats.append((distance / (VITESSE_ESTIMEE_KMH[mode] / 3.6), distance, True))
+            else:
+                acces = depart[1] + accroche[1]
+                resultats.append((
+                    trajet[0] + acces / (VITESSE_ACCES_KMH / 3.6),
+                    trajet[1] + acces,
+                    False
+                ))
+        return resultats
+
+    def statistiques(self) -> dict:
+        return {
+            "noeuds": len(self),
+            "arcs": self.nb_arcs,
+            "memoire_mo": round(sum(
+                tableau.nbytes for tableau in (
+                    self.latitudes, self.longitudes, self.debuts, self.cibles,
+                    self.longueurs, self.classes, self.contresens
+                )
+            ) / 1e6, 2),
+        }
+
+
+def grille_synthetique(
+    lignes: int,
+    colonnes: int,
+    pas_metres: float = 100.0,
+    latitude: float = -18.91,
+    longitude: float = 47.52,
+    classe: Callable[[int, int, int, int], Optional[str]] = lambda i, j, i2, j2: "residential"
+) -> GrapheRoutier:
+    """
+    Graphe en grille (nœud (i, j) = ligne i, colonne j), pour les essais
+    et benchmarks hors ligne. `classe(i, j, i2, j2)` donne le type de voie
+    entre deux nœuds voisins, ou None pour couper (rivière, colline...).
+    """
+    pas_lat = pas_metres / METRES_PAR_DEGRE
+    pas_lon = pas_metres / (METRES_PAR_DEGRE * math.cos(math.radians(latitude)))
+    latitudes = [latitude + i * pas_lat for i in range(lignes) for _ in range(colonnes)]
+    longitudes = [longitude + j * pas_lon for _ in range(lignes) for j in range(colonnes)]
+
+    aretes = []
+    for i in range(lignes):
+        for j in range(colonnes):
+            for i2, j2 in ((i + 1, j), (i, j + 1)):
+                if i2 < lignes and j2 < colonnes:
+                    nom = classe(i, j, i2, j2)
+                    if nom is not None:
+                        aretes.append((i * colonnes + j, i2 * colonnes + j2, nom, False))
+
+    graphe = GrapheRoutier()
+    graphe.charger_aretes(latitudes, longitudes, aretes)
+    return graphe
+
+
+def _cellule(latitude: float, longitude: float) -> Tuple[int, int]:
+    return (math.floor(latitude / TAILLE_CELLULE_DEG), math.floor(longitude / TAILLE_CELLULE_DEG))
+
+
+def _haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """distance_metres vectorisée"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6371000 * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def _temps_arcs(longueurs, classes, contresens, mode: str) -> np.ndarray:
+    """Temps (secondes) de chaque arc pour un mode, inf si interdit"""
+    vitesses = np.array(
+        [VITESSES_KMH[mode].get(nom, 0.0) for nom in CLASSES], dtype=np.float64
+    ) / 3.6
+    vitesse = vitesses[classes]
+    temps = np.full(len(longueurs), np.inf)
+    autorise = vitesse > 0
+    if mode != "pied":
+        autorise &= ~contresens
+    temps[autorise] = longueurs[autorise] / vitesse[autorise]
+    return temps
+
+
+def _csr_listes(debuts, voisins, temps, longueurs) -> tuple:
+    # Arcs interdits retirés : les parcours n'ont pas à les tester
+    garder = np.isfinite(temps)
+    origines = np.repeat(np.arange(len(debuts) - 1), np.diff(debuts))[garder]
+    nouveaux_debuts = np.zeros(len(debuts), dtype=np.int64)
+    np.cumsum(np.bincount(origines, minlength=len(debuts) - 1), out=nouveaux_debuts[1:])
+    return (
+        nouveaux_debuts.tolist(),
+        voisins[garder].tolist(),
+        temps[garder].tolist(),
+        longueurs[garder].astype(np.float64).tolist(),
+    )
+
+
+def _inverse(nb_noeuds: int, origines, cibles, temps, longueurs) -> tuple:
+    ordre = np.argsort(cibles, kind="stable")
+    debuts = np.zeros(nb_noeuds + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cibles, minlength=nb_noeuds), out=debuts[1:])
+    return _csr_listes(debuts, origines[ordre], temps[ordre], longueurs[ordre])
+
+
+def _lire_geojson(chemin: str):
+    with open(chemin, encoding="utf-8") as f:
+        donnees = json.load(f)
+
+    noeuds: Dict[Tuple[float, float], int] = {}
+    latitudes, longitudes, aretes = [], [], []
+
+    def noeud(lon: float, lat: float) -> int:
+        cle = (round(lat, 7), round(lon, 7))
+        if cle not in noeuds:
+            noeuds[cle] = len(latitudes)
+            latitudes.append(lat)
+            longitudes.append(lon)
+        return noeuds[cle]
+
+    for objet in donnees.get("features", []):
+        geometrie = objet.get("geometry") or {}
+        proprietes = objet.get("properties") or {}
+        classe = proprietes.get("highway", "road")
+        sens_unique = str(proprietes.get("oneway", "no")).lower() in ("yes", "true", "1")
+        if geometrie.get("type") == "LineString":
+            lignes = [geometrie["coordinates"]]
+        elif geometrie.get("type") == "MultiLineString":
+            lignes = geometrie["coordinates"]
+        else:
+            continue
+        for ligne in lignes:
+            ids = [noeud(point[0], point[1]) for point in ligne]
+            aretes += [(u, v, classe, sens_unique) for u, v in zip(ids, ids[1:])]
+    return latitudes, longitudes, aretes
+
+
+def _lire_osm(chemin: str):
+    """Extrait OSM XML : nœuds puis voies taguées highway (lecture en flux)"""
+    positions: Dict[str, Tuple[float, float]] = {}
+    voies = []
+    reference, tags, refs = None, {}, []
+    for evenement, element in ET.iterparse(chemin, events=("start", "end")):
+        if evenement == "start":
+            if element.tag == "way":
+                reference, tags, refs = element.get("id"), {}, []
+            continue
+        if element.tag == "node":
+            positions[element.get("id")] = (float(element.get("lat")), float(element.get("lon")))
+            element.clear()
+        elif element.tag == "nd" and reference is not None:
+            refs.append(element.get("ref"))
+        elif element.tag == "tag" and reference is not None:
+            tags[element.get("k")] = element.get("v")
+        elif element.tag == "way":
+            if tags.get("highway") in _INDICE_CLASSE:
+                voies.append((refs, tags["highway"], tags.get("oneway") in ("yes", "true", "1")))
+            reference = None
+            element.clear()
+
+    noeuds: Dict[str, int] = {}
+    latitudes, longitudes, aretes = [], [], []
+    for refs, classe, sens_unique in voies:
+        ids = []
+        for ref in refs:
+            if ref not in positions:
+                continue
+            if ref not in noeuds:
+                noeuds[ref] = len(latitudes)
+                latitudes.append(positions[ref][0])
+                longitudes.append(positions[ref][1])
+            ids.append(noeuds[ref])
+        aretes += [(u, v, classe, sens_unique) for u, v in zip(ids, ids[1:])]
+    return latitudes, longitudes, aretes
+
+
+# Réseau partagé par l'application (chargé au démarrage si ROAD_GRAPH_PATH est défini)
+graphe_routier = GrapheRoutier()
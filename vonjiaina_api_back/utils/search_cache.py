@@ -0,0 +1,290 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import get_settings
+from utils.medicament_index import normaliser
+from utils.spatial_index import METRES_PAR_DEGRE, distance_metres
+
+settings = get_settings()
+
+# Clé : (cellule lat, cellule lon, médicament normalisé, rayon en mètres)
+# Le filtre de statut n'en fait pas partie : il s'applique à la lecture
+CleRecherche = Tuple[int, int, str, int]
+
+
+class _Entree:
+    __slots__ = ("candidates", "medicament_ids", "expire_a", "cellules")
+
+    def __init__(self, candidates, medicament_ids, expire_a, cellules):
+        self.candidates = candidates
+        self.medicament_ids = medicament_ids
+        self.expire_a = expire_a
+        self.cellules = cellules
+
+
+class SearchCache:
+    """
+    Cache des résultats de recherche par zone géographique
+
+    La position est arrondie à une cellule de grille : tous les
+    utilisateurs d'une même cellule partagent l'entrée. On y garde les
+    lignes candidates (toutes les pharmacies ayant le médicament, sans
+    troncature) dans un rayon élargi autour du centre de la cellule, ce
+    qui couvre le cercle de recherche de n'importe quel point de la
+    cellule. Distance, statut, filtre de statut et classement sont
+    recalculés à la lecture.
+
+    Une écriture de stock invalide les entrées dont la zone contient la
+    pharmacie concernée, retrouvées via une grille d'invalidation plus
+    grossière ; un médicament modifié ou supprimé, celles qui le
+    contiennent. Le cache est propre au processus : le TTL borne la durée
+    pendant laquelle un autre worker peut servir un résultat périmé.
+
+    Une zone dense garde beaucoup de lignes : la LRU est bornée en nombre
+    d'entrées et en nombre total de lignes candidates (`lignes_max`). Une
+    zone qui dépasse à elle seule `lignes_max` n'est pas mise en cache.
+    """
+
+    def __init__(
+        self,
+        taille_cellule_deg: float = 0.005,
+        taille_max: int = 5000,
+        duree_secondes: float = 60.0,
+        cellule_invalidation_deg: float = 0.05,
+        lignes_max: int = 50000
+    ):
+        # 0.005° ~ 550 m : un quartier d'Antananarivo
+        self.taille_cellule_deg = taille_cellule_deg
+        self.taille_max = taille_max
+        self.lignes_max = lignes_max
+        self.duree_secondes = duree_secondes
+        self.cellule_invalidation_deg = cellule_invalidation_deg
+        self._lock = threading.Lock()
+        self._entrees: "OrderedDict[CleRecherche, _Entree]" = OrderedDict()
+        self._par_cellule: Dict[Tuple[int, int], Set[CleRecherche]] = {}
+        # Lignes candidates de toutes les entrées
+        self.lignes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    def cle(
+        self,
+        latitude: float,
+        longitude: float,
+        medicament: str,
+        rayon_metres: int
+    ) -> CleRecherche:
+        return (
+            math.floor(latitude / self.taille_cellule_deg),
+            math.floor(longitude / self.taille_cellule_deg),
+            normaliser(medicament),
+            rayon_metres
+        )
+
+    def centre(self, cle: CleRecherche) -> Tuple[float, float]:
+        """Centre (latitude, longitude) de la cellule d'une clé"""
+        return (
+            (cle[0] + 0.5) * self.taille_cellule_deg,
+            (cle[1] + 0.5) * self.taille_cellule_deg
+        )
+
+    def rayon_elargi(self, rayon_metres: float) -> float:
+        """Rayon autour du centre couvrant le cercle de tout point de la cellule"""
+        demi_diagonale = METRES_PAR_DEGRE * self.taille_cellule_deg * math.sqrt(2) / 2
+        return rayon_metres + demi_diagonale
+
+    def get(self, cle: CleRecherche) -> Optional[Tuple[List[dict], Optional[List[int]]]]:
+        """
+        (candidates, medicament_ids) en cache, ou None
+        Les candidates ne doivent pas être modifiées : voir autour_de()
+        """
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self.misses += 1
+                return None
+            if entree.expire_a <= time.monotonic():
+                self._supprimer(cle)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self.hits += 1
+            return entree.candidates, entree.medicament_ids
+
+    def put(
+        self,
+        cle: CleRecherche,
+        candidates: List[dict],
+        medicament_ids: Optional[List[int]]
+    ) -> None:
+        """
+        Mettre en cache les candidates de la zone d'une clé (lignes avec
+        latitude et longitude)
+        """
+        if len(candidates) > self.lignes_max:
+            with self._lock:
+                self._supprimer(cle)
+            return
+        latitude, longitude = self.centre(cle)
+        cellules = self._cellules_invalidation(latitude, longitude, self.rayon_elargi(cle[3]))
+        entree = _Entree(
+            candidates,
+            set(medicament_ids) if medicament_ids is not None else None,
+            time.monotonic() + self.duree_secondes,
+            cellules
+        )
+        with self._lock:
+            self._supprimer(cle)
+            self._entrees[cle] = entree
+            self.lignes += len(candidates)
+            for cellule in cellules:
+                self._par_cellule.setdefault(cellule, set()).add(cle)
+            while len(self._entrees) > self.taille_max or self.lignes > self.lignes_max:
+                self._supprimer(next(iter(self._entrees)))
+
+    def autour_de(
+        self,
+        candidates: List[dict],
+        latitude: float,
+        longitude: float,
+        rayon_metres: float
+    ) -> List[dict]:
+        """
+        Copies des candidates à moins de `rayon_metres` du point,
+        avec leur distance exacte
+        """
+        resultats = []
+        for candidate in candidates:
+            distance = distance_metres(
+                latitude, longitude, candidate['latitude'], candidate['longitude']
+            )
+            if distance <= rayon_metres:
+                resultats.append(dict(candidate, distance=distance))
+        return resultats
+
+    def invalider(
+        self,
+        latitude: float,
+        longitude: float,
+        medicament_id: Optional[int] = None
+    ) -> int:
+        """
+        Invalider les entrées dont la zone contient le point (une pharmacie),
+        pour un médicament donné ou pour tous
+
+        Returns:
+            Nombre d'entrées invalidées
+        """
+        cellule = self._cellule_invalidation(latitude, longitude)
+        with self._lock:
+            a_supprimer = []
+            for cle in self._par_cellule.get(cellule, ()):
+                entree = self._entrees[cle]
+                if (medicament_id is not None
+                        and entree.medicament_ids is not None
+                        and medicament_id not in entree.medicament_ids):
+                    continue
+                centre_lat, centre_lon = self.centre(cle)
+                if distance_metres(centre_lat, centre_lon, latitude, longitude) <= self.rayon_elargi(cle[3]):
+                    a_supprimer.append(cle)
+
+            for cle in a_supprimer:
+                self._supprimer(cle)
+            self.invalidations += len(a_supprimer)
+        return len(a_supprimer)
+
+    def invalider_medicament(self, medicament_id: int) -> int:
+        """
+        Invalider, dans toutes les zones, les entrées où le médicament a pu
+        être retenu (modifié ou supprimé) ; les entrées de la recherche
+        ILIKE, sans ids résolus, sont invalidées aussi
+
+        Returns:
+            Nombre d'entrées invalidées
+        """
+        with self._lock:
+            a_supprimer = [
+                cle for cle, entree in self._entrees.items()
+                if entree.medicament_ids is None or medicament_id in entree.medicament_ids
+            ]
+            for cle in a_supprimer:
+                self._supprimer(cle)
+            self.invalidations += len(a_supprimer)
+        return len(a_supprimer)
+
+    def vider(self) -> None:
+        """Tout invalider"""
+        with self._lock:
+            self.invalidations += len(self._entrees)
+            self._entrees.clear()
+            self._par_cellule.clear()
+            self.lignes = 0
+
+    def statistiques(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entrees": len(self._entrees),
+            "taille_max": self.taille_max,
+            "lignes": self.lignes,
+            "lignes_max": self.lignes_max,
+            "duree_secondes": self.duree_secondes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_hit": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+        }
+
+    def _supprimer(self, cle: CleRecherche) -> None:
+        entree = self._entrees.pop(cle, None)
+        if entree is None:
+            return
+        self.lignes -= len(entree.candidates)
+        for cellule in entree.cellules:
+            cles = self._par_cellule.get(cellule)
+            if cles is not None:
+                cles.discard(cle)
+                if not cles:
+                    del self._par_cellule[cellule]
+
+    def _cellule_invalidation(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            math.floor(latitude / self.cellule_invalidation_deg),
+            math.floor(longitude / self.cellule_invalidation_deg)
+        )
+
+    def _cellules_invalidation(
+        self,
+        latitude: float,
+        longitude: float,
+        rayon_metres: float
+    ) -> List[Tuple[int, int]]:
+        """Cellules d'invalidation couvertes par la boîte englobante de la zone"""
+        delta_lat = rayon_metres / METRES_PAR_DEGRE
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        delta_lon = rayon_metres / (METRES_PAR_DEGRE * cos_lat)
+
+        i_min, j_min = self._cellule_invalidation(latitude - delta_lat, longitude - delta_lon)
+        i_max, j_max = self._cellule_invalidation(latitude + delta_lat, longitude + delta_lon)
+        return [
+            (i, j)
+            for i in range(i_min, i_max + 1)
+            for j in range(j_min, j_max + 1)
+        ]
+
+
+# Cache partagé par l'application
+search_cache = SearchCache(
+    taille_max=settings.SEARCH_CACHE_TAILLE,
+    duree_secondes=settings.SEARCH_CACHE_SECONDES,
+    lignes_max=settings.SEARCH_CACHE_LIGNES_MAX
+)
@@ -1,17 +1,33 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 from app.config import get_settings
 
 settings = get_settings()
 
 # Configuration du hachage de mot de passe
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Un hash d'un autre coût est refait à la connexion suivante (verify_and_update)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Vérifier un mot de passe"""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Vérifier un mot de passe ; si le hash n'utilise plus le coût configuré,
+    renvoyer aussi le nouveau hash à enregistrer
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hasher un mot de passe"""
     return pwd_context.hash(password)
@@ -0,0 +1,243 @@
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Rayon moyen de la Terre en mètres
+RAYON_TERRE_METRES = 6371000
+# Longueur d'un degré de latitude en mètres
+METRES_PAR_DEGRE = 111320
+# Clé de cellule dans les tableaux triés : ligne * DECALAGE + colonne + DECALAGE / 2
+DECALAGE = 1 << 32
+# Marge de la pré-sélection équirectangulaire avant la distance exacte
+TOLERANCE_RELATIVE = 0.01
+TOLERANCE_METRES = 10.0
+
+
+def distance_metres(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Distance orthodromique (haversine) en mètres entre deux points
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+
+    a = (math.sin(dphi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2)
+    return 2 * RAYON_TERRE_METRES * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    Index spatial en mémoire sur les coordonnées des pharmacies
+
+    Grille uniforme lat/lon : chaque cellule contient les pharmacies dont
+    la position tombe dedans. Une recherche par rayon ne parcourt que les
+    cellules couvertes par la boîte englobante du cercle, puis calcule la
+    distance exacte pour ces seules candidates.
+
+    Pour la recherche, les positions sont aussi rangées dans des tableaux
+    NumPy triés par cellule : les cellules d'une même ligne de la grille
+    sont contiguës, une tranche par ligne suffit. Ces tableaux sont
+    reconstruits à la première recherche qui suit une modification.
+    """
+
+    def __init__(self, taille_cellule_deg: float = 0.01):
+        # 0.01° ~ 1.1 km : quelques dizaines de cellules pour un rayon de 5 km
+        self.taille_cellule_deg = taille_cellule_deg
+        self._cellules: Dict[Tuple[int, int], Dict[int, Tuple[float, float]]] = {}
+        self._positions: Dict[int, Tuple[float, float]] = {}
+        self._lock = threading.RLock()
+        self._charge = False
+        # (clés triées, ids, latitudes, longitudes), None si à reconstruire
+        self._tableaux: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @property
+    def est_charge(self) -> bool:
+        return self._charge
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cellule(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            math.floor(latitude / self.taille_cellule_deg),
+            math.floor(longitude / self.taille_cellule_deg)
+        )
+
+    def charger(self, points: Iterable[Tuple[int, float, float]]) -> None:
+        """
+        (Re)construire l'index à partir de tuples (id, latitude, longitude)
+        """
+        cellules: Dict[Tuple[int, int], Dict[int, Tuple[float, float]]] = {}
+        positions: Dict[int, Tuple[float, float]] = {}
+
+        for pharmacie_id, latitude, longitude in points:
+            if latitude is None or longitude is None:
+                continue
+            position = (float(latitude), float(longitude))
+            positions[pharmacie_id] = position
+            cellules.setdefault(
+                self._cellule(*position), {}
+            )[pharmacie_id] = position
+
+        with self._lock:
+            self._cellules = cellules
+            self._positions = positions
+            self._tableaux = None
+            self._charge = True
+
+    def ajouter(self, pharmacie_id: int, latitude: float, longitude: float) -> None:
+        """Ajouter ou déplacer une pharmacie dans l'index"""
+        with self._lock:
+            self._retirer(pharmacie_id)
+            self._tableaux = None
+            position = (float(latitude), float(longitude))
+            self._positions[pharmacie_id] = position
+            self._cellules.setdefault(
+                self._cellule(*position), {}
+            )[pharmacie_id] = position
+
+    def retirer(self, pharmacie_id: int) -> None:
+        """Retirer une pharmacie de l'index"""
+        with self._lock:
+            self._retirer(pharmacie_id)
+            self._tableaux = None
+
+    def _retirer(self, pharmacie_id: int) -> None:
+        position = self._positions.pop(pharmacie_id, None)
+        if position is None:
+            return
+        cle = self._cellule(*position)
+        cellule = self._cellules.get(cle)
+        if cellule is not None:
+            cellule.pop(pharmacie_id, None)
+            if not cellule:
+                del self._cellules[cle]
+
+    def position(self, pharmacie_id: int) -> Optional[Tuple[float, float]]:
+        """Position (latitude, longitude) d'une pharmacie indexée"""
+        return self._positions.get(pharmacie_id)
+
+    def _cellules_couvertes(
+        self,
+        latitude: float,
+        longitude: float,
+        rayon_metres: float
+    ) -> Iterable[Dict[int, Tuple[float, float]]]:
+        """
+        Cellules intersectant la boîte englobante du cercle de recherche
+        """
+        delta_lat = rayon_metres / METRES_PAR_DEGRE
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        delta_lon = rayon_metres / (METRES_PAR_DEGRE * cos_lat)
+
+        i_min, j_min = self._cellule(latitude - delta_lat, longitude - delta_lon)
+        i_max, j_max = self._cellule(latitude + delta_lat, longitude + delta_lon)
+
+        nb_cellules = (i_max - i_min + 1) * (j_max - j_min + 1)
+
+        # Grand rayon : moins coûteux de filtrer les cellules non vides
+        if nb_cellules > len(self._cellules):
+            return [
+                cellule for (i, j), cellule in self._cellules.items()
+                if i_min <= i <= i_max and j_min <= j <= j_max
+            ]
+
+        cellules = []
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                cellule = self._cellules.get((i, j))
+                if cellule:
+                    cellules.append(cellule)
+        return cellules
+
+    def candidats(
+        self,
+        latitude: float,
+        longitude: float,
+        rayon_metres: float
+    ) -> List[int]:
+        """
+        IDs des pharmacies dans la boîte englobante (sans distance exacte)
+        """
+        with self._lock:
+            return [
+                pharmacie_id
+                for cellule in self._cellules_couvertes(latitude, longitude, rayon_metres)
+                for pharmacie_id in cellule
+            ]
+
+    def _tableaux_tries(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Positions triées par cellule (appelé sous le verrou)"""
+        if self._tableaux is None:
+            n = len(self._positions)
+            ids = np.fromiter(self._positions.keys(), dtype=np.int64, count=n)
+            positions = np.array(list(self._positions.values()), dtype=np.float64).reshape(n, 2)
+            lignes = np.floor(positions[:, 0] / self.taille_cellule_deg).astype(np.int64)
+            colonnes = np.floor(positions[:, 1] / self.taille_cellule_deg).astype(np.int64)
+            cles = lignes * DECALAGE + colonnes + DECALAGE // 2
+            ordre = np.argsort(cles, kind="stable")
+            self._tableaux = (cles[ordre], ids[ordre], positions[ordre, 0], positions[ordre, 1])
+        return self._tableaux
+
+    def rechercher(
+        self,
+        latitude: float,
+        longitude: float,
+        rayon_metres: float
+    ) -> List[Tuple[int, float]]:
+        """
+        Pharmacies à moins de `rayon_metres`, triées par distance croissante
+
+        Une tranche des tableaux triés par ligne de cellules couverte ;
+        une approximation équirectangulaire écarte les points hors du
+        cercle avant la distance exacte (haversine vectorisée).
+
+        Returns:
+            Liste de tuples (pharmacie_id, distance en mètres)
+        """
+        delta_lat = rayon_metres / METRES_PAR_DEGRE
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        delta_lon = rayon_metres / (METRES_PAR_DEGRE * cos_lat)
+        i_min, j_min = self._cellule(latitude - delta_lat, longitude - delta_lon)
+        i_max, j_max = self._cellule(latitude + delta_lat, longitude + delta_lon)
+
+        with self._lock:
+            cles, ids, lats, lons = self._tableaux_tries()
+            lignes = np.arange(i_min, i_max + 1, dtype=np.int64) * DECALAGE + DECALAGE // 2
+            debuts = np.searchsorted(cles, lignes + j_min, side="left")
+            fins = np.searchsorted(cles, lignes + j_max, side="right")
+            tranches = [np.arange(d, f) for d, f in zip(debuts.tolist(), fins.tolist()) if f > d]
+            if not tranches:
+                return []
+            indices = np.concatenate(tranches)
+            ids, lats, lons = ids[indices], lats[indices], lons[indices]
+
+        # Pré-sélection : distance équirectangulaire, avec une marge
+        dy = (lats - latitude) * METRES_PAR_DEGRE
+        dx = (lons - longitude) * (METRES_PAR_DEGRE * math.cos(math.radians(latitude)))
+        limite = rayon_metres * (1 + TOLERANCE_RELATIVE) + TOLERANCE_METRES
+        proches = dx * dx + dy * dy <= limite * limite
+        ids, lats, lons = ids[proches], lats[proches], lons[proches]
+
+        distances = _haversine(latitude, longitude, lats, lons)
+        dans_le_rayon = distances <= rayon_metres
+        ids, distances = ids[dans_le_rayon], distances[dans_le_rayon]
+        ordre = np.argsort(distances)
+        return list(zip(ids[ordre].tolist(), distances[ordre].tolist()))
+
+
+def _haversine(latitude: float, longitude: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """distance_metres d'un point vers des tableaux de points"""
+    phi1 = math.radians(latitude)
+    phi2 = np.radians(lats)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - longitude) / 2) ** 2)
+    return 2 * RAYON_TERRE_METRES * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+# Index partagé par l'application, chargé au démarrage
+pharmacie_index = SpatialIndex()
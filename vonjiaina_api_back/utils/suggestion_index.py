@@ -0,0 +1,144 @@
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.medicament_index import normaliser
+
+# Borne supérieure pour la plage des clés commençant par un préfixe
+FIN_PREFIXE = "\uffff"
+
+
+class SuggestionIndex:
+    """
+    Autocomplétion par préfixe sur les noms de médicaments
+
+    Tableau trié de (clé normalisée, medicament_id) : les complétions d'un
+    préfixe forment une plage contiguë trouvée par recherche binaire, dans
+    laquelle on garde les k médicaments les plus populaires. Les réponses
+    sont mises en cache une minute par préfixe.
+    """
+
+    def __init__(self, duree_cache_secondes: float = 60.0, taille_cache: int = 10000):
+        self._lock = threading.RLock()
+        self._entrees: List[Tuple[str, int]] = []
+        self._cles: Dict[int, List[str]] = {}
+        self._noms: Dict[int, str] = {}
+        self._popularite: Dict[int, float] = {}
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[dict]]] = {}
+        self.duree_cache_secondes = duree_cache_secondes
+        self.taille_cache = taille_cache
+        self._charge = False
+
+    @property
+    def est_charge(self) -> bool:
+        return self._charge
+
+    def __len__(self) -> int:
+        return len(self._noms)
+
+    def charger(
+        self,
+        medicaments: Iterable[Tuple[int, Optional[str], Optional[str]]],
+        popularite: Optional[Dict[int, float]] = None
+    ) -> None:
+        """
+        (Re)construire l'index à partir de tuples (id, nom_commercial, dci)
+        et d'une popularité initiale par médicament
+        """
+        entrees = []
+        cles = {}
+        noms = {}
+        for medicament_id, nom_commercial, dci in medicaments:
+            cles[medicament_id] = self._cles_de(nom_commercial, dci)
+            noms[medicament_id] = nom_commercial
+            entrees.extend((cle, medicament_id) for cle in cles[medicament_id])
+        entrees.sort()
+
+        with self._lock:
+            self._entrees = entrees
+            self._cles = cles
+            self._noms = noms
+            self._popularite = dict(popularite or {})
+            self._cache.clear()
+            self._charge = True
+
+    @staticmethod
+    def _cles_de(nom_commercial: Optional[str], dci: Optional[str]) -> List[str]:
+        return sorted({cle for cle in (normaliser(nom_commercial), normaliser(dci)) if cle})
+
+    def ajouter(
+        self,
+        medicament_id: int,
+        nom_commercial: Optional[str],
+        dci: Optional[str] = None
+    ) -> None:
+        """Ajouter ou renommer un médicament"""
+        with self._lock:
+            self._retirer(medicament_id)
+            self._cles[medicament_id] = self._cles_de(nom_commercial, dci)
+            self._noms[medicament_id] = nom_commercial
+            for cle in self._cles[medicament_id]:
+                bisect.insort(self._entrees, (cle, medicament_id))
+            self._cache.clear()
+
+    def retirer(self, medicament_id: int) -> None:
+        """Retirer un médicament"""
+        with self._lock:
+            self._retirer(medicament_id)
+            self._cache.clear()
+
+    def _retirer(self, medicament_id: int) -> None:
+        for cle in self._cles.pop(medicament_id, []):
+            position = bisect.bisect_left(self._entrees, (cle, medicament_id))
+            if position < len(self._entrees) and self._entrees[position] == (cle, medicament_id):
+                del self._entrees[position]
+        self._noms.pop(medicament_id, None)
+
+    def enregistrer_recherche(self, medicament_id: int, poids: float = 1.0) -> None:
+        """Augmenter la popularité d'un médicament (visible à l'expiration du cache)"""
+        with self._lock:
+            self._popularite[medicament_id] = self._popularite.get(medicament_id, 0.0) + poids
+
+    def suggerer(self, prefixe: str, k: int = 10) -> List[dict]:
+        """
+        Les k complétions les plus populaires du préfixe
+
+        Returns:
+            Liste de {"id", "nom_commercial"} par popularité décroissante
+        """
+        prefixe = normaliser(prefixe)
+        if not prefixe:
+            return []
+
+        cle_cache = (prefixe, k)
+        maintenant = time.monotonic()
+        en_cache = self._cache.get(cle_cache)
+        if en_cache and maintenant - en_cache[0] < self.duree_cache_secondes:
+            return en_cache[1]
+
+        with self._lock:
+            debut = bisect.bisect_left(self._entrees, (prefixe,))
+            fin = bisect.bisect_left(self._entrees, (prefixe + FIN_PREFIXE,))
+            candidats = {medicament_id for _, medicament_id in self._entrees[debut:fin]}
+
+            meilleurs = heapq.nlargest(
+                k,
+                candidats,
+                key=lambda m: (self._popularite.get(m, 0.0), -len(self._noms[m] or ""))
+            )
+            suggestions = [
+                {"id": medicament_id, "nom_commercial": self._noms[medicament_id]}
+                for medicament_id in meilleurs
+            ]
+
+            if len(self._cache) >= self.taille_cache:
+                self._cache.clear()
+            self._cache[cle_cache] = (maintenant, suggestions)
+
+        return suggestions
+
+
+# Index partagé par l'application, chargé au démarrage
+suggestion_index = SuggestionIndex()